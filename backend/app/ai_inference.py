@@ -1,67 +1,450 @@
 # app/ai_inference.py
 import re
 import json
+import asyncio
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional
+import math
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
 from datetime import datetime
-import openai  # type: ignore # Optional: if using OpenAI API
-import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from app.config import (
+    ANALYSIS_ROUTING_ENABLED, LLM_API_KEY, LLM_CHUNK_OUTPUT_TOKENS, LLM_CHUNK_TOKENS,
+    LLM_COST_PER_1K_TOKENS, LLM_MAX_OUTPUT_TOKENS, LLM_MODEL, LLM_TOKEN_BUDGET,
+    ROUTING_CONFIDENCE_THRESHOLD, ROUTING_SHORT_TEXT_CHARS
+)
+from app import llm_client
+from app.llm_client import LLMClient, LLMError, get_llm_client
+from app.utils import chunking, streaming_stats, vocabulary
+from app.utils.chunking import count_tokens, select_chunks, split_into_chunks
+from app.utils.json_stream import IncrementalJSONParser
+from app.utils.streaming_stats import RangeCounter, RunningStats, TARGET_RANGE, TrendAccumulator
+from app.utils.vocabulary import (
+    CONCERN_TERMS, FINDING_TERMS, MEDICATION_CLASSES, RISK_KEYWORDS,
+    findall_terms, get_vocabulary_automaton
+)
 
 logger = logging.getLogger(__name__)
 
-# Configuration
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if OPENAI_API_KEY:
-    openai.api_key = OPENAI_API_KEY
+SYSTEM_PROMPT = "You are a medical AI assistant specialized in analyzing diabetes-related reports and providing insights."
+
+_analysis_version: Optional[str] = None
+
+def preferred_engine() -> str:
+    """The engine analyses come from when nothing goes wrong: "llm" if a provider is configured"""
+    return "llm" if LLM_API_KEY else "rules"
+
+def analysis_version() -> str:
+    """
+    Fingerprint of what an analysis depends on besides its arguments: the
+    engine and model in use and the source of the rule set, prompt,
+    vocabularies, glucose statistics, chunk splitting and (with an LLM) the
+    response handling. Cached analyses are keyed on it, so any change to
+    them invalidates the cache.
+    """
+    global _analysis_version
+    if _analysis_version is None:
+        routing = ROUTING_CONFIDENCE_THRESHOLD if ANALYSIS_ROUTING_ENABLED else "off"
+        engine = f"llm:{LLM_MODEL}:{LLM_CHUNK_TOKENS}:{LLM_TOKEN_BUDGET}:{routing}" if LLM_API_KEY else "rules"
+        digest = hashlib.sha256(engine.encode())
+        sources = [__file__, vocabulary.__file__, chunking.__file__, streaming_stats.__file__]
+        if LLM_API_KEY:
+            sources.append(llm_client.__file__)
+        for source in sources:
+            digest.update(Path(source).read_bytes())
+        _analysis_version = digest.hexdigest()[:16]
+    return _analysis_version
+
+async def analyze_report_content_async(text_content: str, report_type: str = "general",
+                                       run_rules: Optional[Callable[..., Awaitable[Dict[str, Any]]]] = None
+                                       ) -> Dict[str, Any]:
+    """
+    Analyze medical report content, with the LLM when one is configured
+    With routing enabled the rules go first, and the LLM is only called
+    when their result is not confident enough (see choose_route). Falls
+    back to rule-based analysis when the LLM call fails, times out or is
+    refused by the circuit breaker. ``run_rules(func, text, report_type)``
+    runs the rules, e.g. in the worker pool; inline if None. The result's
+    "engine" says which of the two produced it.
+    """
+    if not text_content or not text_content.strip():
+        return create_empty_analysis("No content to analyze")
+
+    client = get_llm_client()
+    rules = None
+    if client is not None and ANALYSIS_ROUTING_ENABLED:
+        rules = await _run_rules(run_rules, routed_rules_analysis, text_content, report_type)
+        if choose_route(rules, text_content) == "rules":
+            return rules
+
+    if client is not None:
+        try:
+            started = time.perf_counter()
+            analysis = await analyze_with_llm(client, text_content, report_type)
+            _record_llm_latency(time.perf_counter() - started)
+            analysis["engine"] = "llm"
+            return analysis
+        except LLMError as e:
+            logger.warning(f"LLM analysis failed, using rules: {e}")
+
+    if rules is not None:
+        return rules
+    return await _run_rules(run_rules, analyze_report_content, text_content, report_type)
+
+async def _run_rules(run_rules: Optional[Callable[..., Awaitable[Dict[str, Any]]]], func: Callable[..., Dict[str, Any]],
+                     text_content: str, report_type: str) -> Dict[str, Any]:
+    if run_rules is None:
+        return func(text_content, report_type)
+    return await run_rules(func, text_content, report_type)
+
+async def llm_analysis(text_content: str, report_type: str = "general") -> Dict[str, Any]:
+    """
+    LLM analysis with no rules fallback, e.g. to upgrade a rules result
+    Raises LLMError when no LLM is configured or the call fails.
+    """
+    client = get_llm_client()
+    if client is None:
+        raise LLMError("No LLM provider configured")
+    started = time.perf_counter()
+    analysis = await analyze_with_llm(client, text_content, report_type)
+    _record_llm_latency(time.perf_counter() - started)
+    analysis["engine"] = "llm"
+    return analysis
+
+async def stream_report_analysis(text_content: str, report_type: str = "general",
+                                 run_rules: Optional[Callable[..., Awaitable[Dict[str, Any]]]] = None
+                                 ) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Analyze medical report content, yielding results as they become known
+    Events are dicts with an "event" key:
+
+        text      {"field", "text"}  more of a text field, e.g. the summary
+        item      {"field", "value"} one more entry of a list field
+        field     {"field", "value"} a field with its final value
+        fallback  {"reason"}         the LLM failed mid-way; discard earlier
+                                     events, the rules result follows
+        complete  {"analysis"}       the finished analysis
+
+    Short reports stream token by token from the LLM; reports that need
+    chunking, and rule-based analysis, yield their fields once complete.
+    Routes and falls back to rules as analyze_report_content_async does.
+    """
+    if not text_content or not text_content.strip():
+        analysis = create_empty_analysis("No content to analyze")
+    else:
+        analysis = None
+        client = get_llm_client()
+        rules = None
+        if client is not None and ANALYSIS_ROUTING_ENABLED:
+            rules = await _run_rules(run_rules, routed_rules_analysis, text_content, report_type)
+            if choose_route(rules, text_content) == "rules":
+                client = None
+        if client is not None:
+            started = False
+            llm_started = time.perf_counter()
+            try:
+                if len(split_into_chunks(text_content, LLM_CHUNK_TOKENS)) > 1:
+                    analysis = await analyze_with_llm(client, text_content, report_type)
+                else:
+                    parser = IncrementalJSONParser()
+                    pieces = []
+                    async for piece in client.stream_chat(_analysis_messages(text_content, report_type),
+                                                          max_tokens=LLM_MAX_OUTPUT_TOKENS, temperature=0.3):
+                        pieces.append(piece)
+                        for kind, field, value in parser.feed(piece):
+                            started = True
+                            yield {"event": kind, "field": field, ("text" if kind == "text" else "value"): value}
+                    analysis = parser.fields if parser.done else _parse_llm_content("".join(pieces))
+                _record_llm_latency(time.perf_counter() - llm_started)
+                analysis["engine"] = "llm"
+            except LLMError as e:
+                logger.warning(f"LLM analysis failed, using rules: {e}")
+                if started:
+                    yield {"event": "fallback", "reason": str(e)}
+                analysis = None
+
+        if analysis is None:
+            analysis = rules or await _run_rules(run_rules, analyze_report_content, text_content, report_type)
+            for field, value in analysis.items():
+                yield {"event": "field", "field": field, "value": value}
+    yield {"event": "complete", "analysis": analysis}
+
+async def analyze_with_llm(client: LLMClient, text_content: str, report_type: str,
+                           chunk_tokens: int = LLM_CHUNK_TOKENS,
+                           token_budget: int = LLM_TOKEN_BUDGET) -> Dict[str, Any]:
+    """
+    Analyze report using the LLM client; raises LLMError if no usable answer comes back
+    A report longer than ``chunk_tokens`` is split into chunks that are
+    analyzed in parallel and merged with merge_chunk_analyses, so latency
+    follows the longest chunk rather than the whole report. Prompt plus
+    output tokens are capped at ``token_budget`` (0 for no cap); over it, the
+    chunks with the most clinical content are analyzed and the rest skipped.
+    """
+    chunks = split_into_chunks(text_content, chunk_tokens)
+    if len(chunks) <= 1:
+        return await _analyze_chunk(client, text_content, report_type, LLM_MAX_OUTPUT_TOKENS)
+
+    overhead = count_tokens(create_analysis_prompt("", report_type, section=(len(chunks), len(chunks))))
+    chunk_sizes = [count_tokens(chunk) for chunk in chunks]
+    costs = [overhead + size + LLM_CHUNK_OUTPUT_TOKENS for size in chunk_sizes]
+    selected = select_chunks([chunk_relevance(chunk) for chunk in chunks], costs, token_budget or None)
+    if not selected:
+        raise LLMError(f"No chunk fits the token budget of {token_budget}")
+
+    results = await asyncio.gather(*(
+        _analyze_chunk(client, chunks[index], report_type, LLM_CHUNK_OUTPUT_TOKENS,
+                       section=(index + 1, len(chunks)))
+        for index in selected
+    ), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException) and not isinstance(result, LLMError):
+            raise result
+
+    analyzed = [(index, result) for index, result in zip(selected, results) if not isinstance(result, LLMError)]
+    if not analyzed:
+        raise results[0]
+    merged = merge_chunk_analyses([result for _, result in analyzed],
+                                  [chunk_sizes[index] for index, _ in analyzed])
+    # Share of the report's text the merged analysis is based on
+    merged["confidence_score"] = round(
+        merged["confidence_score"] * sum(chunk_sizes[index] for index, _ in analyzed) / sum(chunk_sizes), 3
+    )
+    merged["chunks"] = {"total": len(chunks), "analyzed": len(analyzed),
+                        "failed": len(selected) - len(analyzed), "skipped": len(chunks) - len(selected)}
+    return merged
+
+async def _analyze_chunk(client: LLMClient, text: str, report_type: str, max_tokens: int,
+                         section: Optional[tuple] = None) -> Dict[str, Any]:
+    content = await client.chat(_analysis_messages(text, report_type, section),
+                                max_tokens=max_tokens, temperature=0.3)
+    return _parse_llm_content(content)
+
+def _analysis_messages(text: str, report_type: str, section: Optional[tuple] = None) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": create_analysis_prompt(text, report_type, section=section)}
+    ]
+
+def _parse_llm_content(content: str) -> Dict[str, Any]:
+    try:
+        analysis = parse_ai_response(content)
+    except Exception as e:
+        raise LLMError(f"Unparseable LLM response: {e}") from e
+    if not isinstance(analysis, dict):
+        raise LLMError("LLM response is not a JSON object")
+    return analysis
+
+def chunk_relevance(text: str) -> float:
+    """How much clinical content a chunk has: vocabulary hits plus measurements found"""
+    scan = scan_report(text)
+    return (sum(scan["keyword_counts"].values()) + len(scan["glucose_values"])
+            + len(scan["hba1c_values"]) + (1 if scan["blood_pressure"] else 0))
+
+# Caps on merged lists; a long report gives more to report than one chunk
+MAX_MERGED_FINDINGS = 8
+MAX_MERGED_CONCERNS = 6
+
+def merge_chunk_analyses(partials: List[Dict[str, Any]], weights: List[int]) -> Dict[str, Any]:
+    """
+    Combine the analyses of a report's chunks, given in document order
+    The risk score is the highest chunk's: a report is as concerning as its
+    worst section. Findings, concerns and recommendations are deduplicated
+    and ranked by how many chunks mention them, then by the risk of those
+    chunks. Confidence is averaged weighted by chunk size (``weights``).
+    """
+    risks = [_as_float(partial.get("risk_score"), 0.0, 0.0, 10.0) for partial in partials]
+    confidences = [_as_float(partial.get("confidence_score"), 0.8, 0.0, 1.0) for partial in partials]
+    total_weight = sum(weights) or 1
+    summaries = [str(partial.get("summary", "")).strip() for partial in partials]
+    return {
+        "summary": " ".join(summary for summary in summaries if summary),
+        "risk_score": max(risks),
+        "recommendations": _rank_items(partials, "recommendations", risks)[:MAX_RECOMMENDATIONS],
+        "key_findings": _rank_items(partials, "key_findings", risks)[:MAX_MERGED_FINDINGS],
+        "concerns": _rank_items(partials, "concerns", risks)[:MAX_MERGED_CONCERNS],
+        "status": "completed",
+        "confidence_score": sum(c * w for c, w in zip(confidences, weights)) / total_weight
+    }
+
+def _rank_items(partials: List[Dict[str, Any]], field: str, risks: List[float]) -> List[str]:
+    # Each entry: [text as first written, word set, chunks mentioning it, highest risk, first seen]
+    entries: List[list] = []
+    for chunk, partial in enumerate(partials):
+        items = partial.get(field)
+        for item in items if isinstance(items, list) else []:
+            words = set(re.findall(r'[a-z0-9]+(?:\.[0-9]+)?', str(item).lower()))
+            if not words:
+                continue
+            entry = next((e for e in entries if _similar(e[1], words)), None)
+            if entry is None:
+                entries.append([str(item).strip(), words, {chunk}, risks[chunk], len(entries)])
+            else:
+                entry[2].add(chunk)
+                entry[3] = max(entry[3], risks[chunk])
+    entries.sort(key=lambda e: (-len(e[2]), -e[3], e[4]))
+    return [e[0] for e in entries]
+
+def _similar(a: set, b: set) -> bool:
+    """Near-duplicate wording: at least 80% word overlap"""
+    return len(a & b) >= 0.8 * len(a | b)
+
+def _as_float(value: Any, default: float, low: float, high: float) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    return min(max(number, low), high) if math.isfinite(number) else default
 
 def analyze_report_content(text_content: str, report_type: str = "general") -> Dict[str, Any]:
     """
-    Analyze medical report content and provide AI insights
-    This is a comprehensive function that can use multiple approaches
+    Rule-based analysis of medical report content
+    Synchronous and CPU-bound, so it can run in the worker pool; the LLM path
+    is analyze_report_content_async.
     """
     try:
         if not text_content or not text_content.strip():
             return create_empty_analysis("No content to analyze")
-        
-        # Try different analysis methods in order of preference
-        if OPENAI_API_KEY:
-            try:
-                return analyze_with_openai(text_content, report_type)
-            except Exception as e:
-                logger.warning(f"OpenAI analysis failed: {e}")
-        
-        # Fallback to rule-based analysis
-        return analyze_with_rules(text_content, report_type)
+        analysis = analyze_with_rules(text_content, report_type)
+        analysis["engine"] = "rules"
+        return analysis
         
     except Exception as e:
         logger.error(f"Error in AI analysis: {str(e)}")
         return create_error_analysis(str(e))
 
-def analyze_with_openai(text_content: str, report_type: str) -> Dict[str, Any]:
+# Routing: rules first, the LLM only when their result is not confident enough
+
+# Words that make a nearby clinical term mean something the rules can't see:
+# negation ("no chest pain") or hedging ("possible neuropathy")
+_AMBIGUITY_CUES = re.compile(
+    r"\b(?:no|not|denies|denied|without|negative for|free of|absence of|possible|possibly|probable|"
+    r"probably|suspected|suspect|likely|unlikely|unclear|uncertain|rule out|r/o|query|questionable|"
+    r"borderline|equivocal|cannot exclude|versus|vs)\b|\?"
+)
+AMBIGUITY_WINDOW = 40  # characters before a term searched for cues, within its sentence
+
+# Weights of the parts of the rules confidence; they add up to 1
+ROUTING_WEIGHTS = {"metrics": 0.45, "brevity": 0.35, "clarity": 0.20}
+
+def assess_rules_confidence(text_content: str, scan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    How fully the rules can capture a report, from 0 to 1
+    High for short slips with a glucose or HbA1c value and plain wording;
+    lower when no metrics were extracted, for long narrative text the rules
+    mostly ignore, and when clinical terms are negated or hedged.
+    """
+    metric_types = (bool(scan["glucose_values"]) + bool(scan["hba1c_values"])
+                    + (scan["blood_pressure"] is not None))
+    chars = len(text_content.strip())
+
+    text_lower = text_content.lower()
+    ambiguous = 0
+    for term, spans in scan["keyword_hits"].items():
+        if term not in _CLINICAL_TERMS:
+            continue
+        for start, _ in spans:
+            window = text_lower[max(0, start - AMBIGUITY_WINDOW):start]
+            if _AMBIGUITY_CUES.search(re.split(r'[.;\n]', window)[-1]):
+                ambiguous += 1
+
+    parts = {
+        "metrics": min(1.0, metric_types / 2),
+        "brevity": min(1.0, ROUTING_SHORT_TEXT_CHARS / chars) if chars else 1.0,
+        "clarity": 1.0 - min(1.0, ambiguous / 2)
+    }
+    return {
+        "confidence": round(sum(ROUTING_WEIGHTS[name] * value for name, value in parts.items()), 3),
+        "metric_types": metric_types,
+        "ambiguous_terms": ambiguous,
+        "chars": chars
+    }
+
+def routed_rules_analysis(text_content: str, report_type: str = "general") -> Dict[str, Any]:
     """
-    Analyze report using OpenAI API
+    analyze_report_content with its confidence assessed for routing
+    The assessment is kept under "routing" and also becomes the result's
+    confidence_score. CPU-bound, so it can run in the worker pool.
     """
     try:
-        prompt = create_analysis_prompt(text_content, report_type)
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a medical AI assistant specialized in analyzing diabetes-related reports and providing insights."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1000,
-            temperature=0.3
-        )
-        
-        analysis_text = response.choices[0].message.content
-        return parse_ai_response(analysis_text)
-        
+        if not text_content or not text_content.strip():
+            return create_empty_analysis("No content to analyze")
+        scan = scan_report(text_content)
+        analysis = analyze_with_rules(text_content, report_type, scan=scan)
+        analysis["engine"] = "rules"
+        if analysis.get("status") != "error":
+            analysis["routing"] = assess_rules_confidence(text_content, scan)
+            analysis["confidence_score"] = analysis["routing"]["confidence"]
+        return analysis
     except Exception as e:
-        logger.error(f"OpenAI API error: {str(e)}")
-        raise
+        logger.error(f"Error in AI analysis: {str(e)}")
+        return create_error_analysis(str(e))
+
+_routing_stats = {"rules": 0, "llm": 0, "tokens_saved": 0, "llm_calls": 0, "llm_seconds": 0.0}
+
+def choose_route(rules: Dict[str, Any], text_content: str) -> str:
+    """
+    Decide whether a routed rules result stands ("rules") or the LLM is needed ("llm")
+    Records the decision in the result's "routing" and in routing_stats(),
+    and logs it with the LLM tokens, cost and time it saves.
+    """
+    routing = rules.get("routing")
+    if routing is None or rules.get("status") == "error":
+        return "llm"
+    route = "rules" if routing["confidence"] >= ROUTING_CONFIDENCE_THRESHOLD else "llm"
+    routing["route"] = route
+    _routing_stats[route] += 1
+    if route == "llm":
+        logger.info(f"Routing to LLM: rules confidence {routing['confidence']:.2f} < {ROUTING_CONFIDENCE_THRESHOLD} "
+                    f"({routing['metric_types']} metric types, {routing['ambiguous_terms']} ambiguous terms, "
+                    f"{routing['chars']} chars)")
+        return route
 
-def analyze_with_rules(text_content: str, report_type: str) -> Dict[str, Any]:
+    tokens = estimate_llm_tokens(text_content)
+    _routing_stats["tokens_saved"] += tokens
+    latency = _average_llm_latency()
+    saved = f"~{latency:.1f}s" if latency is not None else "unknown time"
+    logger.info(f"Routing to rules: confidence {routing['confidence']:.2f} >= {ROUTING_CONFIDENCE_THRESHOLD}; "
+                f"saved ~{tokens} tokens (${tokens / 1000 * LLM_COST_PER_1K_TOKENS:.4f}) and {saved}")
+    return route
+
+def estimate_llm_tokens(text_content: str) -> int:
+    """Prompt plus output tokens an LLM analysis of the text would use, roughly"""
+    text_tokens = count_tokens(text_content)
+    chunks = max(1, math.ceil(text_tokens / max(1, LLM_CHUNK_TOKENS)))
+    overhead = count_tokens(SYSTEM_PROMPT + create_analysis_prompt("", "general"))
+    output = LLM_MAX_OUTPUT_TOKENS if chunks == 1 else LLM_CHUNK_OUTPUT_TOKENS * chunks
+    tokens = text_tokens + overhead * chunks + output
+    return min(tokens, LLM_TOKEN_BUDGET) if LLM_TOKEN_BUDGET else tokens
+
+def _record_llm_latency(seconds: float) -> None:
+    _routing_stats["llm_calls"] += 1
+    _routing_stats["llm_seconds"] += seconds
+
+def _average_llm_latency() -> Optional[float]:
+    calls = _routing_stats["llm_calls"]
+    return _routing_stats["llm_seconds"] / calls if calls else None
+
+def routing_stats() -> Dict[str, Any]:
+    """Routing decisions so far and the estimated LLM tokens, cost and time they saved"""
+    latency = _average_llm_latency()
+    decisions = _routing_stats["rules"] + _routing_stats["llm"]
+    return {
+        "routed_to_rules": _routing_stats["rules"],
+        "routed_to_llm": _routing_stats["llm"],
+        "rules_share": _routing_stats["rules"] / decisions if decisions else None,
+        "tokens_saved": _routing_stats["tokens_saved"],
+        "cost_saved": round(_routing_stats["tokens_saved"] / 1000 * LLM_COST_PER_1K_TOKENS, 4),
+        "average_llm_seconds": latency,
+        "seconds_saved": latency * _routing_stats["rules"] if latency is not None else None
+    }
+
+def analyze_with_rules(text_content: str, report_type: str,
+                       scan: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Rule-based analysis for medical reports
     This provides a fallback when AI services are unavailable
@@ -77,12 +460,11 @@ def analyze_with_rules(text_content: str, report_type: str) -> Dict[str, Any]:
             "confidence_score": 0.7
         }
         
-        text_lower = text_content.lower()
-        
-        # Extract key metrics
-        glucose_values = extract_glucose_values(text_content)
-        blood_pressure = extract_blood_pressure(text_content)
-        hba1c_values = extract_hba1c_values(text_content)
+        # Extract key metrics and terms in a single pass
+        scan = scan or scan_report(text_content)
+        glucose_values = scan["glucose_values"]
+        blood_pressure = scan["blood_pressure"]
+        hba1c_values = scan["hba1c_values"]
         
         # Analyze glucose levels
         glucose_analysis = analyze_glucose_levels(glucose_values)
@@ -91,7 +473,7 @@ def analyze_with_rules(text_content: str, report_type: str) -> Dict[str, Any]:
         hba1c_analysis = analyze_hba1c_levels(hba1c_values)
         
         # Calculate risk score
-        risk_score = calculate_risk_score(glucose_values, hba1c_values, blood_pressure, text_lower)
+        risk_score = calculate_risk_score(glucose_values, hba1c_values, blood_pressure, scan=scan)
         
         # Generate summary
         summary_parts = []
@@ -104,9 +486,9 @@ def analyze_with_rules(text_content: str, report_type: str) -> Dict[str, Any]:
         
         analysis["summary"] = ". ".join(summary_parts) if summary_parts else "Medical report analyzed"
         analysis["risk_score"] = risk_score
-        analysis["key_findings"] = extract_key_findings(text_content, glucose_values, hba1c_values)
+        analysis["key_findings"] = extract_key_findings(text_content, glucose_values, hba1c_values, scan=scan)
         analysis["recommendations"] = generate_recommendations(risk_score, glucose_values, hba1c_values)
-        analysis["concerns"] = identify_concerns(text_content, risk_score)
+        analysis["concerns"] = identify_concerns(text_content, risk_score, scan=scan)
         
         return analysis
         
@@ -114,61 +496,218 @@ def analyze_with_rules(text_content: str, report_type: str) -> Dict[str, Any]:
         logger.error(f"Error in rules-based analysis: {str(e)}")
         return create_error_analysis(str(e))
 
-def extract_glucose_values(text: str) -> List[float]:
-    """Extract glucose values from text"""
-    glucose_pattern = r'glucose[:\s]*(\d+(?:\.\d+)?)\s*(?:mg/dl|mmol/l)?'
-    blood_sugar_pattern = r'blood\s+sugar[:\s]*(\d+(?:\.\d+)?)\s*(?:mg/dl|mmol/l)?'
+# Single-pass report scanner
+#
+# The rule-based analysis reads every value and term from one scan of the
+# lowercased text. Vocabulary terms (app.utils.vocabulary) are found by the
+# shared keyword automaton. Measurements and the concern patterns that need a
+# regex go through one scanner regex: each pattern is anchored on the rarest
+# character of its leading literal, with one branch per anchor character, the
+# text before the anchor checked by a lookbehind and the rest by a lookahead.
+# A hit therefore consumes only the anchor, so overlapping patterns
+# ("hba1c" / "a1c") are all seen. Blood pressure readings are anchored on the
+# "/" and resolved in Python.
+
+NUMBER_PATTERN = r'\d+(?:\.\d+)?'
+
+MEASUREMENT_PATTERNS = {
+    'glucose': r'glucose[:\s]*(?P<glucose_value>' + NUMBER_PATTERN + r')\s*(?:mg/dl|mmol/l)?',
+    'blood_sugar': r'blood\s+sugar[:\s]*(?P<blood_sugar_value>' + NUMBER_PATTERN + r')\s*(?:mg/dl|mmol/l)?',
+    'a1c': r'a1c[:\s]*(?P<a1c_value>' + NUMBER_PATTERN + r')\s*%?'
+}
+
+# Concern patterns that are more than a literal term; the literal ones are in CONCERN_TERMS
+CONCERN_PATTERNS = {
+    "Severe hypoglycemia": ['severe.*hypoglycemia'],
+    "Medication adherence issues": ['missed.*medication', 'forgot.*insulin']
+}
+
+# Terms whose meaning a cue can flip; medication and report-type words are not among them
+_CLINICAL_TERMS = set(RISK_KEYWORDS).union(
+    *FINDING_TERMS.values(), *CONCERN_TERMS.values(), *CONCERN_PATTERNS.values()
+)
+
+_LITERAL_RUN = re.compile(r'[a-z0-9 ]*')
+
+def _letter_rank(char: str) -> int:
+    """Rough frequency rank of a character in English text (lower is more common)"""
+    return "etaoinshrdlcumwfgypbvkjxqz".find(char)
+
+def _build_scanner() -> tuple:
+    """
+    Compile the scanner regex
+    Returns the regex, the keyword group name -> pattern map, each group's
+    anchor offset, and per group the later patterns on the same anchor that
+    could match at the same position.
+    """
+    keyword_patterns = [pattern for patterns in CONCERN_PATTERNS.values() for pattern in patterns]
+    keyword_groups = {f"k{index}": pattern for index, pattern in enumerate(keyword_patterns)}
+    patterns = {**MEASUREMENT_PATTERNS, **keyword_groups}
     
-    values = []
+    literals = {}
+    offsets = {}
+    by_anchor: Dict[str, List[str]] = {}
+    for name, pattern in patterns.items():
+        literal = _LITERAL_RUN.match(pattern).group()
+        offset = max(range(len(literal)), key=lambda index: (_letter_rank(literal[index]), -index))
+        literals[name], offsets[name] = literal, offset
+        by_anchor.setdefault(literal[offset], []).append(name)
     
-    # Find glucose mentions
-    for pattern in [glucose_pattern, blood_sugar_pattern]:
-        matches = re.findall(pattern, text.lower())
-        for match in matches:
-            try:
-                value = float(match)
-                if 50 <= value <= 500:  # Reasonable glucose range
-                    values.append(value)
-            except ValueError:
-                continue
+    def could_overlap(a: str, b: str) -> bool:
+        """Whether a and b agree on every literal character when their anchors align"""
+        la, oa, lb, ob = literals[a], offsets[a], literals[b], offsets[b]
+        return all(la[oa + d] == lb[ob + d] for d in range(-min(oa, ob), min(len(la) - oa, len(lb) - ob)))
+    
+    # Branches start with their anchor literal so the regex engine can skip to
+    # candidate characters; common characters go first since branches are
+    # tried in order.
+    branches = ['/']
+    siblings = {}
+    for char in sorted(by_anchor, key=_letter_rank):
+        names = by_anchor[char]
+        branches.append(re.escape(char) + '(?:' + '|'.join(
+            (f"(?<={re.escape(literals[name][:offsets[name] + 1])})" if offsets[name] else '')
+            + f"(?=(?P<{name}>{patterns[name][offsets[name] + 1:]}))"
+            for name in names
+        ) + ')')
+        # Only the first matching alternative is reported at a position
+        for index, name in enumerate(names):
+            overlapping = [other for other in names[index + 1:] if could_overlap(name, other)]
+            if overlapping:
+                siblings[name] = [(other, re.compile(patterns[other])) for other in overlapping]
     
-    return list(set(values))  # Remove duplicates
+    return re.compile('|'.join(branches)), keyword_groups, offsets, siblings
 
-def extract_hba1c_values(text: str) -> List[float]:
-    """Extract HbA1c values from text"""
-    hba1c_pattern = r'hba1c[:\s]*(\d+(?:\.\d+)?)\s*%?'
-    a1c_pattern = r'a1c[:\s]*(\d+(?:\.\d+)?)\s*%?'
+_SCANNER, _KEYWORD_GROUPS, _ANCHOR_OFFSETS, _ANCHOR_SIBLINGS = _build_scanner()
+
+def scan_report(text: str) -> Dict[str, Any]:
+    """
+    Scan report text once for everything the rule-based analysis uses
+    Returns glucose and HbA1c values, the first plausible blood pressure, hit
+    spans and counts per vocabulary term and concern pattern, finding-term matches per
+    category and the concern types present. Results are identical to running
+    each pattern separately with re.findall / re.search.
+    """
+    text_lower = text.lower()
+    keyword_hits = _vocabulary_hits(text_lower)
+    scan = _scan_patterns(text_lower)
+    keyword_hits.update(scan.pop("pattern_hits"))
     
-    values = []
+    scan["keyword_hits"] = keyword_hits
+    scan["keyword_counts"] = {pattern: len(hits) for pattern, hits in keyword_hits.items()}
+    scan["findings"] = {
+        category: findall_terms(keyword_hits, terms)
+        for category, terms in FINDING_TERMS.items()
+    }
+    scan["concerns"] = [
+        concern_type for concern_type, terms in CONCERN_TERMS.items()
+        if any(term in keyword_hits for term in terms + CONCERN_PATTERNS.get(concern_type, []))
+    ]
+    return scan
+
+def _scan_patterns(text_lower: str) -> Dict[str, Any]:
+    """
+    The scanner regex part of scan_report
+    Returns glucose and HbA1c values, the first plausible blood pressure and
+    the (start, end) spans of each CONCERN_PATTERNS pattern found.
+    """
+    measurements: Dict[str, List[str]] = {'glucose': [], 'blood_sugar': [], 'hba1c': [], 'a1c': []}
+    pattern_hits: Dict[str, List[tuple]] = {}
+    blood_pressure = None
+    # End of the last accepted match per pattern, to reproduce findall's non-overlapping matches
+    match_ends: Dict[str, int] = {}
     
-    for pattern in [hba1c_pattern, a1c_pattern]:
-        matches = re.findall(pattern, text.lower())
-        for match in matches:
-            try:
-                value = float(match)
-                if 4.0 <= value <= 15.0:  # Reasonable HbA1c range
-                    values.append(value)
-            except ValueError:
-                continue
+    def record(group: str, start: int, end: int, match) -> None:
+        pattern = _KEYWORD_GROUPS.get(group)
+        if pattern is not None:
+            pattern_hits.setdefault(pattern, []).append((start, end))
+            return
+        if start >= match_ends.get(group, 0):
+            measurements[group].append(match.group(group + '_value'))
+            match_ends[group] = end
+        if group == 'a1c' and start >= 2 and text_lower[start - 2:start] == 'hb' \
+                and start - 2 >= match_ends.get('hba1c', 0):
+            measurements['hba1c'].append(match.group('a1c_value'))
+            match_ends['hba1c'] = end
     
-    return list(set(values))
-
-def extract_blood_pressure(text: str) -> Optional[tuple]:
-    """Extract blood pressure readings"""
-    bp_pattern = r'(\d{2,3})/(\d{2,3})\s*(?:mmhg)?'
+    for match in _SCANNER.finditer(text_lower):
+        group = match.lastgroup
+        anchor = match.start()
+        
+        if group is None:
+            # Bare "/" branch
+            if blood_pressure is None:
+                blood_pressure = _blood_pressure_at(text_lower, anchor, match_ends)
+            continue
+        
+        record(group, anchor - _ANCHOR_OFFSETS[group], match.end(group), match)
+        for sibling, sibling_re in _ANCHOR_SIBLINGS.get(group, ()):
+            start = anchor - _ANCHOR_OFFSETS[sibling]
+            sibling_match = sibling_re.match(text_lower, start) if start >= 0 else None
+            if sibling_match:
+                record(sibling, start, sibling_match.end(), sibling_match)
     
-    matches = re.findall(bp_pattern, text.lower())
+    return {
+        "glucose_values": _unique_in_range(measurements['glucose'] + measurements['blood_sugar'], 50, 500),
+        "hba1c_values": _unique_in_range(measurements['hba1c'] + measurements['a1c'], 4.0, 15.0),
+        "blood_pressure": blood_pressure,
+        "pattern_hits": pattern_hits
+    }
+
+def _vocabulary_hits(text_lower: str) -> Dict[str, List[tuple]]:
+    """(start, end) spans of every vocabulary term occurrence, by term"""
+    hits: Dict[str, List[tuple]] = {}
+    for start, end, term in get_vocabulary_automaton().iter_matches(text_lower):
+        hits.setdefault(term, []).append((start, end))
+    return hits
+
+def _unique_in_range(matches: List[str], low: float, high: float) -> List[float]:
+    values = []
     for match in matches:
         try:
-            systolic = int(match[0])
-            diastolic = int(match[1])
-            if 80 <= systolic <= 250 and 40 <= diastolic <= 150:
-                return (systolic, diastolic)
+            value = float(match)
+            if low <= value <= high:
+                values.append(value)
         except ValueError:
             continue
+    return list(set(values))
+
+def _blood_pressure_at(text: str, slash: int, match_ends: Dict[str, int]) -> Optional[tuple]:
+    """
+    Resolve a blood pressure reading around the "/" at ``slash``
+    Mirrors re.findall(r'(\d{2,3})/(\d{2,3})'): the reading starts at the
+    leftmost position, at or after the previous reading, that is followed by
+    two or three digits and the slash. Returns it if plausible.
+    """
+    digits_after = 0
+    while digits_after < 3 and slash + 1 + digits_after < len(text) and text[slash + 1 + digits_after].isdecimal():
+        digits_after += 1
+    if digits_after < 2:
+        return None
     
+    for width in (3, 2):
+        start = slash - width
+        if start >= match_ends.get('blood_pressure', 0) and text[start:slash].isdecimal():
+            match_ends['blood_pressure'] = slash + 1 + digits_after
+            systolic = int(text[start:slash])
+            diastolic = int(text[slash + 1:slash + 1 + digits_after])
+            if 80 <= systolic <= 250 and 40 <= diastolic <= 150:
+                return (systolic, diastolic)
+            return None
     return None
 
+def extract_glucose_values(text: str) -> List[float]:
+    """Extract glucose values from text"""
+    return scan_report(text)["glucose_values"]
+
+def extract_hba1c_values(text: str) -> List[float]:
+    """Extract HbA1c values from text"""
+    return scan_report(text)["hba1c_values"]
+
+def extract_blood_pressure(text: str) -> Optional[tuple]:
+    """Extract blood pressure readings"""
+    return scan_report(text)["blood_pressure"]
+
 def analyze_glucose_levels(glucose_values: List[float]) -> Dict[str, Any]:
     """Analyze glucose level patterns"""
     if not glucose_values:
@@ -206,8 +745,9 @@ def analyze_hba1c_levels(hba1c_values: List[float]) -> Dict[str, Any]:
     }
 
 def calculate_risk_score(glucose_values: List[float], hba1c_values: List[float], 
-                        blood_pressure: Optional[tuple], text_lower: str) -> float:
-    """Calculate overall diabetes risk score (0-10)"""
+                        blood_pressure: Optional[tuple], text_lower: str = "",
+                        scan: Optional[Dict[str, Any]] = None) -> float:
+    """Calculate overall diabetes risk score (0-10); pass ``scan`` to reuse a scan_report result"""
     risk_score = 0.0
     
     # Glucose-based risk
@@ -235,19 +775,16 @@ def calculate_risk_score(glucose_values: List[float], hba1c_values: List[float],
             risk_score += 1.0
     
     # Text-based risk factors
-    risk_keywords = [
-        'complications', 'neuropathy', 'retinopathy', 'nephropathy',
-        'ketones', 'ketoacidosis', 'hypoglycemia', 'hyperglycemia'
-    ]
-    
-    for keyword in risk_keywords:
-        if keyword in text_lower:
+    keyword_counts = scan["keyword_counts"] if scan else get_vocabulary_automaton().count_terms(text_lower)
+    for keyword in RISK_KEYWORDS:
+        if keyword in keyword_counts:
             risk_score += 0.5
     
     return min(risk_score, 10.0)  # Cap at 10
 
-def extract_key_findings(text: str, glucose_values: List[float], hba1c_values: List[float]) -> List[str]:
-    """Extract key medical findings"""
+def extract_key_findings(text: str, glucose_values: List[float], hba1c_values: List[float],
+                         scan: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Extract key medical findings; pass ``scan`` to reuse a scan_report result"""
     findings = []
     
     if glucose_values:
@@ -263,95 +800,96 @@ def extract_key_findings(text: str, glucose_values: List[float], hba1c_values: L
         findings.append(f"HbA1c level: {latest_hba1c}%")
     
     # Look for specific medical terms
-    medical_terms = {
-        'medication': r'(metformin|insulin|glipizide|glyburide)',
-        'complications': r'(neuropathy|retinopathy|nephropathy)',
-        'symptoms': r'(polyuria|polydipsia|polyphagia|fatigue)'
-    }
-    
-    text_lower = text.lower()
-    for category, pattern in medical_terms.items():
-        matches = re.findall(pattern, text_lower)
+    findings_by_category = (scan or scan_report(text))["findings"]
+    for category, matches in findings_by_category.items():
         if matches:
             findings.append(f"{category.title()}: {', '.join(set(matches))}")
     
     return findings[:5]  # Limit to 5 key findings
 
-def generate_recommendations(risk_score: float, glucose_values: List[float], 
-                           hba1c_values: List[float]) -> List[str]:
-    """Generate personalized recommendations"""
-    recommendations = []
-    
-    if risk_score > 5:
-        recommendations.append("Schedule an immediate consultation with your healthcare provider")
-        recommendations.append("Consider more frequent glucose monitoring")
+# Recommendation rules, in output order: (condition, text). Conditions are
+# computed by recommendation_conditions; the general advice fills in when
+# fewer than three rules apply.
+RECOMMENDATION_RULES = [
+    ("high_risk", "Schedule an immediate consultation with your healthcare provider"),
+    ("high_risk", "Consider more frequent glucose monitoring"),
+    ("glucose_very_high", "Review your medication dosage with your doctor"),
+    ("glucose_very_high", "Focus on dietary modifications to reduce post-meal spikes"),
+    ("glucose_high", "Monitor carbohydrate intake more closely"),
+    ("glucose_high", "Consider increasing physical activity"),
+    ("frequent_high_readings", "Identify and avoid triggers for high glucose readings"),
+    ("hba1c_very_high", "Your diabetes management plan needs immediate adjustment"),
+    ("hba1c_very_high", "Discuss intensifying treatment with your healthcare team"),
+    ("hba1c_high", "Work on improving glucose control to reach target HbA1c")
+]
+
+GENERAL_RECOMMENDATIONS = [
+    "Maintain regular blood glucose monitoring",
+    "Follow a balanced, diabetes-friendly diet",
+    "Engage in regular physical exercise as approved by your doctor",
+    "Take medications as prescribed",
+    "Keep regular appointments with your healthcare team"
+]
+
+MAX_RECOMMENDATIONS = 6
+
+def recommendation_conditions(risk_score: float, glucose_values: List[float],
+                              hba1c_values: List[float]) -> Dict[str, bool]:
+    """Which RECOMMENDATION_RULES conditions hold"""
+    conditions = dict.fromkeys((condition for condition, _ in RECOMMENDATION_RULES), False)
+    conditions["high_risk"] = risk_score > 5
     
     if glucose_values:
         avg_glucose = sum(glucose_values) / len(glucose_values)
         high_readings = [v for v in glucose_values if v > 180]
-        
-        if avg_glucose > 180:
-            recommendations.append("Review your medication dosage with your doctor")
-            recommendations.append("Focus on dietary modifications to reduce post-meal spikes")
-        elif avg_glucose > 140:
-            recommendations.append("Monitor carbohydrate intake more closely")
-            recommendations.append("Consider increasing physical activity")
-        
-        if high_readings and len(high_readings) > len(glucose_values) * 0.3:
-            recommendations.append("Identify and avoid triggers for high glucose readings")
+        conditions["glucose_very_high"] = avg_glucose > 180
+        conditions["glucose_high"] = 140 < avg_glucose <= 180
+        conditions["frequent_high_readings"] = len(high_readings) > len(glucose_values) * 0.3
     
     if hba1c_values:
         latest_hba1c = hba1c_values[-1]
-        if latest_hba1c > 8.0:
-            recommendations.append("Your diabetes management plan needs immediate adjustment")
-            recommendations.append("Discuss intensifying treatment with your healthcare team")
-        elif latest_hba1c > 7.0:
-            recommendations.append("Work on improving glucose control to reach target HbA1c")
+        conditions["hba1c_very_high"] = latest_hba1c > 8.0
+        conditions["hba1c_high"] = 7.0 < latest_hba1c <= 8.0
+    
+    return conditions
+
+def generate_recommendations(risk_score: float, glucose_values: List[float], 
+                           hba1c_values: List[float]) -> List[str]:
+    """Generate personalized recommendations"""
+    conditions = recommendation_conditions(risk_score, glucose_values, hba1c_values)
+    recommendations = [text for condition, text in RECOMMENDATION_RULES if conditions[condition]]
     
     # General recommendations
-    if not recommendations or len(recommendations) < 3:
-        recommendations.extend([
-            "Maintain regular blood glucose monitoring",
-            "Follow a balanced, diabetes-friendly diet",
-            "Engage in regular physical exercise as approved by your doctor",
-            "Take medications as prescribed",
-            "Keep regular appointments with your healthcare team"
-        ])
-    
-    return recommendations[:6]  # Limit to 6 recommendations
-
-def identify_concerns(text: str, risk_score: float) -> List[str]:
-    """Identify potential health concerns"""
+    if len(recommendations) < 3:
+        recommendations.extend(GENERAL_RECOMMENDATIONS)
+    
+    return recommendations[:MAX_RECOMMENDATIONS]
+
+def identify_concerns(text: str, risk_score: float, scan: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Identify potential health concerns; pass ``scan`` to reuse a scan_report result"""
     concerns = []
-    text_lower = text.lower()
     
     # High-risk indicators
     if risk_score > 7:
         concerns.append("High risk score indicates need for immediate medical attention")
     
-    # Specific concern keywords
-    concern_patterns = {
-        "Diabetic complications": r'(neuropathy|retinopathy|nephropathy|foot ulcer)',
-        "Severe hypoglycemia": r'(severe.*hypoglycemia|unconscious|seizure)',
-        "Ketoacidosis risk": r'(ketones|ketoacidosis|dka)',
-        "Cardiovascular risk": r'(chest pain|heart|cardiac|stroke)',
-        "Infection risk": r'(infection|wound|slow healing)'
-    }
-    
-    for concern_type, pattern in concern_patterns.items():
-        if re.search(pattern, text_lower):
-            concerns.append(concern_type)
-    
-    # Medication concerns
-    if re.search(r'(missed.*medication|forgot.*insulin|ran out)', text_lower):
-        concerns.append("Medication adherence issues")
+    # Specific concern keywords, including medication adherence
+    concerns.extend((scan or scan_report(text))["concerns"])
     
     return concerns[:4]  # Limit to 4 main concerns
 
-def create_analysis_prompt(text_content: str, report_type: str) -> str:
-    """Create a structured prompt for AI analysis"""
+def create_analysis_prompt(text_content: str, report_type: str, section: Optional[tuple] = None) -> str:
+    """
+    Create a structured prompt for AI analysis
+    ``section`` is ``(number, total)`` when the content is one chunk of a longer report.
+    """
+    if section:
+        scope = (f"section {section[0]} of {section[1]} of a longer medical report; "
+                 f"analyze only what this section contains")
+    else:
+        scope = "medical report"
     prompt = f"""
-    Please analyze the following medical report and provide insights:
+    Please analyze the following {scope} and provide insights:
 
     Report Type: {report_type}
     Content: {text_content}
@@ -451,19 +989,11 @@ def detect_medication_mentions(text: str) -> List[Dict[str, str]]:
     """Detect medication mentions in text"""
     medications = []
     
-    # Common diabetes medications
-    med_patterns = {
-        'Metformin': r'metformin',
-        'Insulin': r'insulin|novolog|humalog|lantus|levemir',
-        'Sulfonylureas': r'glipizide|glyburide|glimepiride',
-        'DPP-4 inhibitors': r'sitagliptin|saxagliptin|linagliptin',
-        'GLP-1 agonists': r'exenatide|liraglutide|dulaglutide',
-        'SGLT2 inhibitors': r'dapagliflozin|empagliflozin|canagliflozin'
-    }
-    
+    # Common diabetes medications, found in one pass of the vocabulary automaton
     text_lower = text.lower()
-    for med_class, pattern in med_patterns.items():
-        matches = re.findall(pattern, text_lower)
+    hits = _vocabulary_hits(text_lower)
+    for med_class, terms in MEDICATION_CLASSES.items():
+        matches = findall_terms(hits, terms)
         if matches:
             medications.append({
                 "class": med_class,
@@ -472,75 +1002,258 @@ def detect_medication_mentions(text: str) -> List[Dict[str, str]]:
     
     return medications
 
-def calculate_glucose_variability(glucose_values: List[float]) -> Dict[str, float]:
-    """Calculate glucose variability metrics"""
-    if len(glucose_values) < 2:
-        return {"status": "insufficient_data"} # type: ignore
+def calculate_glucose_variability(glucose_values: Iterable[float]) -> Dict[str, float]:
+    """Calculate glucose variability metrics in one pass; see RunningStats"""
+    stats = RunningStats()
+    stats.extend(glucose_values)
+    return stats.variability() # type: ignore
+
+def assess_time_in_range(glucose_values: Iterable[float]) -> Dict[str, Any]:
+    """Assess time in target glucose range in one pass; see RangeCounter"""
+    counter = RangeCounter()
+    counter.extend(glucose_values)
+    return counter.time_in_range()
+
+def generate_trend_analysis(values: Iterable[float], timestamps: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Generate trend analysis for glucose or other values in one pass; see TrendAccumulator"""
+    trend = TrendAccumulator()
+    trend.extend(values)
+    return trend.trend()
+
+# Batch analysis
+#
+# analyze_reports_batch runs the rule-based analysis over many reports and
+# returns columns instead of one dict per report. The keyword automaton makes
+# one pass over the whole corpus (reports joined by newlines, which no
+# vocabulary term contains) and its hits become arrays; the scanner regex still
+# runs per report. Everything after that (statistics, risk score, concern and
+# recommendation rules) is computed over arrays, with readings held in
+# NaN-padded (reports x readings) matrices.
+
+CONCERN_TYPES = list(CONCERN_TERMS)
+
+def _padded(rows: List[List[float]]) -> tuple:
+    """NaN-padded matrix of ragged rows, and the row lengths"""
+    counts = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+    matrix = np.full((len(rows), max(counts.max(initial=0), 1)), np.nan)
+    matrix[np.arange(matrix.shape[1]) < counts[:, None]] = [value for row in rows for value in row]
+    return matrix, counts
+
+def _row_sums(matrix: np.ndarray) -> np.ndarray:
+    """
+    Row sums of a NaN-padded matrix, added left to right the way the builtin
+    sum() adds floats (with Neumaier compensation from Python 3.12), so means
+    match the scalar helpers bit for bit
+    """
+    total = np.zeros(matrix.shape[0])
+    compensation = np.zeros(matrix.shape[0])
+    for column in np.nan_to_num(matrix, nan=0.0).T:
+        added = total + column
+        if sys.version_info >= (3, 12):
+            compensation += np.where(np.abs(total) >= np.abs(column),
+                                     (total - added) + column, (column - added) + total)
+        total = added
+    return total + compensation
+
+def _row_m2(matrix: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Sums of squared deviations from the mean of each NaN-padded row, by the
+    Welford recurrence RunningStats.add uses, so standard deviations match
+    the scalar helpers bit for bit
+    """
+    mean = np.zeros(matrix.shape[0])
+    m2 = np.zeros(matrix.shape[0])
+    for index, column in enumerate(matrix.T):
+        active = index < counts
+        delta = np.where(active, column - mean, 0.0)
+        mean = mean + delta / (index + 1)
+        m2 = m2 + delta * np.where(active, column - mean, 0.0)
+    return m2
+
+def _row_extreme(matrix: np.ndarray, counts: np.ndarray, reduce) -> np.ndarray:
+    """np.fmin / np.fmax over each NaN-padded row, NaN for empty rows"""
+    return np.where(counts > 0, reduce.reduce(matrix, axis=1), np.nan)
+
+def analyze_reports_batch(texts: List[str]) -> Dict[str, Any]:
+    """
+    Rule-based analysis of many reports, as columns
+    Arrays have one entry per report, NaN where a report has no readings:
+        risk_score, glucose_count, glucose_mean, glucose_min, glucose_max,
+        glucose_high_count, glucose_low_count, glucose_std, glucose_cv (NaN
+        under two readings), time_in_range / time_below_range /
+        time_above_range (percent, unrounded), hba1c_count, hba1c_max,
+        hba1c_latest, systolic / diastolic (0 when no reading),
+        needs_attention (risk score above 7), concerns (bool, reports x
+        CONCERN_TYPES), findings (bool, reports x FINDING_TERMS categories)
+        and recommendations (bool, reports x RECOMMENDATION_RULES then
+        GENERAL_RECOMMENDATIONS).
+    Rounding the statistics as calculate_glucose_variability and
+    assess_time_in_range do gives their results exactly. The per-report
+    value lists, keyword hits and errors are kept alongside, and
+    analysis_from_batch rebuilds analyze_with_rules' result for any report.
+    """
+    automaton = get_vocabulary_automaton()
+    terms = automaton.terms
+    term_ids = {term: index for index, term in enumerate(terms)}
     
-    # Calculate standard deviation
-    mean_glucose = sum(glucose_values) / len(glucose_values)
-    variance = sum((x - mean_glucose) ** 2 for x in glucose_values) / len(glucose_values)
-    std_dev = variance ** 0.5
+    lowered: List[str] = []
+    scans: List[Dict[str, Any]] = []
+    errors: List[Optional[str]] = []
+    for text in texts:
+        try:
+            text_lower = text.lower()
+            scans.append(_scan_patterns(text_lower))
+            lowered.append(text_lower)
+            errors.append(None)
+        except Exception as e:
+            logger.error(f"Error in rules-based analysis: {str(e)}")
+            scans.append({"glucose_values": [], "hba1c_values": [], "blood_pressure": None, "pattern_hits": {}})
+            lowered.append("")
+            errors.append(str(e))
+    count = len(scans)
     
-    # Calculate coefficient of variation
-    cv = (std_dev / mean_glucose) * 100 if mean_glucose > 0 else 0
+    # One automaton pass over the corpus; hits are mapped back to reports by offset
+    offsets = np.cumsum([0] + [len(text_lower) + 1 for text_lower in lowered])[:-1]
+    hit_array = automaton.hit_array("\n".join(lowered))
+    hit_reports = np.searchsorted(offsets, hit_array[:, 0], side="right") - 1
+    order = np.argsort(hit_reports, kind="stable")
+    hit_reports, hit_array = hit_reports[order], hit_array[order]
+    hit_array[:, :2] -= offsets[hit_reports][:, None]
+    present = np.zeros((count, len(terms)), dtype=bool)
+    present[hit_reports, hit_array[:, 2]] = True
     
-    return {
-        "standard_deviation": round(std_dev, 2),
-        "coefficient_of_variation": round(cv, 2),
-        "mean": round(mean_glucose, 2),
-        "min": min(glucose_values),
-        "max": max(glucose_values)
-    }
-
-def assess_time_in_range(glucose_values: List[float]) -> Dict[str, Any]:
-    """Assess time in target glucose range"""
-    if not glucose_values:
-        return {"status": "no_data"}
+    def any_term(names: List[str]) -> np.ndarray:
+        return present[:, [term_ids[name] for name in names]].any(axis=1)
     
-    target_range = (70, 180)  # mg/dL
-    in_range = [v for v in glucose_values if target_range[0] <= v <= target_range[1]]
-    below_range = [v for v in glucose_values if v < target_range[0]]
-    above_range = [v for v in glucose_values if v > target_range[1]]
+    glucose_values = [scan["glucose_values"] for scan in scans]
+    hba1c_values = [scan["hba1c_values"] for scan in scans]
+    glucose, glucose_count = _padded(glucose_values)
+    hba1c, hba1c_count = _padded(hba1c_values)
+    has_glucose = glucose_count > 0
     
-    total = len(glucose_values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        glucose_mean = np.where(has_glucose, _row_sums(glucose) / glucose_count, np.nan)
+        glucose_std = np.where(glucose_count >= 2, np.sqrt(_row_m2(glucose, glucose_count) / glucose_count), np.nan)
+        glucose_cv = np.where(glucose_count < 2, np.nan, np.where(glucose_mean > 0, glucose_std / glucose_mean * 100, 0.0))
+        in_range_count = ((glucose >= TARGET_RANGE[0]) & (glucose <= TARGET_RANGE[1])).sum(axis=1)
+        high_count = (glucose > TARGET_RANGE[1]).sum(axis=1)
+        low_count = (glucose < TARGET_RANGE[0]).sum(axis=1)
+        time_in_range = np.where(has_glucose, in_range_count / glucose_count * 100, np.nan)
+        time_below_range = np.where(has_glucose, low_count / glucose_count * 100, np.nan)
+        time_above_range = np.where(has_glucose, high_count / glucose_count * 100, np.nan)
+    
+    hba1c_max = _row_extreme(hba1c, hba1c_count, np.fmax)
+    hba1c_latest = hba1c[np.arange(count), np.maximum(hba1c_count - 1, 0)]
+    blood_pressure = np.array([scan["blood_pressure"] or (0, 0) for scan in scans], dtype=np.int64).reshape(-1, 2)
+    systolic, diastolic = blood_pressure[:, 0], blood_pressure[:, 1]
+    
+    # Same rules as calculate_risk_score; every term is a multiple of 0.5, so
+    # the total is exact whatever the order of addition
+    risk_score = np.minimum(
+        np.select([glucose_mean > 200, glucose_mean > 140, glucose_mean < 70], [3.0, 2.0, 1.5], 0.0)
+        + np.select([hba1c_max > 9.0, hba1c_max > 7.0], [3.0, 1.5], 0.0)
+        + np.where((systolic > 140) | (diastolic > 90), 1.0, 0.0)
+        + 0.5 * present[:, [term_ids[keyword] for keyword in RISK_KEYWORDS]].sum(axis=1),
+        10.0
+    )
+    
+    conditions = {
+        "high_risk": risk_score > 5,
+        "glucose_very_high": glucose_mean > 180,
+        "glucose_high": (glucose_mean > 140) & (glucose_mean <= 180),
+        "frequent_high_readings": high_count > glucose_count * 0.3,
+        "hba1c_very_high": hba1c_latest > 8.0,
+        "hba1c_high": (hba1c_latest > 7.0) & (hba1c_latest <= 8.0)
+    }
+    rules = np.column_stack([conditions[condition] for condition, _ in RECOMMENDATION_RULES])
+    general = rules.sum(axis=1) < 3
+    recommendations = np.column_stack([rules] + [general] * len(GENERAL_RECOMMENDATIONS))
+    recommendations &= np.cumsum(recommendations, axis=1) <= MAX_RECOMMENDATIONS
+    
+    concerns = np.column_stack([
+        any_term(CONCERN_TERMS[concern_type]) | np.array(
+            [any(pattern in scan["pattern_hits"] for pattern in CONCERN_PATTERNS.get(concern_type, [])) for scan in scans],
+            dtype=bool
+        )
+        for concern_type in CONCERN_TYPES
+    ]).reshape(count, len(CONCERN_TYPES))
     
     return {
-        "time_in_range_percent": round((len(in_range) / total) * 100, 1),
-        "time_below_range_percent": round((len(below_range) / total) * 100, 1),
-        "time_above_range_percent": round((len(above_range) / total) * 100, 1),
-        "target_range": target_range,
-        "total_readings": total
+        "count": count,
+        "risk_score": risk_score,
+        "glucose_count": glucose_count,
+        "glucose_mean": glucose_mean,
+        "glucose_min": _row_extreme(glucose, glucose_count, np.fmin),
+        "glucose_max": _row_extreme(glucose, glucose_count, np.fmax),
+        "glucose_high_count": high_count,
+        "glucose_low_count": low_count,
+        "glucose_std": glucose_std,
+        "glucose_cv": glucose_cv,
+        "time_in_range": time_in_range,
+        "time_below_range": time_below_range,
+        "time_above_range": time_above_range,
+        "hba1c_count": hba1c_count,
+        "hba1c_max": hba1c_max,
+        "hba1c_latest": hba1c_latest,
+        "systolic": systolic,
+        "diastolic": diastolic,
+        "needs_attention": risk_score > 7,
+        "concerns": concerns,
+        "findings": np.column_stack([any_term(names) for names in FINDING_TERMS.values()]).reshape(count, len(FINDING_TERMS)),
+        "recommendations": recommendations,
+        "glucose_values": glucose_values,
+        "hba1c_values": hba1c_values,
+        "terms": terms,
+        "keyword_hits": hit_array,
+        "keyword_hit_bounds": np.searchsorted(hit_reports, np.arange(count + 1)),
+        "errors": errors
     }
 
-def generate_trend_analysis(values: List[float], timestamps: Optional[List[str]] = None) -> Dict[str, Any]:
-    """Generate trend analysis for glucose or other values"""
-    if len(values) < 3:
-        return {"status": "insufficient_data"}
+def analysis_from_batch(batch: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """Rebuild analyze_with_rules' result for one report of an analyze_reports_batch result"""
+    if batch["errors"][index] is not None:
+        return create_error_analysis(batch["errors"][index])
     
-    # Simple trend calculation (slope of linear regression)
-    n = len(values)
-    x_values = list(range(n))
+    glucose_values = batch["glucose_values"][index]
+    hba1c_values = batch["hba1c_values"][index]
+    blood_pressure = (int(batch["systolic"][index]), int(batch["diastolic"][index])) \
+        if batch["systolic"][index] else None
     
-    # Calculate slope
-    sum_x = sum(x_values)
-    sum_y = sum(values)
-    sum_xy = sum(x * y for x, y in zip(x_values, values))
-    sum_x2 = sum(x * x for x in x_values)
+    summary_parts = []
+    if glucose_values:
+        summary_parts.append(f"Glucose readings: {len(glucose_values)} measurements found")
+    if hba1c_values:
+        summary_parts.append(f"HbA1c levels: {hba1c_values}")
+    if blood_pressure:
+        summary_parts.append(f"Blood pressure: {blood_pressure}")
     
-    slope = (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x * sum_x)
+    key_findings = []
+    if glucose_values:
+        key_findings.append(f"Average glucose level: {float(batch['glucose_mean'][index]):.1f} mg/dL")
+        if batch["glucose_high_count"][index]:
+            key_findings.append(f"{int(batch['glucose_high_count'][index])} elevated glucose readings detected")
+    if hba1c_values:
+        key_findings.append(f"HbA1c level: {hba1c_values[-1]}%")
     
-    # Determine trend direction
-    if slope > 1:
-        trend = "increasing"
-    elif slope < -1:
-        trend = "decreasing"
-    else:
-        trend = "stable"
+    first, last = batch["keyword_hit_bounds"][index:index + 2]
+    keyword_hits: Dict[str, List[tuple]] = {}
+    for start, end, term_id in batch["keyword_hits"][first:last].tolist():
+        keyword_hits.setdefault(batch["terms"][term_id], []).append((start, end))
+    for category, terms in FINDING_TERMS.items():
+        matches = findall_terms(keyword_hits, terms)
+        if matches:
+            key_findings.append(f"{category.title()}: {', '.join(set(matches))}")
+    
+    recommendation_texts = [text for _, text in RECOMMENDATION_RULES] + GENERAL_RECOMMENDATIONS
+    concerns = ["High risk score indicates need for immediate medical attention"] if batch["needs_attention"][index] else []
+    concerns.extend(concern_type for concern_type, flagged in zip(CONCERN_TYPES, batch["concerns"][index]) if flagged)
     
     return {
-        "trend_direction": trend,
-        "slope": round(slope, 3),
-        "recent_average": round(sum(values[-3:]) / 3, 1),
-        "overall_average": round(sum(values) / len(values), 1)
-    }
\ No newline at end of file
+        "summary": ". ".join(summary_parts) if summary_parts else "Medical report analyzed",
+        "risk_score": float(batch["risk_score"][index]),
+        "recommendations": [text for text, chosen in zip(recommendation_texts, batch["recommendations"][index]) if chosen],
+        "key_findings": key_findings[:5],
+        "concerns": concerns[:4],
+        "status": "completed",
+        "confidence_score": 0.7
+    }
@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Form, Query
+from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Form, Query, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import StreamingResponse
 from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import asyncio
+import functools
+import itertools
+import json
+import uuid
 import jwt
 import bcrypt
 import os
@@ -11,10 +17,29 @@ from pathlib import Path
 from app.models.schemas import (
     UserCreate, UserLogin, UserResponse, UserUpdate,
     ReportResponse, ReportCreate, DashboardData,
-    PopulationData, NotificationResponse
+    PopulationData, NotificationResponse, NotificationType, ReportStatus, ReportImportRequest
+)
+from app.utils.parse_report import parse_uploaded_file_with_metadata
+from app.ai_inference import (
+    analyze_report_content, analyze_report_content_async, analysis_version, assess_time_in_range,
+    calculate_glucose_variability, choose_route, llm_analysis, preferred_engine, routed_rules_analysis,
+    stream_report_analysis
+)
+from app.llm_client import LLMError, get_llm_client
+from app.workers import get_worker_pool, WorkerPoolBusy, WorkerTimeout
+from app.jobs import get_enrichment_runner, get_job_runner
+from app.importer import ReportImport
+from app.utils.storage import (
+    BlobStore, save_upload_stream, safe_filename, UploadTooLarge, UnsupportedFileType
+)
+from app.utils.analysis_cache import AnalysisCache, get_analysis_cache
+from app.utils.cgm_import import CGMExportParser
+from app.utils.glucose_store import get_glucose_store
+from app.utils.rollups import get_metric_rollups
+from app.config import (
+    ANALYSIS_CACHE_ENABLED, ANALYSIS_ROUTING_ENABLED, IMPORT_ROOT, JOB_LONG_POLL_MAX, MAX_BATCH_FILES,
+    MAX_UPLOAD_SIZE, PROGRESSIVE_ANALYSIS, UPLOAD_CHUNK_SIZE, UPLOAD_DIR
 )
-from app.utils.parse_report import parse_uploaded_file
-from app.ai_inference import analyze_report_content
 from app.database import get_db_connection  # You'll need to implement this
 
 # Create router
@@ -29,6 +54,15 @@ ALGORITHM = "HS256"
 mock_users = {}
 mock_reports = {}
 mock_notifications = {}
+mock_imports = {}
+
+# Report ids are never reused: jobs, blob references and rollups may still refer to a deleted report's id
+_report_ids = itertools.count(1)
+
+# Content-addressed storage for uploaded files
+blob_store = BlobStore(Path(UPLOAD_DIR) / "blobs")
+
+TERMINAL_STATUSES = {ReportStatus.ANALYZED.value, ReportStatus.ERROR.value}
 
 # Helper functions
 def hash_password(password: str) -> str:
@@ -43,6 +77,78 @@ def create_access_token(data: dict) -> str:
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+async def run_in_worker_pool(func, *args):
+    """Run a CPU-bound function in the worker pool, mapping pool errors to HTTP errors"""
+    try:
+        return await get_worker_pool().run(func, *args)
+    except WorkerPoolBusy:
+        raise HTTPException(status_code=503, detail="Server is busy processing reports, please retry shortly")
+    except WorkerTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+def is_reusable_analysis(analysis: dict) -> bool:
+    """
+    Whether an analysis is a real result worth keeping, not a placeholder,
+    an error, a rule-based stand-in for an LLM analysis that failed, or a
+    merge of chunk analyses some of which failed. Rules results that routing
+    judged confident enough are final.
+    """
+    return (analysis.get("status") not in ("pending", "error")
+            and (analysis.get("engine", preferred_engine()) == preferred_engine()
+                 or analysis.get("routing", {}).get("route") == "rules")
+            and not analysis.get("chunks", {}).get("failed"))
+
+async def analyze_text(text: str, report_type: str, run=run_in_worker_pool) -> dict:
+    """
+    Analyze extracted text through the analysis cache
+    Uses the LLM if one is configured, otherwise the rules via ``run``.
+    Identical text and report type under the same analysis version is only
+    analyzed once; concurrent requests for it share one computation.
+    """
+    if not ANALYSIS_CACHE_ENABLED:
+        return await analyze_report_content_async(text, report_type, run_rules=run)
+    key = AnalysisCache.make_key(text, report_type, analysis_version())
+    return await get_analysis_cache().get_or_compute(
+        key, lambda: analyze_report_content_async(text, report_type, run_rules=run),
+        cacheable=is_reusable_analysis
+    )
+
+async def enrich_text(text: str, report_type: str) -> dict:
+    """
+    LLM analysis of extracted text through the analysis cache, for upgrading
+    a provisional rules result; raises LLMError when the LLM is unavailable
+    """
+    if not ANALYSIS_CACHE_ENABLED:
+        return await llm_analysis(text, report_type)
+    key = AnalysisCache.make_key(text, report_type, analysis_version())
+    return await get_analysis_cache().get_or_compute(
+        key, lambda: llm_analysis(text, report_type), cacheable=is_reusable_analysis
+    )
+
+def cached_analysis(text: str, report_type: str) -> Optional[dict]:
+    """The cached analysis of ``text`` under the current analysis version, if any"""
+    if not ANALYSIS_CACHE_ENABLED:
+        return None
+    return get_analysis_cache().get(AnalysisCache.make_key(text, report_type, analysis_version()))
+
+async def stream_text_analysis(text: str, report_type: str, run=run_in_worker_pool):
+    """
+    analyze_text as the events of stream_report_analysis
+    A cached analysis is sent as its fields straight away; a fresh one is
+    streamed as it is produced and cached when complete.
+    """
+    key = AnalysisCache.make_key(text, report_type, analysis_version()) if ANALYSIS_CACHE_ENABLED else None
+    cached = cached_analysis(text, report_type)
+    if cached is not None:
+        for field, value in cached.items():
+            yield {"event": "field", "field": field, "value": value}
+        yield {"event": "complete", "analysis": cached}
+        return
+    async for event in stream_report_analysis(text, report_type, run_rules=run):
+        if event["event"] == "complete" and key and is_reusable_analysis(event["analysis"]):
+            get_analysis_cache().put(key, event["analysis"])
+        yield event
+
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
         token = credentials.credentials
@@ -245,79 +351,401 @@ async def get_report_by_id(report_id: int, current_user: dict = Depends(verify_t
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/reports/upload")
+@router.post("/reports/upload", status_code=202)
 async def upload_report(
+    response: Response,
     file: UploadFile = File(...),
     title: str = Form(...),
     report_type: str = Form("general"),
     current_user: dict = Depends(verify_token)
 ):
-    """Upload and analyze medical report"""
+    """Upload a medical report and queue it for analysis"""
     try:
-        # Validate file
-        if not file.filename:
-            raise HTTPException(status_code=400, detail="No file provided")
-        
-        # Check file type
-        allowed_types = ["application/pdf", "image/jpeg", "image/png", "image/jpg"]
-        if file.content_type not in allowed_types:
-            raise HTTPException(status_code=400, detail="Invalid file type")
-        
-        # Create uploads directory
-        uploads_dir = Path("uploads")
-        uploads_dir.mkdir(exist_ok=True)
-        
-        # Save file
-        file_path = uploads_dir / f"{datetime.utcnow().timestamp()}_{file.filename}"
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Parse file content
+        report = await create_report_from_upload(file, title, report_type, current_user["user_id"])
+        if report["status"] == ReportStatus.ANALYZED.value:
+            response.status_code = 200
+        return upload_result(report)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+@router.post("/reports/upload-batch", status_code=202)
+async def upload_reports_batch(
+    files: List[UploadFile] = File(...),
+    titles: Optional[List[str]] = Form(None),
+    report_type: str = Form("general"),
+    current_user: dict = Depends(verify_token)
+):
+    """
+    Upload several medical reports in one request and queue them for analysis
+    Files are stored concurrently and analyzed by the shared job runner, so
+    processing is bounded by the worker pool. A file that fails validation is
+    reported in its own result and does not abort the rest of the batch.
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files provided")
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_FILES} files per batch")
+    if titles and len(titles) != len(files):
+        raise HTTPException(status_code=400, detail="Provide one title per file")
+    
+    async def store(index: int, file: UploadFile) -> dict:
+        title = titles[index] if titles else Path(safe_filename(file.filename or "")).stem
         try:
-            extracted_text = parse_uploaded_file(str(file_path))
+            report = await create_report_from_upload(file, title, report_type, current_user["user_id"])
+            status_code = 200 if report["status"] == ReportStatus.ANALYZED.value else 202
+            return {"filename": file.filename, "status_code": status_code, **upload_result(report)}
+        except HTTPException as e:
+            return {"filename": file.filename, "status_code": e.status_code, "error": e.detail}
         except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Failed to parse file: {str(e)}")
+            return {"filename": file.filename, "status_code": 500, "error": f"Upload failed: {str(e)}"}
+    
+    results = await asyncio.gather(*(store(index, file) for index, file in enumerate(files)))
+    accepted = sum(1 for result in results if "error" not in result)
+    return {
+        "message": f"{accepted} of {len(results)} reports uploaded",
+        "accepted": accepted,
+        "failed": len(results) - accepted,
+        "results": results
+    }
+
+async def create_report_from_upload(file: UploadFile, title: str, report_type: str, user_id: int) -> dict:
+    """
+    Store an uploaded file and create its report record
+    Queues the report for parsing and analysis, or marks it analyzed straight
+    away when an identical file has already been analyzed for the same type.
+    Raises HTTPException for files that fail validation.
+    """
+    # Validate file
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+    
+    # Check file type
+    allowed_types = ["application/pdf", "image/jpeg", "image/png", "image/jpg"]
+    if file.content_type not in allowed_types:
+        raise HTTPException(status_code=400, detail="Invalid file type")
+    
+    # Stream file to disk, hashing and sniffing its type on the way
+    uploads_dir = Path(UPLOAD_DIR)
+    try:
+        saved = await save_upload_stream(file, uploads_dir)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedFileType as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    report = create_report_record(saved, user_id, title, report_type, safe_filename(file.filename))
+    if report["status"] == ReportStatus.PENDING.value:
+        get_job_runner().submit(report["id"], process_report, report["id"])
+    return report
+
+def create_report_record(saved: dict, user_id: int, title: str, report_type: str, filename: str) -> dict:
+    """
+    Move a streamed file into the blob store and create its report record
+    The report is marked analyzed straight away when an identical file has
+    already been analyzed for the same type; otherwise it is left pending.
+    """
+    # Byte-identical uploads share one blob and its earlier results
+    content_hash = saved["sha256"]
+    file_path = blob_store.add(saved["temp_path"], content_hash, saved["extension"])
+    cached = blob_store.get_results(content_hash, report_type)
+    
+    # Create report record; parsing and analysis happen in the background
+    report_id = next(_report_ids)
+    report = {
+        "id": report_id,
+        "user_id": user_id,
+        "title": title,
+        "type": report_type,
+        "filename": filename,
+        "file_path": str(file_path),
+        "file_size": saved["size"],
+        "content_hash": content_hash,
+        "extracted_text": None,
+        "ai_analysis": None,
+        "status": ReportStatus.PENDING.value,
+        "job_id": uuid.uuid4().hex,
+        "error": None,
+        "created_at": datetime.utcnow().isoformat(),
+        "updated_at": datetime.utcnow().isoformat()
+    }
+    
+    mock_reports[report_id] = report
+    
+    if cached and cached["ai_analysis"] is not None:
+        report["extracted_text"] = cached["extracted_text"]
+        store_analysis(report, cached["ai_analysis"])
+        report["status"] = ReportStatus.ANALYZED.value
+    
+    return report
+
+def upload_result(report: dict) -> dict:
+    """Response body for a stored upload"""
+    reused = report["status"] == ReportStatus.ANALYZED.value
+    return {
+        "message": "Report uploaded, reused analysis of an identical file" if reused
+                   else "Report uploaded, analysis in progress",
+        "report_id": report["id"],
+        "job_id": report["job_id"],
+        "status": report["status"],
+        "status_url": f"/api/reports/{report['id']}/status",
+        "report": report
+    }
+
+def set_report_status(report: dict, status: ReportStatus, error: Optional[str] = None):
+    """Update a report's processing status and notify status listeners"""
+    report["status"] = status.value
+    report["error"] = error
+    report["updated_at"] = datetime.utcnow().isoformat()
+    get_job_runner().publish(report["id"], report_status_payload(report))
+
+def set_report_progress(report: dict, page: dict):
+    """Record a parsed page and notify status listeners"""
+    progress = report.setdefault("progress", {"pages_done": 0, "page_count": page["page_count"]})
+    progress["pages_done"] += 1
+    report["updated_at"] = datetime.utcnow().isoformat()
+    get_job_runner().publish(report["id"], report_status_payload(report))
+
+def report_status_payload(report: dict) -> dict:
+    """Status fields returned by the polling and SSE endpoints"""
+    return {
+        "report_id": report["id"],
+        "job_id": report.get("job_id"),
+        "status": report.get("status"),
+        "error": report.get("error"),
+        "progress": report.get("progress"),
+        "analysis_revision": (report.get("ai_analysis") or {}).get("revision"),
+        "enrichment": (report.get("ai_analysis") or {}).get("enrichment"),
+        "updated_at": report.get("updated_at")
+    }
+
+def is_settled(report: dict) -> bool:
+    """Whether a report will not change any more: processed, and any LLM enrichment finished"""
+    return (report.get("status") in TERMINAL_STATUSES
+            and (report.get("ai_analysis") or {}).get("enrichment") != "pending")
+
+def store_analysis(report: dict, analysis: dict, enrichment: Optional[str] = None) -> dict:
+    """
+    Set a copy of ``analysis`` as a report's, stamped with the next revision number
+    ``enrichment`` is "pending" while an LLM upgrade of a provisional rules
+    result is on its way; the upgrade then sets "completed" or "failed".
+    Stamps the analysis carries from another report are replaced.
+    """
+    previous = report.get("ai_analysis") or {}
+    analysis = {key: value for key, value in analysis.items() if key != "enrichment"}
+    analysis.update(revision=previous.get("revision", 0) + 1, analyzed_at=datetime.utcnow().isoformat())
+    if enrichment:
+        analysis["enrichment"] = enrichment
+    report["ai_analysis"] = analysis
+    report["updated_at"] = analysis["analyzed_at"]
+    track_report_risk(report)
+    return analysis
+
+def track_report_risk(report: dict):
+    """Count the report's risk score in its owner's dashboard rollups, or stop counting it"""
+    analysis = report.get("ai_analysis") or {}
+    if analysis.get("status") in ("pending", "error") or analysis.get("risk_score") is None:
+        get_metric_rollups().remove_report(report["id"])
+        return
+    created_at = epoch_seconds(datetime.fromisoformat(report["created_at"]))
+    get_metric_rollups().record_report(report["id"], report["user_id"], created_at, float(analysis["risk_score"]))
+
+def create_notification(user_id: int, title: str, message: str,
+                        type: NotificationType = NotificationType.INFO) -> dict:
+    notification_id = len(mock_notifications) + 1
+    notification = {
+        "id": notification_id,
+        "user_id": user_id,
+        "title": title,
+        "message": message,
+        "type": type.value,
+        "read": False,
+        "created_at": datetime.utcnow().isoformat(),
+        "read_at": None
+    }
+    mock_notifications[notification_id] = notification
+    return notification
+
+async def process_report(report_id: int):
+    """Background job: parse and analyze an uploaded report"""
+    report = mock_reports.get(report_id)
+    if not report:
+        return
+    
+    set_report_status(report, ReportStatus.ANALYZING)
+    pool = get_worker_pool()
+    
+    # Parse file content, unless an identical file has already been parsed
+    content_hash = report.get("content_hash")
+    cached = blob_store.get_results(content_hash, report["type"]) if content_hash else None
+    if cached:
+        extracted_text = cached["extracted_text"]
+    else:
+        # Pages are reported from the parser's coordinator thread
+        loop = asyncio.get_running_loop()
+        def on_page(page: dict):
+            loop.call_soon_threadsafe(set_report_progress, report, page)
         
-        # AI Analysis
         try:
-            ai_analysis = analyze_report_content(extracted_text)
+            parsed = await pool.run_with_executor(
+                parse_uploaded_file_with_metadata, report["file_path"],
+                content_hash=content_hash, on_page=on_page, wait=True
+            )
         except Exception as e:
-            print(f"AI analysis failed: {e}")
-            ai_analysis = {
-                "summary": "Analysis unavailable",
-                "risk_score": 0,
-                "recommendations": [],
-                "status": "pending"
-            }
-        
-        # Create report record
-        report_id = len(mock_reports) + 1
-        report = {
-            "id": report_id,
-            "user_id": current_user["user_id"],
-            "title": title,
-            "type": report_type,
-            "filename": file.filename,
-            "file_path": str(file_path),
-            "extracted_text": extracted_text,
-            "ai_analysis": ai_analysis,
-            "status": "analyzed",
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            set_report_status(report, ReportStatus.ERROR, error=f"Failed to parse file: {str(e)}")
+            return
+        extracted_text = parsed["text"]
+        report["extraction"] = parsed["metadata"]
+    
+    # AI Analysis. In progressive mode the rules result is stored at once and
+    # upgraded by the LLM in the background, unless an LLM result is cached
+    # or routing finds the rules result confident enough to stand
+    cached = cached_analysis(extracted_text, report["type"])
+    enrich = (PROGRESSIVE_ANALYSIS and cached is None and get_llm_client() is not None
+              and bool(extracted_text.strip()))
+    try:
+        if cached is not None:
+            ai_analysis = cached
+        elif enrich and ANALYSIS_ROUTING_ENABLED:
+            ai_analysis = await pool.run(routed_rules_analysis, extracted_text, report["type"], wait=True)
+            enrich = choose_route(ai_analysis, extracted_text) == "llm"
+            if not enrich and ANALYSIS_CACHE_ENABLED and is_reusable_analysis(ai_analysis):
+                key = AnalysisCache.make_key(extracted_text, report["type"], analysis_version())
+                get_analysis_cache().put(key, ai_analysis)
+        elif enrich:
+            ai_analysis = await pool.run(analyze_report_content, extracted_text, report["type"], wait=True)
+        else:
+            ai_analysis = await analyze_text(extracted_text, report["type"], run=functools.partial(pool.run, wait=True))
+    except Exception as e:
+        enrich = False
+        print(f"AI analysis failed: {e}")
+        ai_analysis = {
+            "summary": "Analysis unavailable",
+            "risk_score": 0,
+            "recommendations": [],
+            "status": "pending"
         }
+    
+    if content_hash:
+        blob_store.save_results(content_hash, report["type"], extracted_text,
+                                ai_analysis if is_reusable_analysis(ai_analysis) else None)
+    
+    # The report may have been deleted while it was being processed
+    if report_id not in mock_reports:
+        return
+    
+    report["extracted_text"] = extracted_text
+    ai_analysis = store_analysis(report, ai_analysis, enrichment="pending" if enrich else None)
+    set_report_status(report, ReportStatus.ANALYZED)
+    if enrich:
+        get_enrichment_runner().submit(f"enrich:{report_id}", enrich_report, report_id, ai_analysis["revision"])
+
+async def enrich_report(report_id: int, revision: int):
+    """
+    Background job: upgrade a report's provisional rules analysis with the LLM
+    The upgrade is dropped if the analysis changed in the meantime, e.g. by a
+    re-analysis, so it never replaces a newer result.
+    """
+    report = mock_reports.get(report_id)
+    if not report:
+        return
+    
+    try:
+        ai_analysis = await enrich_text(report["extracted_text"], report["type"])
+    except Exception as e:
+        # LLMError, or anything else; either way the report must not stay "pending"
+        print(f"LLM enrichment of report {report_id} failed: {e}")
+        ai_analysis = None
+    
+    current = report.get("ai_analysis") or {}
+    if report_id not in mock_reports or current.get("revision") != revision:
+        return
+    
+    try:
+        if ai_analysis is not None:
+            store_analysis(report, ai_analysis, enrichment="completed")
+            if report.get("content_hash"):
+                blob_store.save_results(report["content_hash"], report["type"], report["extracted_text"],
+                                        report["ai_analysis"])
+            create_notification(
+                report["user_id"], "Detailed analysis ready",
+                f"The analysis of \"{report['title']}\" has been updated with a detailed AI review.",
+                NotificationType.SUCCESS
+            )
+    except Exception as e:
+        print(f"Storing the enriched analysis of report {report_id} failed: {e}")
+    finally:
+        # Settle the enrichment whatever happened, so status waiters are released
+        current = report.get("ai_analysis") or {}
+        if current.get("enrichment") == "pending":
+            current["enrichment"] = "failed"
+            report["updated_at"] = datetime.utcnow().isoformat()
+        get_job_runner().publish(report_id, report_status_payload(report))
+
+@router.get("/reports/{report_id}/status")
+async def get_report_status(
+    report_id: int,
+    wait: float = Query(0, ge=0, description="Long-poll: seconds to wait for a status change"),
+    current_user: dict = Depends(verify_token)
+):
+    """Get report processing status, optionally long-polling until it changes"""
+    try:
+        report = mock_reports.get(report_id)
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
         
-        mock_reports[report_id] = report
+        if report.get("user_id") != current_user["user_id"]:
+            raise HTTPException(status_code=403, detail="Access denied")
         
-        return {
-            "message": "Report uploaded and analyzed successfully",
-            "report": report
-        }
+        if wait and not is_settled(report):
+            runner = get_job_runner()
+            events = runner.subscribe(report_id)
+            try:
+                await asyncio.wait_for(events.get(), timeout=min(wait, JOB_LONG_POLL_MAX))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                runner.unsubscribe(report_id, events)
         
+        return report_status_payload(report)
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/reports/{report_id}/events")
+async def stream_report_status(report_id: int, current_user: dict = Depends(verify_token)):
+    """Stream report status changes as server-sent events until processing finishes"""
+    report = mock_reports.get(report_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    
+    if report.get("user_id") != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    runner = get_job_runner()
+    events = runner.subscribe(report_id)
+    
+    async def event_stream():
+        try:
+            payload = report_status_payload(report)
+            yield f"event: status\ndata: {json.dumps(payload)}\n\n"
+            while not is_settled(report) and report_id in mock_reports:
+                try:
+                    payload = await asyncio.wait_for(events.get(), timeout=15)
+                    yield f"event: status\ndata: {json.dumps(payload)}\n\n"
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            runner.unsubscribe(report_id, events)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.delete("/reports/{report_id}")
 async def delete_report(report_id: int, current_user: dict = Depends(verify_token)):
@@ -331,13 +759,17 @@ async def delete_report(report_id: int, current_user: dict = Depends(verify_toke
         if report.get("user_id") != current_user["user_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        # Delete file if exists
-        file_path = Path(report.get("file_path", ""))
-        if file_path.exists():
-            file_path.unlink()
+        # Delete the file once no other report references it
+        if report.get("content_hash"):
+            blob_store.release(report["content_hash"])
+        else:
+            file_path = Path(report.get("file_path", ""))
+            if file_path.exists():
+                file_path.unlink()
         
         # Delete record
         del mock_reports[report_id]
+        get_metric_rollups().remove_report(report_id)
         
         return {"message": "Report deleted successfully"}
     except HTTPException:
@@ -358,10 +790,15 @@ async def analyze_report(report_id: int, current_user: dict = Depends(verify_tok
         if report.get("user_id") != current_user["user_id"]:
             raise HTTPException(status_code=403, detail="Access denied")
         
+        if report.get("status") not in TERMINAL_STATUSES:
+            raise HTTPException(status_code=409, detail="Report is still being processed")
+        
         # Re-analyze
-        ai_analysis = analyze_report_content(report.get("extracted_text", ""))
-        report["ai_analysis"] = ai_analysis
-        report["updated_at"] = datetime.utcnow().isoformat()
+        ai_analysis = await analyze_text(report.get("extracted_text") or "", report.get("type", "general"))
+        ai_analysis = store_analysis(report, ai_analysis)
+        if report.get("content_hash") and is_reusable_analysis(ai_analysis):
+            blob_store.save_results(report["content_hash"], report.get("type", "general"),
+                                    report.get("extracted_text", ""), ai_analysis)
         
         return {
             "message": "Report re-analyzed successfully",
@@ -372,6 +809,42 @@ async def analyze_report(report_id: int, current_user: dict = Depends(verify_tok
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/reports/{report_id}/analyze/stream")
+async def stream_report_reanalysis(report_id: int, current_user: dict = Depends(verify_token)):
+    """
+    Re-analyze a report, streaming partial results as server-sent events
+    Events are named text, item, field, fallback and complete, as described
+    in stream_report_analysis; complete carries the analysis, which is then
+    saved to the report as the analyze endpoint does.
+    """
+    report = mock_reports.get(report_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    
+    if report.get("user_id") != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if report.get("status") not in TERMINAL_STATUSES:
+        raise HTTPException(status_code=409, detail="Report is still being processed")
+    
+    text = report.get("extracted_text") or ""
+    report_type = report.get("type", "general")
+    
+    async def event_stream():
+        async for event in stream_text_analysis(text, report_type):
+            kind = event.pop("event")
+            if kind == "complete" and report_id in mock_reports:
+                ai_analysis = store_analysis(report, event["analysis"])
+                if report.get("content_hash") and is_reusable_analysis(ai_analysis):
+                    blob_store.save_results(report["content_hash"], report_type, text, ai_analysis)
+            yield f"event: {kind}\ndata: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/reports/{report_id}/insights")
 async def get_insights(report_id: int, current_user: dict = Depends(verify_token)):
     """Get AI insights for a report"""
@@ -426,27 +899,123 @@ async def get_dashboard_data(current_user: dict = Depends(verify_token)) -> Dash
 @router.get("/dashboard/metrics")
 async def get_health_metrics(
     range: str = Query("30d", regex="^(7d|30d|90d|1y)$"),
+    patient_id: Optional[int] = Query(None),
     current_user: dict = Depends(verify_token)
 ):
-    """Get health metrics for specified time range"""
+    """
+    Get health metrics for specified time range
+    Served from the patient's rollups of glucose readings and report risk
+    scores: hourly buckets for 7d, daily for 30d and 90d, weekly for 1y.
+    """
+    owner = glucose_patient_id(current_user, patient_id)
     try:
-        # Mock metrics data
-        return {
-            "range": range,
-            "metrics": {
-                "glucose_avg": 120,
-                "glucose_trend": "stable",
-                "reports_count": 5,
-                "risk_score": 2.3
-            },
-            "timeline": [
-                {"date": "2024-01-01", "glucose": 115, "risk": 2.1},
-                {"date": "2024-01-15", "glucose": 125, "risk": 2.5}
-            ]
-        }
+        return get_metric_rollups().dashboard(owner, range)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Glucose readings (CGM / glucometer exports)
+def glucose_patient_id(current_user: dict, patient_id: Optional[int]) -> int:
+    """The patient a glucose request is for: the caller, or any patient for clinics"""
+    if patient_id is None or patient_id == current_user["user_id"]:
+        return current_user["user_id"]
+    if current_user["user_type"] != "clinic":
+        raise HTTPException(status_code=403, detail="Access denied")
+    return patient_id
+
+def epoch_seconds(moment: Optional[datetime]) -> Optional[int]:
+    """Seconds since the epoch; times without a zone are taken as UTC, as on import"""
+    if moment is None:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+def glucose_range_summary(timestamps) -> dict:
+    if not len(timestamps):
+        return {"count": 0, "first": None, "last": None}
+    return {
+        "count": int(len(timestamps)),
+        "first": datetime.fromtimestamp(int(timestamps[0]), timezone.utc).isoformat(),
+        "last": datetime.fromtimestamp(int(timestamps[-1]), timezone.utc).isoformat()
+    }
+
+@router.post("/metrics/glucose/import")
+async def import_glucose_readings(
+    file: UploadFile = File(...),
+    unit: str = Form("mg/dL"),
+    patient_id: Optional[int] = Form(None),
+    current_user: dict = Depends(verify_token)
+):
+    """
+    Import a CGM or glucometer export (CSV or NDJSON) into a patient's readings
+    The file is parsed and stored chunk by chunk as it streams in, so memory
+    use does not grow with the export. Readings already stored are skipped,
+    so re-importing an overlapping export is safe; if the upload exceeds the
+    size limit, the readings before that point are kept.
+    """
+    owner = glucose_patient_id(current_user, patient_id)
+    try:
+        parser = CGMExportParser(unit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    store = get_glucose_store()
+    counts = {"added": 0, "duplicates": 0}
+    
+    def ingest(chunk: Optional[bytes]):
+        timestamps, values = parser.feed(chunk) if chunk is not None else parser.close()
+        if len(timestamps):
+            appended = store.append(owner, timestamps, values)
+            counts["added"] += appended["added"]
+            counts["duplicates"] += appended["duplicates"]
+    
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_UPLOAD_SIZE:
+                raise HTTPException(status_code=413,
+                                    detail=f"File exceeds the {MAX_UPLOAD_SIZE / (1024 * 1024):g}MB upload limit")
+            await asyncio.to_thread(ingest, chunk)
+        await asyncio.to_thread(ingest, None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not parser.header_found:
+        raise HTTPException(status_code=400, detail="No glucose readings found in the file")
+    timestamps, _ = store.read(owner)
+    return {
+        "patient_id": owner,
+        "format": parser.format,
+        "rows": parser.rows,
+        **counts,
+        "skipped": parser.skipped,
+        "stored": glucose_range_summary(timestamps)
+    }
+
+@router.get("/metrics/glucose")
+async def get_glucose_statistics(
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    patient_id: Optional[int] = Query(None),
+    current_user: dict = Depends(verify_token)
+):
+    """
+    Variability and time in range of a patient's readings from ``start`` up to ``end``
+    The range is a slice of the memory-mapped columns, handed to the
+    helpers as it is.
+    """
+    owner = glucose_patient_id(current_user, patient_id)
+    timestamps, values = get_glucose_store().read(owner, epoch_seconds(start), epoch_seconds(end))
+    return {
+        "patient_id": owner,
+        **glucose_range_summary(timestamps),
+        "variability": calculate_glucose_variability(values),
+        "time_in_range": assess_time_in_range(values)
+    }
+
 # Translation endpoints
 @router.post("/reports/{report_id}/translate")
 async def translate_report(
@@ -491,6 +1060,59 @@ async def get_patient_reports(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/clinic/imports", status_code=202)
+async def start_report_import(request: ReportImportRequest, current_user: dict = Depends(verify_token)):
+    """
+    Import a clinic's back-catalogue from a ZIP archive or directory on the server
+    Files are mapped to patients by the manifest. Re-posting the same source
+    resumes an interrupted import from its checkpoint.
+    """
+    try:
+        if current_user["user_type"] != "clinic":
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        source = resolve_import_path(request.source)
+        manifest = resolve_import_path(request.manifest) if request.manifest else None
+        
+        report_import = ReportImport(
+            source, create_report_record, process_report,
+            manifest_path=manifest,
+            default_patient_id=request.default_patient_id,
+            report_type=request.report_type.value
+        )
+        existing = mock_imports.get(report_import.id)
+        if existing and existing.status in ("pending", "running"):
+            return existing.to_dict()
+        
+        mock_imports[report_import.id] = report_import
+        get_job_runner().submit(f"import:{report_import.id}", report_import.run)
+        return report_import.to_dict()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/clinic/imports/{import_id}")
+async def get_report_import(import_id: str, current_user: dict = Depends(verify_token)):
+    """Get the progress of a bulk import"""
+    if current_user["user_type"] != "clinic":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    report_import = mock_imports.get(import_id)
+    if not report_import:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return report_import.to_dict()
+
+def resolve_import_path(relative: str) -> Path:
+    """Resolve a client-supplied path, refusing anything outside IMPORT_ROOT"""
+    root = Path(IMPORT_ROOT).resolve()
+    path = (root / relative).resolve()
+    if not path.is_relative_to(root):
+        raise HTTPException(status_code=400, detail="Import path must be inside the import directory")
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=f"Import source not found: {relative}")
+    return path
+
 # Government endpoints
 @router.get("/government/population")
 async def get_population_data(
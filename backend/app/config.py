@@ -0,0 +1,95 @@
+# app/config.py
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment"""
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Uploads
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+MAX_UPLOAD_SIZE = _env_int("MAX_UPLOAD_SIZE", 50 * 1024 * 1024)
+UPLOAD_CHUNK_SIZE = _env_int("UPLOAD_CHUNK_SIZE", 1024 * 1024)
+MAX_BATCH_FILES = _env_int("MAX_BATCH_FILES", 100)
+
+# CPU worker pool (OCR, PDF parsing, rule-based analysis)
+CPU_WORKERS = _env_int("CPU_WORKERS", os.cpu_count() or 2)
+CPU_QUEUE_DEPTH = _env_int("CPU_QUEUE_DEPTH", CPU_WORKERS * 4)
+CPU_TASK_TIMEOUT = _env_float("CPU_TASK_TIMEOUT", 120.0)  # seconds; 0 = no timeout
+
+# Background report-processing jobs
+JOB_CONCURRENCY = _env_int("JOB_CONCURRENCY", CPU_WORKERS)
+JOB_LONG_POLL_MAX = _env_float("JOB_LONG_POLL_MAX", 30.0)
+
+# Bulk report imports (ZIP archives or directories under IMPORT_ROOT)
+IMPORT_ROOT = os.getenv("IMPORT_ROOT", "imports")
+IMPORT_CHECKPOINT_DIR = os.getenv("IMPORT_CHECKPOINT_DIR", "import_checkpoints")
+IMPORT_CONCURRENCY = _env_int("IMPORT_CONCURRENCY", JOB_CONCURRENCY)
+
+# PDF parsing
+PDF_PAGE_WORKERS = _env_int("PDF_PAGE_WORKERS", CPU_WORKERS)
+PDF_PARALLEL_MIN_PAGES = _env_int("PDF_PARALLEL_MIN_PAGES", 8)
+PDF_MIN_TEXT_CHARS = _env_int("PDF_MIN_TEXT_CHARS", 40)
+
+# OCR
+OCR_BACKEND = os.getenv("OCR_BACKEND", "auto")  # auto | tesserocr | pytesseract
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_TESSDATA_PATH = os.getenv("TESSDATA_PREFIX")
+OCR_PREPROCESS_PROFILE = os.getenv("OCR_PREPROCESS_PROFILE", "balanced")  # none | fast | balanced | accurate
+OCR_TARGET_DPI = _env_int("OCR_TARGET_DPI", 200)
+OCR_TARGET_GLYPH_PX = _env_int("OCR_TARGET_GLYPH_PX", 24)
+OCR_MAX_RENDER_PIXELS = _env_int("OCR_MAX_RENDER_PIXELS", 16_000_000)
+
+# Extracted-text cache
+TEXT_CACHE_ENABLED = os.getenv("TEXT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TEXT_CACHE_DIR = os.getenv("TEXT_CACHE_DIR", "cache")
+TEXT_CACHE_MAX_BYTES = _env_int("TEXT_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+
+# Analysis result cache (in memory, keyed on text, report type and analysis version)
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANALYSIS_CACHE_MAX_ENTRIES = _env_int("ANALYSIS_CACHE_MAX_ENTRIES", 2048)
+ANALYSIS_CACHE_TTL = _env_float("ANALYSIS_CACHE_TTL", 24 * 3600.0)
+
+# LLM provider (any OpenAI-compatible chat completions API); rules only when no key is set
+LLM_API_KEY = os.getenv("LLM_API_KEY") or os.getenv("OPENAI_API_KEY")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.openai.com/v1")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_TIMEOUT = _env_float("LLM_TIMEOUT", 30.0)  # overall deadline per analysis, retries included
+LLM_CONNECT_TIMEOUT = _env_float("LLM_CONNECT_TIMEOUT", 5.0)
+LLM_MAX_CONCURRENCY = _env_int("LLM_MAX_CONCURRENCY", 8)
+LLM_MAX_RETRIES = _env_int("LLM_MAX_RETRIES", 2)
+LLM_RETRY_BASE_DELAY = _env_float("LLM_RETRY_BASE_DELAY", 0.5)
+LLM_RETRY_MAX_DELAY = _env_float("LLM_RETRY_MAX_DELAY", 8.0)
+LLM_BREAKER_FAILURES = _env_int("LLM_BREAKER_FAILURES", 5)
+LLM_BREAKER_RESET = _env_float("LLM_BREAKER_RESET", 30.0)
+
+# Long reports are analyzed in chunks in parallel and the partial analyses merged
+LLM_MAX_OUTPUT_TOKENS = _env_int("LLM_MAX_OUTPUT_TOKENS", 1000)
+LLM_CHUNK_TOKENS = _env_int("LLM_CHUNK_TOKENS", 2500)
+LLM_CHUNK_OUTPUT_TOKENS = _env_int("LLM_CHUNK_OUTPUT_TOKENS", 500)
+LLM_TOKEN_BUDGET = _env_int("LLM_TOKEN_BUDGET", 30000)  # prompt + output tokens per report; 0 = no cap
+
+# Progressive analysis: store the rules result at once, upgrade it with the LLM in the background
+PROGRESSIVE_ANALYSIS = os.getenv("PROGRESSIVE_ANALYSIS", "true").lower() in ("1", "true", "yes")
+ENRICHMENT_CONCURRENCY = _env_int("ENRICHMENT_CONCURRENCY", LLM_MAX_CONCURRENCY)
+
+# Analysis routing: call the LLM only when the rules result is not confident enough
+ANALYSIS_ROUTING_ENABLED = os.getenv("ANALYSIS_ROUTING_ENABLED", "true").lower() in ("1", "true", "yes")
+ROUTING_CONFIDENCE_THRESHOLD = _env_float("ROUTING_CONFIDENCE_THRESHOLD", 0.75)
+ROUTING_SHORT_TEXT_CHARS = _env_int("ROUTING_SHORT_TEXT_CHARS", 800)  # up to this length text counts as a simple slip
+LLM_COST_PER_1K_TOKENS = _env_float("LLM_COST_PER_1K_TOKENS", 0.002)  # for reporting savings only
+
+# CGM / glucometer readings, stored per patient as packed columns
+GLUCOSE_STORE_DIR = os.getenv("GLUCOSE_STORE_DIR", "glucose")
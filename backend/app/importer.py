@@ -0,0 +1,244 @@
+# app/importer.py
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import logging
+import time
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Iterator, Optional, Set, Tuple
+
+from app.config import IMPORT_CHECKPOINT_DIR, IMPORT_CONCURRENCY, UPLOAD_DIR
+from app.utils.storage import save_file_stream
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.csv"
+
+
+class ImportSourceError(Exception):
+    """Raised when an import source or its manifest cannot be read"""
+
+
+def import_id_for(source: Path) -> str:
+    """Stable id for an import source, so re-running the same archive resumes it"""
+    stat = source.stat()
+    fingerprint = f"{source.resolve()}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+
+def iter_source_entries(source: Path) -> Iterator[Tuple[str, Callable[[], BinaryIO]]]:
+    """
+    Yield ``(name, open)`` for every file in a ZIP archive or directory
+    Names are POSIX paths relative to the source root. ZIP members are read
+    straight from the archive, one at a time, without extracting it.
+    """
+    if source.is_dir():
+        for path in sorted(source.rglob("*")):
+            name = path.relative_to(source).as_posix()
+            if path.is_file() and not _is_ignored(name):
+                yield name, lambda path=path: open(path, "rb")
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and not _is_ignored(info.filename):
+                    yield info.filename, lambda info=info: archive.open(info)
+    else:
+        raise ImportSourceError(f"{source} is neither a directory nor a ZIP archive")
+
+
+def _is_ignored(name: str) -> bool:
+    parts = PurePosixPath(name).parts
+    return (name == MANIFEST_NAME or parts[0] == "__MACOSX"
+            or any(part.startswith(".") for part in parts))
+
+
+def read_manifest(source: Path, manifest_path: Optional[Path] = None) -> Dict[str, Dict[str, str]]:
+    """
+    Load the entry -> patient mapping
+    A CSV with columns ``filename`` and ``patient_id`` and optional ``title`` and
+    ``report_type``. Read from ``manifest_path`` if given, otherwise from
+    manifest.csv at the root of the source. Returns {} when there is none.
+    """
+    if manifest_path is not None:
+        content = manifest_path.read_text(encoding="utf-8-sig")
+    elif source.is_dir():
+        path = source / MANIFEST_NAME
+        content = path.read_text(encoding="utf-8-sig") if path.exists() else None
+    else:
+        with zipfile.ZipFile(source) as archive:
+            try:
+                content = archive.read(MANIFEST_NAME).decode("utf-8-sig")
+            except KeyError:
+                content = None
+
+    if content is None:
+        return {}
+
+    reader = csv.DictReader(io.StringIO(content))
+    if not reader.fieldnames or not {"filename", "patient_id"} <= set(reader.fieldnames):
+        raise ImportSourceError("Manifest needs 'filename' and 'patient_id' columns")
+    return {row["filename"].strip(): row for row in reader if row.get("filename")}
+
+
+class ReportImport:
+    """
+    Bulk import of reports from a ZIP archive or directory
+    Entries are streamed into the blob store one at a time and then parsed and
+    analyzed concurrently, at most ``concurrency`` at once. Every finished entry
+    is appended to a JSON-lines checkpoint, so running the same source again
+    skips what an interrupted run already imported. Failed entries are recorded
+    too, but tried again on the next run.
+
+    ``create_report(saved, patient_id, title, report_type, filename)`` registers
+    a stored file and returns its report; ``process_report(report_id)`` parses
+    and analyzes it.
+    """
+
+    def __init__(self, source: Path, create_report: Callable[..., Dict[str, Any]],
+                 process_report: Callable[[int], Awaitable[None]],
+                 manifest_path: Optional[Path] = None, default_patient_id: Optional[int] = None,
+                 report_type: str = "general", concurrency: int = IMPORT_CONCURRENCY,
+                 checkpoint_dir: Path = Path(IMPORT_CHECKPOINT_DIR)):
+        self.source = source
+        self.id = import_id_for(source)
+        self.create_report = create_report
+        self.process_report = process_report
+        self.manifest_path = manifest_path
+        self.default_patient_id = default_patient_id
+        self.report_type = report_type
+        self.concurrency = max(1, concurrency)
+        self.checkpoint_path = checkpoint_dir / f"{self.id}.jsonl"
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.counts = {"imported": 0, "failed": 0, "resumed": 0}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def completed_entries(self) -> Set[str]:
+        """Entries earlier runs recorded in the checkpoint as imported"""
+        if not self.checkpoint_path.exists():
+            return set()
+        done = set()
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    outcome = json.loads(line)
+                    if "error" not in outcome:
+                        done.add(outcome["entry"])
+                except (ValueError, KeyError, TypeError):
+                    # A line cut short by a crash; that entry is simply redone
+                    continue
+        return done
+
+    async def run(self) -> None:
+        self.status = "running"
+        self.started_at = time.time()
+        try:
+            manifest = read_manifest(self.source, self.manifest_path)
+            done = self.completed_entries()
+            self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.checkpoint_path, "a+", encoding="utf-8") as checkpoint:
+                if checkpoint.tell() > 0:
+                    checkpoint.seek(checkpoint.tell() - 1)
+                    if checkpoint.read(1) != "\n":
+                        # Terminate a line cut short by a crash
+                        checkpoint.write("\n")
+                await self._import_entries(manifest, done, checkpoint)
+            self.status = "completed"
+        except Exception as e:
+            logger.error(f"Import {self.id} failed: {str(e)}")
+            self.status = "error"
+            self.error = str(e)
+        finally:
+            self.finished_at = time.time()
+
+    async def _import_entries(self, manifest: Dict[str, Dict[str, str]], done: Set[str], checkpoint) -> None:
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks: Set[asyncio.Task] = set()
+
+        def record(entry: str, **outcome: Any) -> None:
+            checkpoint.write(json.dumps({"entry": entry, **outcome}) + "\n")
+            checkpoint.flush()
+            self.counts["failed" if "error" in outcome else "imported"] += 1
+
+        async def process(entry: str, report: Dict[str, Any]) -> None:
+            try:
+                await self.process_report(report["id"])
+                if report.get("error"):
+                    record(entry, report_id=report["id"], error=report["error"])
+                else:
+                    record(entry, report_id=report["id"], status=report["status"])
+            except Exception as e:
+                record(entry, report_id=report["id"], error=str(e))
+            finally:
+                slots.release()
+
+        try:
+            for entry, open_entry in iter_source_entries(self.source):
+                if entry in done:
+                    self.counts["resumed"] += 1
+                    continue
+
+                row = manifest.get(entry) or manifest.get(PurePosixPath(entry).name) or {}
+                patient_id = row.get("patient_id") or self.default_patient_id
+                if not patient_id:
+                    record(entry, error="No patient mapping in manifest")
+                    continue
+                try:
+                    patient_id = int(patient_id)
+                except (TypeError, ValueError):
+                    record(entry, error=f"Invalid patient_id in manifest: {patient_id!r}")
+                    continue
+
+                # Wait for a free slot before reading the next entry, so only
+                # ``concurrency`` entries are on disk but not yet processed
+                await slots.acquire()
+                saved = None
+                try:
+                    saved = await asyncio.to_thread(_save_entry, open_entry)
+                    report = self.create_report(
+                        saved, patient_id, row.get("title") or PurePosixPath(entry).stem,
+                        row.get("report_type") or self.report_type, PurePosixPath(entry).name
+                    )
+                except Exception as e:
+                    slots.release()
+                    if saved is not None:
+                        # Not handed to the blob store; don't leave it in UPLOAD_DIR
+                        saved["temp_path"].unlink(missing_ok=True)
+                    record(entry, error=str(e))
+                    continue
+
+                if report["status"] in ("analyzed", "error"):
+                    # Identical file already analyzed
+                    slots.release()
+                    record(entry, report_id=report["id"], status=report["status"])
+                    continue
+
+                task = asyncio.create_task(process(entry, report))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "import_id": self.id,
+            "source": str(self.source),
+            "status": self.status,
+            "error": self.error,
+            **self.counts,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+def _save_entry(open_entry: Callable[[], BinaryIO]) -> Dict[str, Any]:
+    with open_entry() as f:
+        return save_file_stream(f, Path(UPLOAD_DIR))
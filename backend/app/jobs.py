@@ -0,0 +1,136 @@
+# app/jobs.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+from app.config import ENRICHMENT_CONCURRENCY, JOB_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+
+class JobRunner:
+    """
+    In-process background job runner
+    Jobs are coroutine functions consumed from a queue by a fixed number of
+    asyncio workers. Jobs publish progress events that HTTP handlers can
+    long-poll or stream to clients.
+    """
+
+    def __init__(self, concurrency: int = JOB_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._subscribers: Dict[Hashable, Set[asyncio.Queue]] = {}
+        self._active: Set[Hashable] = set()
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"job-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks; queued jobs are dropped"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def submit(self, job_id: Hashable, func: Callable[..., Awaitable[Any]], *args: Any) -> None:
+        """Queue ``func(*args)`` to run in the background under ``job_id``"""
+        if self._queue is None:
+            self.start()
+        self._active.add(job_id)
+        self._queue.put_nowait((job_id, func, args))
+
+    def is_active(self, job_id: Hashable) -> bool:
+        return job_id in self._active
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id, func, args = await self._queue.get()
+            try:
+                await func(*args)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}")
+            finally:
+                self._active.discard(job_id)
+                self._queue.task_done()
+
+    # Event fan-out for status polling and SSE
+
+    def subscribe(self, job_id: Hashable) -> asyncio.Queue:
+        """Register a listener for events published under ``job_id``"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: Hashable, queue: asyncio.Queue) -> None:
+        listeners = self._subscribers.get(job_id)
+        if listeners is not None:
+            listeners.discard(queue)
+            if not listeners:
+                del self._subscribers[job_id]
+
+    def publish(self, job_id: Hashable, event: Dict[str, Any]) -> None:
+        """Deliver ``event`` to everyone subscribed to ``job_id``"""
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(event)
+
+
+_job_runner: Optional[JobRunner] = None
+
+
+def start_job_runner() -> JobRunner:
+    """Create and start the shared job runner (called from the app lifespan)"""
+    global _job_runner
+    if _job_runner is None:
+        _job_runner = JobRunner()
+    _job_runner.start()
+    return _job_runner
+
+
+def get_job_runner() -> JobRunner:
+    """Return the shared job runner, creating it on first use"""
+    global _job_runner
+    if _job_runner is None:
+        _job_runner = JobRunner()
+    return _job_runner
+
+
+async def stop_job_runner() -> None:
+    """Stop the shared job runner and the enrichment runner"""
+    global _job_runner, _enrichment_runner
+    if _job_runner is not None:
+        await _job_runner.stop()
+        _job_runner = None
+    if _enrichment_runner is not None:
+        await _enrichment_runner.stop()
+        _enrichment_runner = None
+
+
+_enrichment_runner: Optional[JobRunner] = None
+
+
+def get_enrichment_runner() -> JobRunner:
+    """
+    Return the runner for LLM enrichment jobs, creating it on first use
+    Kept apart from the shared runner so slow LLM calls never hold up
+    parsing of newly uploaded reports. Events are still published on the
+    shared runner, where status listeners subscribe.
+    """
+    global _enrichment_runner
+    if _enrichment_runner is None:
+        _enrichment_runner = JobRunner(ENRICHMENT_CONCURRENCY)
+    return _enrichment_runner
@@ -0,0 +1,309 @@
+# app/llm_client.py
+import asyncio
+import json
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from app.config import (
+    LLM_API_KEY, LLM_BASE_URL, LLM_BREAKER_FAILURES, LLM_BREAKER_RESET, LLM_CONNECT_TIMEOUT,
+    LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES, LLM_MODEL, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY,
+    LLM_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+# Responses worth another attempt: rate limiting and transient server errors
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Raised when the LLM provider does not return a usable completion"""
+
+
+class LLMRequestError(LLMError):
+    """
+    Raised when the provider rejects the request itself (a non-retryable 4xx,
+    e.g. context too long) or answers with a body that is not a completion.
+    Says nothing about the provider's health, so it does not trip the breaker.
+    """
+
+
+class LLMTimeout(LLMError):
+    """Raised when a call does not finish within its deadline"""
+
+
+class LLMUnavailable(LLMError):
+    """Raised without calling the provider while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+    Opens after ``failure_threshold`` failed calls in a row, rejecting calls
+    for ``reset_timeout`` seconds; then lets a single probe call through and
+    closes again if it succeeds, or reopens if it fails.
+    """
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_timeout: float = LLM_BREAKER_RESET):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._opened = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; in half-open state only one probe at a time"""
+        if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                return False
+            self._probing = True
+        return self.state != "open"
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            if self.state != "open":
+                self._opened += 1
+                logger.warning(f"LLM circuit breaker opened after {self._failures} failures")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self) -> None:
+        """Give up a probe slot without an outcome, e.g. when the caller was cancelled"""
+        self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self._failures, "times_opened": self._opened}
+
+
+class LLMClient:
+    """
+    Async client for an OpenAI-compatible chat completions API
+    Keeps a pool of HTTP connections, runs at most ``max_concurrency`` calls
+    at once, and gives every call an overall ``timeout`` covering the wait
+    for a slot and all attempts. Rate limiting, transient server errors and
+    network errors are retried with exponential backoff and full jitter.
+    Calls are rejected straight away while the circuit breaker is open.
+    Server errors, rate limiting, network errors and timeouts count towards
+    opening it; requests the provider rejects (LLMRequestError) do not.
+    """
+
+    def __init__(self, base_url: str = LLM_BASE_URL, api_key: Optional[str] = LLM_API_KEY,
+                 model: str = LLM_MODEL, timeout: float = LLM_TIMEOUT,
+                 connect_timeout: float = LLM_CONNECT_TIMEOUT, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_retries: int = LLM_MAX_RETRIES, retry_base_delay: float = LLM_RETRY_BASE_DELAY,
+                 retry_max_delay: float = LLM_RETRY_MAX_DELAY, breaker: Optional[CircuitBreaker] = None):
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max(1, max_concurrency),
+                                max_keepalive_connections=max(1, max_concurrency))
+        )
+        self._counts = {"calls": 0, "succeeded": 0, "failed": 0, "timed_out": 0,
+                        "rejected": 0, "retries": 0}
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def chat(self, messages: List[Dict[str, str]], max_tokens: int = 1000,
+                   temperature: float = 0.3, timeout: Optional[float] = None) -> str:
+        """Return the content of the first completion choice for ``messages``"""
+        self._admit()
+        payload = {"model": self.model, "messages": messages,
+                   "max_tokens": max_tokens, "temperature": temperature}
+        sending = asyncio.Event()
+        timeout = timeout or self.timeout
+        async with self._outcome(sending, timeout):
+            content = await asyncio.wait_for(self._call(payload, sending), timeout)
+        return content
+
+    async def stream_chat(self, messages: List[Dict[str, str]], max_tokens: int = 1000,
+                          temperature: float = 0.3, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Yield the content of the first completion choice piece by piece as it is generated
+        The deadline covers the whole stream. Failures are only retried until
+        the response starts; after that the stream ends with LLMError.
+        """
+        self._admit()
+        payload = {"model": self.model, "messages": messages, "max_tokens": max_tokens,
+                   "temperature": temperature, "stream": True}
+        sending = asyncio.Event()
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+        async with self._outcome(sending, timeout):
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+            try:
+                sending.set()
+                response = await asyncio.wait_for(self._send(payload, stream=True), deadline - time.monotonic())
+                try:
+                    lines = response.aiter_lines()
+                    while True:
+                        try:
+                            line = await asyncio.wait_for(lines.__anext__(), deadline - time.monotonic())
+                        except StopAsyncIteration:
+                            raise LLMError("Completion stream ended without [DONE]")
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        piece = _delta_content(data)
+                        if piece:
+                            yield piece
+                finally:
+                    await response.aclose()
+            finally:
+                self._slots.release()
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            self._counts["rejected"] += 1
+            raise LLMUnavailable("LLM circuit breaker is open")
+        self._counts["calls"] += 1
+
+    @asynccontextmanager
+    async def _outcome(self, sending: asyncio.Event, timeout: float) -> AsyncIterator[None]:
+        """Count the call's outcome, report it to the breaker and turn errors into LLMError"""
+        try:
+            yield
+        except asyncio.TimeoutError:
+            self._counts["timed_out"] += 1
+            if sending.is_set():
+                self.breaker.record_failure()
+            else:
+                # The whole deadline went on waiting for a slot: our backlog, not a provider failure
+                self.breaker.release()
+            raise LLMTimeout(f"LLM call did not finish within {timeout}s")
+        except LLMRequestError:
+            self._counts["failed"] += 1
+            self.breaker.release()
+            raise
+        except LLMError:
+            self._counts["failed"] += 1
+            self.breaker.record_failure()
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            # Abandoned by the caller, no verdict on the provider
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self._counts["failed"] += 1
+            self.breaker.record_failure()
+            raise LLMError(f"{type(e).__name__}: {e}") from e
+        self._counts["succeeded"] += 1
+        self.breaker.record_success()
+
+    async def _call(self, payload: Dict[str, Any], sending: asyncio.Event) -> str:
+        async with self._slots:
+            sending.set()
+            response = await self._send(payload)
+            return _completion_content(response)
+
+    async def _send(self, payload: Dict[str, Any], stream: bool = False) -> httpx.Response:
+        """POST the request, retrying transient failures; returns a 200 response, still open if ``stream``"""
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                request = self._client.build_request("POST", "/chat/completions", json=payload)
+                response = await self._client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                # Connection errors and per-request timeouts
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code == 200:
+                    return response
+                await response.aread()
+                await response.aclose()
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if 400 <= response.status_code < 500 and response.status_code not in RETRY_STATUSES:
+                    raise LLMRequestError(error)
+                if response.status_code not in RETRY_STATUSES:
+                    raise LLMError(error)
+                retry_after = _retry_after(response)
+
+            if attempt == self.max_retries:
+                raise LLMError(f"Giving up after {attempt + 1} attempts; last error {error}")
+            self._counts["retries"] += 1
+            # Full jitter keeps callers that failed together from retrying together
+            delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.retry_max_delay))
+            logger.info(f"LLM attempt {attempt + 1} failed ({error}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+        raise LLMError("No attempts made")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call counters and breaker state for health checks"""
+        return {**self._counts, "breaker": self.breaker.stats()}
+
+
+def _completion_content(response: httpx.Response) -> str:
+    try:
+        return response.json()["choices"][0]["message"]["content"]
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        raise LLMRequestError(f"Malformed completion response: {e}")
+
+
+def _delta_content(data: str) -> str:
+    """Content piece of one streamed completion chunk"""
+    try:
+        choices = json.loads(data).get("choices") or [{}]
+        return choices[0].get("delta", {}).get("content") or ""
+    except (ValueError, AttributeError, TypeError) as e:
+        raise LLMRequestError(f"Malformed completion chunk: {e}")
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+_llm_client: Optional[LLMClient] = None
+
+
+def start_llm_client(**options: Any) -> Optional[LLMClient]:
+    """
+    Create the process-wide client if an LLM provider is configured
+    ``options`` are passed to LLMClient, overriding the configured settings.
+    """
+    global _llm_client
+    if _llm_client is None and LLM_API_KEY:
+        _llm_client = LLMClient(**options)
+    return _llm_client
+
+
+async def stop_llm_client() -> None:
+    global _llm_client
+    if _llm_client is not None:
+        await _llm_client.aclose()
+        _llm_client = None
+
+
+def get_llm_client() -> Optional[LLMClient]:
+    """Return the running client, or None when no LLM provider is configured"""
+    return _llm_client
@@ -2,12 +2,20 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
+import asyncio
 import uvicorn
 import os
 from contextlib import asynccontextmanager
 
 # Import API routes
 from app.api import router as api_router
+from app.workers import start_worker_pool, shutdown_worker_pool
+from app.jobs import start_job_runner, stop_job_runner
+from app.llm_client import get_llm_client, start_llm_client, stop_llm_client
+from app.ai_inference import routing_stats
+from app.config import UPLOAD_DIR, TEXT_CACHE_ENABLED, ANALYSIS_CACHE_ENABLED, ANALYSIS_ROUTING_ENABLED
+from app.utils.text_cache import get_text_cache
+from app.utils.analysis_cache import get_analysis_cache
 
 # Global variables for app state
 app_state = {}
@@ -30,10 +38,26 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️  Warning: AI model loading failed: {e}")
     
+    # CPU worker pool for OCR, parsing and rule analysis
+    app_state["worker_pool"] = start_worker_pool()
+    print(f"✅ CPU worker pool started ({app_state['worker_pool'].max_workers} workers)")
+    
+    # Pooled LLM client; analysis uses rules only when no provider is configured
+    if start_llm_client():
+        print(f"✅ LLM client started ({get_llm_client().model})")
+    else:
+        print("ℹ️  No LLM provider configured, using rule-based analysis")
+    
+    # Background runner for report-processing jobs
+    app_state["job_runner"] = start_job_runner()
+    
     yield
     
     # Shutdown
     print("🔄 Shutting down Diabetes Monitor API...")
+    await stop_job_runner()
+    await stop_llm_client()
+    shutdown_worker_pool()
     app_state.clear()
 
 # Create FastAPI app with lifespan management
@@ -71,7 +95,14 @@ async def health_check():
     return {
         "status": "healthy",
         "version": app_state.get("version", "unknown"),
-        "message": "Diabetes Monitor API is running"
+        "message": "Diabetes Monitor API is running",
+        "worker_pool": app_state["worker_pool"].stats() if "worker_pool" in app_state else None,
+        "queued_jobs": app_state["job_runner"].queued if "job_runner" in app_state else None,
+        # SQLite queries; keep them off the event loop
+        "text_cache": await asyncio.to_thread(lambda: get_text_cache().stats()) if TEXT_CACHE_ENABLED else None,
+        "analysis_cache": get_analysis_cache().stats() if ANALYSIS_CACHE_ENABLED else None,
+        "llm": get_llm_client().stats() if get_llm_client() else None,
+        "routing": routing_stats() if get_llm_client() and ANALYSIS_ROUTING_ENABLED else None
     }
 
 # Root endpoint
@@ -112,8 +143,8 @@ async def general_exception_handler(request, exc):
     )
 
 # Static files (for serving uploaded files, if needed)
-if os.path.exists("uploads"):
-    app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+if os.path.exists(UPLOAD_DIR):
+    app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 
 if __name__ == "__main__":
     # Development server
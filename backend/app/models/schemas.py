@@ -89,6 +89,10 @@ class AIAnalysis(BaseModel):
     concerns: Optional[List[str]] = []
     status: str = "completed"
     confidence_score: Optional[float] = Field(None, ge=0, le=1)
+    engine: Optional[str] = None  # "llm" or "rules"
+    revision: Optional[int] = None  # increases every time the report's analysis is replaced
+    analyzed_at: Optional[str] = None
+    enrichment: Optional[str] = None  # pending | completed | failed, for provisional rules results
 
 class ReportResponse(ReportBase):
     id: int
@@ -112,6 +116,12 @@ class ReportListResponse(BaseModel):
     has_more: bool
 
 # Dashboard Models
+class ReportImportRequest(BaseModel):
+    source: str = Field(..., description="ZIP archive or directory, relative to IMPORT_ROOT")
+    manifest: Optional[str] = Field(None, description="Manifest CSV, relative to IMPORT_ROOT")
+    default_patient_id: Optional[int] = None
+    report_type: ReportType = ReportType.GENERAL
+
 class HealthTrends(BaseModel):
     improving: int = 0
     stable: int = 0
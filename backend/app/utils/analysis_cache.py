@@ -0,0 +1,121 @@
+# app/utils/analysis_cache.py
+import asyncio
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.config import ANALYSIS_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_TTL
+
+
+class AnalysisCache:
+    """
+    In-memory cache of report analyses
+    Entries expire ``ttl`` seconds after they were computed, and the least
+    recently used ones are evicted beyond ``max_entries``. Requests for a key
+    that is already being computed wait for that computation instead of
+    starting their own, and the computation carries on if the request that
+    started it goes away. Callers get their own copy of the result.
+    """
+
+    def __init__(self, max_entries: int = ANALYSIS_CACHE_MAX_ENTRIES, ttl: float = ANALYSIS_CACHE_TTL):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @staticmethod
+    def make_key(text: str, report_type: str, version: str) -> str:
+        text_hash = hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+        return hashlib.sha256("|".join([version, report_type, text_hash]).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached analysis for ``key``, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, analysis = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            self._expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(analysis)
+
+    def put(self, key: str, analysis: Dict[str, Any]) -> None:
+        self._entries[key] = (time.monotonic(), copy.deepcopy(analysis))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Dict[str, Any]]],
+                             cacheable: Callable[[Dict[str, Any]], bool] = lambda analysis: True) -> Dict[str, Any]:
+        """
+        Return the cached analysis for ``key``, computing it with ``compute()``
+        on a miss; results are stored only when ``cacheable(result)`` holds
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self._hits += 1
+            return cached
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self._misses += 1
+            task = asyncio.ensure_future(self._compute(key, compute, cacheable))
+            # Retrieve the outcome even if every waiter has gone
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._in_flight[key] = task
+        else:
+            self._coalesced += 1
+        return copy.deepcopy(await asyncio.shield(task))
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[Dict[str, Any]]],
+                       cacheable: Callable[[Dict[str, Any]], bool]) -> Dict[str, Any]:
+        try:
+            analysis = await compute()
+            if cacheable(analysis):
+                self.put(key, analysis)
+            return analysis
+        finally:
+            del self._in_flight[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return cache counters for health checks; ``hit_rate`` counts requests
+        served from the cache or joined to an in-flight computation
+        """
+        lookups = self._hits + self._coalesced + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "in_flight": len(self._in_flight),
+            "hits": self._hits,
+            "coalesced": self._coalesced,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "hit_rate": round((self._hits + self._coalesced) / lookups, 3) if lookups else None
+        }
+
+
+_analysis_cache: Optional[AnalysisCache] = None
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Return the process-wide analysis cache"""
+    global _analysis_cache
+    if _analysis_cache is None:
+        _analysis_cache = AnalysisCache()
+    return _analysis_cache
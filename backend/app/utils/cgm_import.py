@@ -0,0 +1,205 @@
+# app/utils/cgm_import.py
+import codecs
+import csv
+import json
+import math
+from datetime import datetime, timezone
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+MMOL_TO_MGDL = 18.0182
+GLUCOSE_LIMITS = (20.0, 600.0)  # mg/dL; anything outside is a meter error or placeholder
+
+# Column headers (CSV, matched as substrings) and keys (NDJSON, exact) for the
+# reading time and glucose value, most specific first. Covers Dexcom Clarity,
+# LibreView and Nightscout exports as well as plain timestamp,glucose files.
+TIMESTAMP_KEYS = ("timestamp", "device timestamp", "datetime", "date_time", "date time", "datestring", "date", "time")
+VALUE_KEYS = ("glucose", "sgv", "value", "reading", "bg")
+UNIT_KEYS = ("unit", "units")
+
+# Non-ISO timestamp formats meters write; ISO 8601 is always accepted
+TIMESTAMP_FORMATS = ("%d-%m-%Y %H:%M", "%d-%m-%Y %H:%M:%S", "%m/%d/%Y %H:%M", "%m/%d/%Y %I:%M %p",
+                     "%Y/%m/%d %H:%M", "%Y/%m/%d %H:%M:%S")
+
+MAX_TIMESTAMP = 4102444800  # 2100-01-01
+HEADER_SEARCH_ROWS = 50  # exports put a few lines of metadata before the header
+
+
+class CGMExportParser:
+    """
+    Parse a CSV or NDJSON glucose meter export that arrives in pieces
+    feed() takes raw bytes and returns the readings on the complete lines
+    so far as (timestamps, values) arrays: seconds since the epoch and
+    mg/dL. The format is told from the first character ("{" for NDJSON).
+    CSV headers may follow some lines of metadata. Values in mmol/L are
+    converted, per the value column's header, the record's "unit" or the
+    ``unit`` given. Timestamps without a zone are taken as UTC. Rows
+    without a usable timestamp and value (other event types, "Low"/"High"
+    placeholders, readings outside GLUCOSE_LIMITS) are counted in
+    ``skipped``.
+    """
+
+    def __init__(self, unit: str = "mg/dL"):
+        if unit.lower() not in ("mg/dl", "mmol/l"):
+            raise ValueError(f"Unknown glucose unit: {unit}")
+        self.unit = unit.lower()
+        self.format: Optional[str] = None
+        self.rows = 0
+        self.skipped = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._tail = ""
+        self._header_rows = 0
+        self._delimiter = ","
+        self._columns: Optional[Tuple[int, int]] = None
+        self._column_unit = self.unit
+        self._timestamp_format: Optional[str] = None
+
+    @property
+    def header_found(self) -> bool:
+        return self.format == "ndjson" or self._columns is not None
+
+    def feed(self, data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+        lines = (self._tail + self._decoder.decode(data)).split("\n")
+        self._tail = lines.pop()
+        return self._parse_lines(lines)
+
+    def close(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Readings on the last line, which has no newline after it"""
+        lines = [self._tail + self._decoder.decode(b"", final=True)]
+        self._tail = ""
+        return self._parse_lines(lines)
+
+    def _parse_lines(self, lines: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        timestamps: List[int] = []
+        values: List[float] = []
+        lines = [line.rstrip("\r") for line in lines if line.strip()]
+        if lines and self.format is None:
+            self.format = "ndjson" if lines[0].lstrip().startswith("{") else "csv"
+        if self.format == "ndjson":
+            for line in lines:
+                self._add_record(line, timestamps, values)
+        elif lines:
+            for row in csv.reader(lines, delimiter=self._find_delimiter(lines)):
+                if self._columns is None:
+                    self._find_header(row)
+                    continue
+                self._add_row(row, timestamps, values)
+        return np.array(timestamps, dtype=np.int64), np.array(values, dtype=np.float32)
+
+    def _find_delimiter(self, lines: List[str]) -> str:
+        if self._columns is None:
+            # Decided on the lines that may hold the header, then kept
+            sample = lines[0] if len(lines) == 1 else max(lines[:HEADER_SEARCH_ROWS], key=len)
+            self._delimiter = max(",;\t", key=sample.count)
+        return self._delimiter
+
+    def _find_header(self, row: List[str]) -> None:
+        self._header_rows += 1
+        if self._header_rows > HEADER_SEARCH_ROWS:
+            raise ValueError("No timestamp and glucose columns found in the export")
+        headers = [cell.strip().lower() for cell in row]
+        timestamp_column = _find_column(headers, TIMESTAMP_KEYS)
+        value_column = _find_column(headers, VALUE_KEYS)
+        if timestamp_column is None or value_column is None or timestamp_column == value_column:
+            return
+        self._columns = (timestamp_column, value_column)
+        value_header = headers[value_column]
+        if "mmol" in value_header:
+            self._column_unit = "mmol/l"
+        elif "mg" in value_header:
+            self._column_unit = "mg/dl"
+
+    def _add_row(self, row: List[str], timestamps: List[int], values: List[float]) -> None:
+        self.rows += 1
+        timestamp_column, value_column = self._columns
+        if len(row) <= max(timestamp_column, value_column):
+            self.skipped += 1
+            return
+        self._add_reading(self._parse_timestamp(row[timestamp_column]), row[value_column], self._column_unit,
+                          timestamps, values)
+
+    def _add_record(self, line: str, timestamps: List[int], values: List[float]) -> None:
+        self.rows += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            self.skipped += 1
+            return
+        record = {str(key).lower(): value for key, value in record.items()}
+        # Records may carry the time several ways (Nightscout: dateString and date); the first that parses wins
+        seconds = next((seconds for seconds in (self._parse_timestamp(record.get(key)) for key in TIMESTAMP_KEYS)
+                        if seconds is not None), None)
+        value = next((record[key] for key in VALUE_KEYS if record.get(key) is not None), None)
+        unit = next((str(record[key]).lower() for key in UNIT_KEYS if record.get(key)), self.unit)
+        self._add_reading(seconds, value, "mmol/l" if "mmol" in unit else "mg/dl", timestamps, values)
+
+    def _add_reading(self, seconds: Optional[int], value: Any, unit: str,
+                     timestamps: List[int], values: List[float]) -> None:
+        glucose = _parse_number(value)
+        if glucose is not None and unit == "mmol/l":
+            glucose *= MMOL_TO_MGDL
+        if seconds is None or glucose is None or not GLUCOSE_LIMITS[0] <= glucose <= GLUCOSE_LIMITS[1]:
+            self.skipped += 1
+            return
+        timestamps.append(seconds)
+        values.append(glucose)
+
+    def _parse_timestamp(self, timestamp: Any) -> Optional[int]:
+        """Seconds since the epoch for an ISO 8601 or meter-format timestamp, or epoch (milli)seconds"""
+        if timestamp is None or isinstance(timestamp, bool):
+            return None
+        if isinstance(timestamp, (int, float)):
+            seconds = timestamp / 1000 if timestamp > 1e11 else timestamp
+            return int(seconds) if math.isfinite(seconds) and 0 <= seconds < MAX_TIMESTAMP else None
+        text = str(timestamp).strip()
+        if not text:
+            return None
+        number = _parse_number(text)
+        if number is not None:
+            return self._parse_timestamp(number)
+        parsed = None
+        formats = [self._timestamp_format] if self._timestamp_format else []
+        for timestamp_format in formats + [None] + list(TIMESTAMP_FORMATS):
+            try:
+                if timestamp_format is None:
+                    parsed = datetime.fromisoformat(text)
+                else:
+                    parsed = datetime.strptime(text, timestamp_format)
+            except ValueError:
+                continue
+            if timestamp_format is not None:
+                self._timestamp_format = timestamp_format
+            break
+        if parsed is None:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return self._parse_timestamp(parsed.timestamp())
+
+
+def _find_column(headers: List[str], keys: Tuple[str, ...]) -> Optional[int]:
+    for key in keys:
+        for index, header in enumerate(headers):
+            if key in header:
+                return index
+    return None
+
+
+def _parse_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        try:
+            # Decimal comma, as in European exports
+            return float(text.replace(",", "."))
+        except ValueError:
+            return None
+
@@ -0,0 +1,111 @@
+# app/utils/chunking.py
+import logging
+import math
+import re
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Characters per token assumed when tiktoken is not installed; on the
+# conservative side for English clinical text so chunks are not oversized
+CHARS_PER_TOKEN = 3.5
+
+_SENTENCE_END = re.compile(r'(?<=[.!?;])\s+')
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # The encoding is downloaded on first use; offline, estimate instead
+            logger.warning(f"tiktoken encoding unavailable, estimating tokens: {e}")
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in ``text``; exact with tiktoken, otherwise estimated from its length"""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Split ``text`` into consecutive chunks of at most ``max_tokens`` tokens
+    Cuts between paragraphs where possible, then between lines, then between
+    sentences, and only splits inside a sentence that is too long on its own.
+    Joining the chunks gives back the text apart from whitespace at the cuts.
+    """
+    max_tokens = max(1, max_tokens)
+    if count_tokens(text) <= max_tokens:
+        return [text] if text.strip() else []
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece, tokens in _pieces(text, max_tokens, (r'\n\s*\n', r'\n', _SENTENCE_END)):
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens + 1  # the joining newline
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _pieces(text: str, max_tokens: int, separators: tuple) -> Iterator[Tuple[str, int]]:
+    """Yield ``(piece, tokens)`` with every piece under ``max_tokens``, splitting on the coarsest separator that works"""
+    for part in re.split(separators[0], text):
+        if not part.strip():
+            continue
+        tokens = count_tokens(part)
+        if tokens <= max_tokens:
+            yield part.strip(), tokens
+        elif len(separators) > 1:
+            yield from _pieces(part, max_tokens, separators[1:])
+        else:
+            yield from _hard_split(part.strip(), max_tokens)
+
+
+def _hard_split(text: str, max_tokens: int) -> Iterator[Tuple[str, int]]:
+    """Last resort for a single over-long sentence: cut it by token count"""
+    encoding = _get_encoding()
+    if encoding is not None:
+        ids = encoding.encode(text, disallowed_special=())
+        for start in range(0, len(ids), max_tokens):
+            piece = encoding.decode(ids[start:start + max_tokens])
+            yield piece, count_tokens(piece)
+        return
+    size = max(1, int(max_tokens * CHARS_PER_TOKEN))
+    for start in range(0, len(text), size):
+        piece = text[start:start + size]
+        yield piece, count_tokens(piece)
+
+
+def select_chunks(scores: List[float], costs: List[int], budget: Optional[int]) -> List[int]:
+    """
+    Indexes of the chunks to analyze within a token ``budget``, in document order
+    Takes chunks from the highest score down, skipping any that no longer
+    fit; ties go to the earlier chunk. All chunks when ``budget`` is None.
+    """
+    if budget is None:
+        return list(range(len(scores)))
+    selected = []
+    remaining = budget
+    for index in sorted(range(len(scores)), key=lambda index: (-scores[index], index)):
+        if costs[index] <= remaining:
+            selected.append(index)
+            remaining -= costs[index]
+    return sorted(selected)
@@ -0,0 +1,188 @@
+# app/utils/glucose_store.py
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import GLUCOSE_STORE_DIR
+
+TIMESTAMP_DTYPE = np.dtype("<i8")  # seconds since the epoch, UTC
+VALUE_DTYPE = np.dtype("<f4")      # mg/dL
+
+
+class GlucoseStore:
+    """
+    Per-patient glucose time series as packed columns on disk
+    Each patient has ``<root>/<patient_id>/timestamps.i8`` and ``values.f4``,
+    raw little-endian arrays kept sorted by timestamp with one reading per
+    timestamp. New readings are appended to the files; a batch reaching back
+    before the last stored reading is merged in and the columns rewritten.
+    Reads memory-map the files and slice them, so a range costs no copy.
+
+    ``<root>/<patient_id>`` is a symlink to the current generation of the
+    columns, so a rewrite replaces both at once. A torn append (one column
+    longer than the other) is ignored on read and cut off by the next append.
+
+    Listeners are called with ``(patient_id, timestamps, values)`` for the
+    readings each append actually added, and with None for both once a
+    patient's readings are deleted, while the patient's lock is held.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._locks: Dict[int, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._maps: Dict[int, Tuple[int, np.ndarray, np.ndarray]] = {}
+        self._listeners: List[Callable[[int, Optional[np.ndarray], Optional[np.ndarray]], None]] = []
+
+    def add_listener(self, listener: Callable[[int, Optional[np.ndarray], Optional[np.ndarray]], None]) -> None:
+        self._listeners.append(listener)
+
+    def _link(self, patient_id: int) -> Path:
+        return self.root / str(int(patient_id))
+
+    def _paths(self, patient_id: int, directory: Optional[Path] = None) -> Tuple[Path, Path]:
+        directory = directory or self._link(patient_id)
+        return directory / "timestamps.i8", directory / "values.f4"
+
+    def _new_generation(self, patient_id: int) -> Path:
+        directory = self.root / f"{int(patient_id)}.{uuid.uuid4().hex[:12]}"
+        directory.mkdir(parents=True)
+        return directory
+
+    def _publish(self, patient_id: int, directory: Path) -> None:
+        """Point the patient's link at ``directory`` and remove the generation it replaces"""
+        link = self._link(patient_id)
+        previous = link.resolve() if link.is_symlink() else None
+        temp_link = self.root / f".{directory.name}.link"
+        temp_link.symlink_to(directory.name, target_is_directory=True)
+        os.replace(temp_link, link)
+        self._maps.pop(patient_id, None)
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+
+    def lock(self, patient_id: int) -> threading.Lock:
+        """The lock appends hold for a patient; hold it to read columns no append can change meanwhile"""
+        with self._locks_guard:
+            return self._locks.setdefault(patient_id, threading.Lock())
+
+    def count(self, patient_id: int) -> int:
+        """Number of readings stored for a patient"""
+        timestamps_path, values_path = self._paths(patient_id)
+        try:
+            return min(timestamps_path.stat().st_size // TIMESTAMP_DTYPE.itemsize,
+                       values_path.stat().st_size // VALUE_DTYPE.itemsize)
+        except FileNotFoundError:
+            return 0
+
+    def columns(self, patient_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """All of a patient's timestamps and values, as read-only memory maps"""
+        length = self.count(patient_id)
+        cached = self._maps.get(patient_id)
+        if cached is not None and cached[0] == length:
+            return cached[1], cached[2]
+        if length == 0:
+            timestamps, values = np.empty(0, TIMESTAMP_DTYPE), np.empty(0, VALUE_DTYPE)
+        else:
+            timestamps_path, values_path = self._paths(patient_id)
+            timestamps = np.memmap(timestamps_path, dtype=TIMESTAMP_DTYPE, mode="r", shape=(length,))
+            values = np.memmap(values_path, dtype=VALUE_DTYPE, mode="r", shape=(length,))
+        self._maps[patient_id] = (length, timestamps, values)
+        return timestamps, values
+
+    def read(self, patient_id: int, start: Optional[int] = None,
+             end: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Timestamps and values of the readings with ``start <= timestamp < end``
+        Either bound may be None. The arrays are views of the memory maps.
+        """
+        timestamps, values = self.columns(patient_id)
+        first = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+        last = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side="left"))
+        last = max(first, last)
+        return timestamps[first:last], values[first:last]
+
+    def append(self, patient_id: int, timestamps: Any, values: Any) -> Dict[str, int]:
+        """
+        Add readings for a patient; readings at an already stored timestamp are dropped
+        Returns the number of readings added and dropped as duplicates, and
+        the patient's new total.
+        """
+        timestamps = np.asarray(timestamps, dtype=TIMESTAMP_DTYPE)
+        values = np.asarray(values, dtype=VALUE_DTYPE)
+        if timestamps.shape != values.shape:
+            raise ValueError("timestamps and values must have the same length")
+        received = len(timestamps)
+        # Sort the batch and keep the first reading per timestamp
+        order = np.argsort(timestamps, kind="stable")
+        timestamps, first = np.unique(timestamps[order], return_index=True)
+        values = values[order][first]
+
+        with self.lock(patient_id):
+            timestamps_path, values_path = self._paths(patient_id)
+            length = self.count(patient_id)
+            stored_timestamps, stored_values = self.columns(patient_id)
+            if length and len(timestamps) and timestamps[0] <= stored_timestamps[-1]:
+                new = ~np.isin(timestamps, stored_timestamps, assume_unique=True)
+                timestamps, values = timestamps[new], values[new]
+                if len(timestamps) and timestamps[0] < stored_timestamps[-1]:
+                    self._rewrite(patient_id, np.concatenate([stored_timestamps, timestamps]),
+                                  np.concatenate([stored_values, values]))
+                    self._notify(patient_id, timestamps, values)
+                    return self._result(patient_id, len(timestamps), received)
+            if len(timestamps):
+                if not self._link(patient_id).exists():
+                    self._publish(patient_id, self._new_generation(patient_id))
+                for path, column, dtype in ((values_path, values, VALUE_DTYPE),
+                                            (timestamps_path, timestamps, TIMESTAMP_DTYPE)):
+                    with open(path, "ab") as handle:
+                        handle.truncate(length * dtype.itemsize)
+                        handle.write(column.tobytes())
+                self._notify(patient_id, timestamps, values)
+        return self._result(patient_id, len(timestamps), received)
+
+    def _rewrite(self, patient_id: int, timestamps: np.ndarray, values: np.ndarray) -> None:
+        """Replace a patient's columns with the readings, sorted, as a new generation"""
+        order = np.argsort(timestamps, kind="stable")
+        directory = self._new_generation(patient_id)
+        for path, column in zip(self._paths(patient_id, directory), (timestamps[order], values[order])):
+            column.tofile(path)
+        self._publish(patient_id, directory)
+
+    def _notify(self, patient_id: int, timestamps: Optional[np.ndarray], values: Optional[np.ndarray]) -> None:
+        for listener in self._listeners:
+            listener(patient_id, timestamps, values)
+
+    def _result(self, patient_id: int, added: int, received: int) -> Dict[str, int]:
+        return {"added": added, "duplicates": received - added, "total": self.count(patient_id)}
+
+    def delete(self, patient_id: int) -> None:
+        with self.lock(patient_id):
+            self._maps.pop(patient_id, None)
+            link = self._link(patient_id)
+            if link.is_symlink():
+                directory = link.resolve()
+                link.unlink()
+                shutil.rmtree(directory, ignore_errors=True)
+            self._notify(patient_id, None, None)
+
+    def stats(self) -> Dict[str, int]:
+        patients = [int(path.name) for path in self.root.iterdir() if path.name.isdigit()] if self.root.exists() else []
+        return {
+            "patients": len(patients),
+            "readings": sum(self.count(patient_id) for patient_id in patients)
+        }
+
+
+_glucose_store: Optional[GlucoseStore] = None
+
+
+def get_glucose_store() -> GlucoseStore:
+    global _glucose_store
+    if _glucose_store is None:
+        _glucose_store = GlucoseStore(Path(GLUCOSE_STORE_DIR))
+    return _glucose_store
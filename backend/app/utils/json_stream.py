@@ -0,0 +1,199 @@
+# app/utils/json_stream.py
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+WHITESPACE = " \t\r\n"
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class _RawValue:
+    """Collects the source text of one JSON value and tells when it is complete"""
+
+    def __init__(self):
+        self.raw: List[str] = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.complete = False
+
+    def feed(self, char: str) -> bool:
+        """Take ``char`` if it belongs to the value; False means the value ended before it"""
+        if self.complete:
+            return False
+        if self.in_string:
+            self.raw.append(char)
+            if self.escaped:
+                self.escaped = False
+            elif char == '\\':
+                self.escaped = True
+            elif char == '"':
+                self.in_string = False
+                self.complete = self.depth == 0
+            return True
+        if self.depth == 0 and self.raw and (char in WHITESPACE or char in ',]}'):
+            # End of a number or literal
+            self.complete = True
+            return False
+        self.raw.append(char)
+        if char == '"':
+            self.in_string = True
+        elif char in '[{':
+            self.depth += 1
+        elif char in ']}':
+            self.depth -= 1
+            self.complete = self.depth == 0
+        return True
+
+    def value(self) -> Any:
+        text = "".join(self.raw)
+        try:
+            return json.loads(text)
+        except ValueError:
+            # Not valid JSON (e.g. 5/10); keep the text rather than lose the field
+            return text
+
+
+class IncrementalJSONParser:
+    """
+    Parse a JSON object that arrives in pieces, such as a streamed completion
+    feed() returns what became known from each piece, as events:
+
+        ("text", key, fragment)  more characters of a top-level string value
+        ("item", key, value)     one complete element of a top-level array
+        ("field", key, value)    a complete top-level value
+
+    Text before the opening brace and // comments between fields are
+    skipped, since models add both. Parsed fields collect in ``fields``.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._raw: Optional[_RawValue] = None
+        self._items: List[Any] = []
+        self._text: List[str] = []
+        self._pending = ""  # an escape sequence split across pieces
+        self._after_comment = "key"
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, Any]]:
+        events: List[Tuple[str, str, Any]] = []
+        fragment: List[str] = []
+        index = 0
+        while index < len(chunk) and not self.done:
+            char = chunk[index]
+            state = self._state
+            consumed = True
+
+            if state == "start":
+                if char == '{':
+                    self._state = "key"
+            elif state == "comment":
+                if char == '\n':
+                    self._state = self._after_comment
+            elif state == "key":
+                if char == '"':
+                    self._raw = _RawValue()
+                    self._raw.feed(char)
+                    self._state = "key_string"
+                elif char == '}':
+                    self.done = True
+                elif char == '/':
+                    self._skip_comment("key")
+            elif state == "key_string":
+                self._raw.feed(char)
+                if self._raw.complete:
+                    self._key = str(self._raw.value())
+                    self._state = "colon"
+            elif state == "colon":
+                if char == ':':
+                    self._state = "value"
+            elif state == "value":
+                if char in WHITESPACE:
+                    pass
+                elif char == '"':
+                    self._text = []
+                    self._state = "string"
+                elif char == '[':
+                    self._items = []
+                    self._state = "array"
+                else:
+                    self._raw = _RawValue()
+                    self._state = "scalar"
+                    consumed = False
+            elif state == "string":
+                if self._pending or char == '\\':
+                    self._pending += char
+                    decoded = _decode_escape(self._pending)
+                    if decoded is not None:
+                        fragment.append(decoded)
+                        self._pending = ""
+                elif char == '"':
+                    self._text.extend(fragment)
+                    if fragment:
+                        events.append(("text", self._key, "".join(fragment)))
+                    fragment = []
+                    self._finish_field(_join_surrogates("".join(self._text)), events)
+                else:
+                    fragment.append(char)
+            elif state == "array":
+                if char == ']':
+                    self._finish_field(self._items, events)
+                elif char == '/':
+                    self._skip_comment("array")
+                elif char not in WHITESPACE and char != ',':
+                    self._raw = _RawValue()
+                    self._state = "item"
+                    consumed = False
+            elif state == "item":
+                consumed = self._raw.feed(char)
+                if self._raw.complete:
+                    item = self._raw.value()
+                    self._items.append(item)
+                    events.append(("item", self._key, item))
+                    self._state = "array"
+            elif state == "scalar":
+                consumed = self._raw.feed(char)
+                if self._raw.complete:
+                    self._finish_field(self._raw.value(), events)
+
+            if consumed:
+                index += 1
+
+        if fragment:
+            self._text.extend(fragment)
+            events.append(("text", self._key, "".join(fragment)))
+        return events
+
+    def _skip_comment(self, resume: str) -> None:
+        self._state = "comment"
+        self._after_comment = resume
+
+    def _finish_field(self, value: Any, events: List[Tuple[str, str, Any]]) -> None:
+        self.fields[self._key] = value
+        events.append(("field", self._key, value))
+        self._state = "key"
+
+
+def _join_surrogates(text: str) -> str:
+    """Combine \\ud83d\\ude00-style surrogate pairs, which are decoded one escape at a time"""
+    try:
+        return text.encode("utf-16", "surrogatepass").decode("utf-16")
+    except UnicodeError:
+        return text
+
+
+def _decode_escape(sequence: str) -> Optional[str]:
+    """The character for a complete escape such as \\n or \\u00e9; None while incomplete"""
+    if len(sequence) < 2:
+        return None
+    if sequence[1] != 'u':
+        return _ESCAPES.get(sequence[1], sequence[1])
+    if len(sequence) < 6:
+        return None
+    try:
+        return chr(int(sequence[2:6], 16))
+    except ValueError:
+        return sequence
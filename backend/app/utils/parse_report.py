@@ -1,18 +1,135 @@
 # app/utils/parse_report.py
 import os
+import math
+import functools
+import time
+import threading
+import multiprocessing
 import fitz  # PyMuPDF for PDF parsing
+import numpy as np
 from PIL import Image
 import pytesseract
+from concurrent.futures import Executor, ProcessPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 import logging
 
+from app.config import (
+    PDF_PAGE_WORKERS, PDF_PARALLEL_MIN_PAGES, PDF_MIN_TEXT_CHARS,
+    OCR_TARGET_DPI, OCR_TARGET_GLYPH_PX, OCR_MAX_RENDER_PIXELS,
+    OCR_BACKEND, OCR_LANG, OCR_TESSDATA_PATH, OCR_PREPROCESS_PROFILE, TEXT_CACHE_ENABLED
+)
+from app.utils.text_cache import TextCache, file_sha256, get_text_cache
+from app.utils.vocabulary import get_vocabulary_automaton
+
 logger = logging.getLogger(__name__)
 
-def parse_uploaded_file(file_path: str) -> str:
+# Bump when a change to extraction would produce different text for the same file
+PARSER_VERSION = "2"
+
+class OCREngine:
+    """Interface for OCR backends"""
+    name = "base"
+    
+    def image_to_string(self, image: Image.Image) -> str:
+        raise NotImplementedError
+
+class PytesseractEngine(OCREngine):
+    """Runs the tesseract CLI per image; reloads the language model on every call"""
+    name = "pytesseract"
+    
+    def __init__(self, lang: str = OCR_LANG):
+        self.lang = lang
+    
+    def image_to_string(self, image: Image.Image) -> str:
+        return pytesseract.image_to_string(image, lang=self.lang)
+
+class TesserocrEngine(OCREngine):
+    """
+    In-process tesseract via the C API (tesserocr)
+    The engine and its traineddata are loaded once and reused for every image.
+    Instances are not thread-safe; get_ocr_engine keeps one per thread.
+    """
+    name = "tesserocr"
+    
+    def __init__(self, lang: str = OCR_LANG):
+        import tesserocr
+        kwargs = {"lang": lang}
+        if OCR_TESSDATA_PATH:
+            kwargs["path"] = OCR_TESSDATA_PATH
+        self._api = tesserocr.PyTessBaseAPI(**kwargs)
+    
+    def image_to_string(self, image: Image.Image) -> str:
+        if image.mode in ("L", "RGB"):
+            # Hand over raw pixels; avoids tesserocr's own image re-encoding.
+            # SetImageBytes only accepts bytes, so this costs one copy of the
+            # page: a few ms for a 300 dpi A4 page, small next to the OCR itself.
+            bands = len(image.getbands())
+            self._api.SetImageBytes(image.tobytes(), image.width, image.height, bands, image.width * bands)
+        else:
+            self._api.SetImage(image)
+        return self._api.GetUTF8Text()
+    
+    def close(self):
+        self._api.End()
+
+_ocr_engines = threading.local()
+
+def get_ocr_engine(lang: str = OCR_LANG) -> OCREngine:
+    """
+    Return this thread's long-lived OCR engine for ``lang``
+    OCR_BACKEND selects "tesserocr", "pytesseract" or "auto" (tesserocr when
+    installed, otherwise pytesseract).
+    """
+    engines = getattr(_ocr_engines, "engines", None)
+    if engines is None:
+        engines = _ocr_engines.engines = {}
+    
+    engine = engines.get(lang)
+    if engine is None:
+        engine = engines[lang] = _create_ocr_engine(lang)
+    return engine
+
+@functools.lru_cache(maxsize=None)
+def resolved_ocr_backend(lang: str = OCR_LANG) -> str:
+    """Name of the engine get_ocr_engine uses for ``lang`` in this environment"""
+    if OCR_BACKEND != "auto":
+        return OCR_BACKEND
+    engine = _create_ocr_engine(lang)
+    if isinstance(engine, TesserocrEngine):
+        engine.close()
+    return engine.name
+
+def _create_ocr_engine(lang: str) -> OCREngine:
+    if OCR_BACKEND in ("auto", "tesserocr"):
+        try:
+            return TesserocrEngine(lang)
+        except Exception as e:
+            if OCR_BACKEND == "tesserocr":
+                raise
+            logger.info(f"tesserocr unavailable ({e}), using pytesseract")
+    return PytesseractEngine(lang)
+
+def parse_uploaded_file(file_path: str, executor: Optional[Executor] = None,
+                        content_hash: Optional[str] = None) -> str:
     """
     Parse uploaded file and extract text content
     Supports PDF, images (PNG, JPG, JPEG)
+    Pass ``executor`` to spread PDF pages across an existing process pool.
+    """
+    return parse_uploaded_file_with_metadata(file_path, executor=executor, content_hash=content_hash)["text"]
+
+def parse_uploaded_file_with_metadata(file_path: str, executor: Optional[Executor] = None,
+                                      content_hash: Optional[str] = None,
+                                      on_page: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Parse uploaded file and return its text plus extraction metadata
+    Metadata lists, per page, the extraction method ("text" or "ocr") and time taken.
+    Results are cached on disk by content hash, parser version and OCR settings,
+    unless a page's OCR failed (counted in ``ocr_failed_pages``); pass
+    ``content_hash`` when it is already known to skip re-hashing the file.
+    ``on_page`` is called with each page's metadata (including ``page_count``)
+    as soon as the page is extracted; it is not called on a cache hit.
     """
     try:
         file_path = Path(file_path)
@@ -20,79 +137,332 @@ def parse_uploaded_file(file_path: str) -> str:
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        file_extension = file_path.suffix.lower()
+        cache_key = None
+        if TEXT_CACHE_ENABLED:
+            cache_key = text_cache_key(content_hash or file_sha256(str(file_path)))
+            cached = get_text_cache().get(cache_key)
+            if cached is not None:
+                cached["metadata"]["cached"] = True
+                return cached
         
-        if file_extension == '.pdf':
-            return extract_text_from_pdf(str(file_path))
-        elif file_extension in ['.png', '.jpg', '.jpeg']:
-            return extract_text_from_image(str(file_path))
-        else:
-            raise ValueError(f"Unsupported file format: {file_extension}")
+        result = _parse_file(file_path, executor, on_page)
+        
+        # Pages whose OCR failed would be served as they are until the entry is evicted
+        if cache_key and not result["text"].startswith("Error:") and not result["metadata"]["ocr_failed_pages"]:
+            get_text_cache().put(cache_key, result["text"], result["metadata"])
+        return result
             
     except Exception as e:
         logger.error(f"Error parsing file {file_path}: {str(e)}")
         raise
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extract text from PDF file using PyMuPDF"""
+def text_cache_key(content_hash: str) -> str:
+    """Cache key for a file's extracted text under the current parser and OCR settings"""
+    return TextCache.make_key(content_hash, PARSER_VERSION, resolved_ocr_backend(), OCR_LANG,
+                              OCR_PREPROCESS_PROFILE, PDF_MIN_TEXT_CHARS, OCR_TARGET_DPI,
+                              OCR_TARGET_GLYPH_PX, OCR_MAX_RENDER_PIXELS)
+
+def _parse_file(file_path: Path, executor: Optional[Executor],
+                on_page: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Extract text and per-page metadata from a PDF or image"""
+    started = time.perf_counter()
+    chunks = []
+    pages = []
+    
+    for page in iter_uploaded_file_pages(file_path, executor=executor):
+        chunks.append(page.pop("text"))
+        pages.append(page)
+        if on_page:
+            on_page(page)
+    
+    if file_path.suffix.lower() == '.pdf':
+        text = clean_extracted_text("".join(chunks))
+        if not text:
+            text = "Error: Could not extract text from PDF"
+    else:
+        text = chunks[0]
+    
+    return {
+        "text": text,
+        "metadata": {
+            "page_count": len(pages),
+            "ocr_pages": sum(1 for page in pages if page["method"] == "ocr"),
+            "ocr_failed_pages": sum(1 for page in pages if page.get("ocr_failed")),
+            "seconds": round(time.perf_counter() - started, 3),
+            "pages": [{key: value for key, value in page.items() if key != "page_count"} for page in pages]
+        }
+    }
+
+def iter_uploaded_file_pages(file_path: Union[str, Path], executor: Optional[Executor] = None,
+                             max_workers: int = PDF_PAGE_WORKERS,
+                             force_ocr: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Yield a file's text page by page, in order, as soon as each page is extracted
+    Each item has ``page``, ``page_count``, the raw page ``text``, ``method`` and
+    ``seconds``. Only the pages in flight are held in memory, so the text cache
+    is not consulted; join and clean the chunks to get parse_uploaded_file's text.
+    """
+    file_path = Path(file_path)
+    file_extension = file_path.suffix.lower()
+    
+    if file_extension == '.pdf':
+        yield from iter_pdf_pages(str(file_path), executor=executor, max_workers=max_workers,
+                                  force_ocr=force_ocr)
+    elif file_extension in ['.png', '.jpg', '.jpeg']:
+        started = time.perf_counter()
+        if executor is not None:
+            # OCR in a worker process, where its engine instance is kept warm
+            text = executor.submit(extract_text_from_image, str(file_path)).result()
+        else:
+            text = extract_text_from_image(str(file_path))
+        yield {
+            "page": 1,
+            "page_count": 1,
+            "text": text,
+            "method": "ocr",
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+    else:
+        raise ValueError(f"Unsupported file format: {file_extension}")
+
+def extract_text_from_pdf(pdf_path: str, executor: Optional[Executor] = None,
+                          max_workers: int = PDF_PAGE_WORKERS) -> str:
+    """Extract text from PDF file, OCR-ing only the pages without a usable text layer"""
     try:
-        doc = fitz.open(pdf_path)
-        text = ""
-        
-        for page_num in range(doc.page_count):
-            page = doc[page_num]
-            text += page.get_text()
-            
-        doc.close()
-        
-        if not text.strip():
-            # If no text found, try OCR on PDF images
-            return extract_text_from_pdf_ocr(pdf_path)
-            
-        return clean_extracted_text(text)
+        pages = extract_pdf_pages(pdf_path, executor=executor, max_workers=max_workers)
+        return clean_extracted_text("".join(page["text"] for page in pages))
         
     except Exception as e:
         logger.error(f"Error extracting text from PDF: {str(e)}")
-        # Fallback to OCR
-        return extract_text_from_pdf_ocr(pdf_path)
+        return "Error: Could not extract text from PDF"
 
-def extract_text_from_pdf_ocr(pdf_path: str) -> str:
-    """Extract text from PDF using OCR (for scanned PDFs)"""
+def extract_text_from_pdf_ocr(pdf_path: str, executor: Optional[Executor] = None,
+                              max_workers: int = PDF_PAGE_WORKERS) -> str:
+    """Extract text from PDF using OCR on every page (for fully scanned PDFs)"""
     try:
-        doc = fitz.open(pdf_path)
-        text = ""
-        
-        for page_num in range(doc.page_count):
-            page = doc[page_num]
-            # Convert page to image
-            mat = fitz.Matrix(2, 2)  # Increase resolution
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            
-            # Use OCR on the image
-            image = Image.open(io.BytesIO(img_data))
-            page_text = pytesseract.image_to_string(image, lang='eng')
-            text += page_text + "\n"
-            
-        doc.close()
-        return clean_extracted_text(text)
+        pages = extract_pdf_pages(pdf_path, executor=executor, max_workers=max_workers, force_ocr=True)
+        return clean_extracted_text("".join(page["text"] for page in pages))
         
     except Exception as e:
         logger.error(f"Error with PDF OCR: {str(e)}")
         return "Error: Could not extract text from PDF"
 
+def extract_pdf_pages(pdf_path: str, executor: Optional[Executor] = None,
+                      max_workers: int = PDF_PAGE_WORKERS, force_ocr: bool = False) -> List[Dict[str, Any]]:
+    """
+    Extract every page of a PDF, choosing text layer or OCR page by page
+    Returns one dict per page with its text, method and timing, in page order.
+    """
+    return list(iter_pdf_pages(pdf_path, executor=executor, max_workers=max_workers, force_ocr=force_ocr))
+
+def iter_pdf_pages(pdf_path: str, executor: Optional[Executor] = None,
+                   max_workers: int = PDF_PAGE_WORKERS, force_ocr: bool = False) -> Iterator[Dict[str, Any]]:
+    """Generator form of extract_pdf_pages; each page dict also carries ``page_count``"""
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+    
+    func = _ocr_pdf_pages if force_ocr else _extract_pdf_pages
+    for page in iter_map_pdf_pages(func, pdf_path, page_count, executor, max_workers):
+        page["page_count"] = page_count
+        yield page
+
+def has_usable_text_layer(text: str) -> bool:
+    """Decide whether a page's embedded text is good enough to skip OCR"""
+    stripped = "".join(text.split())
+    if len(stripped) < PDF_MIN_TEXT_CHARS:
+        return False
+    # Broken font encodings yield mostly symbols; scanned pages with a stray
+    # header often have a handful of real characters only
+    alnum = sum(1 for char in stripped if char.isalnum())
+    return alnum / len(stripped) >= 0.5
+
+def _extract_pdf_pages(pdf_path: str, start: int, stop: int) -> Iterator[Dict[str, Any]]:
+    """Extract pages ``start:stop``, falling back to OCR per page"""
+    with fitz.open(pdf_path) as doc:
+        for page_num in range(start, stop):
+            started = time.perf_counter()
+            page = doc[page_num]
+            text = page.get_text()
+            method = "text"
+            ocr_failed = False
+            
+            if not has_usable_text_layer(text):
+                try:
+                    text = ocr_pdf_page(page)
+                    method = "ocr"
+                except Exception as e:
+                    ocr_failed = True
+                    logger.error(f"Error with OCR on page {page_num + 1}: {str(e)}")
+            
+            result = {
+                "page": page_num + 1,
+                "text": text,
+                "method": method,
+                "seconds": round(time.perf_counter() - started, 3)
+            }
+            if ocr_failed:
+                result["ocr_failed"] = True
+            yield result
+
+def _ocr_pdf_pages(pdf_path: str, start: int, stop: int) -> Iterator[Dict[str, Any]]:
+    """OCR pages ``start:stop`` regardless of their text layer"""
+    with fitz.open(pdf_path) as doc:
+        for page_num in range(start, stop):
+            started = time.perf_counter()
+            yield {
+                "page": page_num + 1,
+                "text": ocr_pdf_page(doc[page_num]),
+                "method": "ocr",
+                "seconds": round(time.perf_counter() - started, 3)
+            }
+
+def ocr_pdf_page(page) -> str:
+    """Render a PDF page in grayscale and OCR it"""
+    zoom = choose_render_zoom(page)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    image = pixmap_to_image(pix)
+    try:
+        return get_ocr_engine().image_to_string(preprocess_image_for_ocr(image)) + "\n"
+    finally:
+        # Drop the image's view of the pixmap buffer before the pixmap is freed
+        image.close()
+
+def pixmap_to_image(pix) -> Image.Image:
+    """
+    Wrap a pixmap's raw samples in a PIL image without PNG encode/decode
+    The image shares the pixmap's buffer, so keep ``pix`` alive while it is used.
+    """
+    mode = {1: "L", 3: "RGB", 4: "RGBA"}[pix.n]
+    samples = getattr(pix, "samples_mv", None) or pix.samples
+    return Image.frombuffer(mode, (pix.width, pix.height), samples, "raw", mode, pix.stride, 1)
+
+def choose_render_zoom(page) -> float:
+    """
+    Pick the render scale for OCR from page size and glyph density
+    Starts from OCR_TARGET_DPI, scales so existing glyphs come out around
+    OCR_TARGET_GLYPH_PX tall, never exceeds the resolution of an embedded
+    scan (upsampling adds no detail), and caps the total pixel count.
+    """
+    zoom = OCR_TARGET_DPI / 72
+    
+    font_size = _median_font_size(page)
+    if font_size:
+        zoom = OCR_TARGET_GLYPH_PX / font_size
+    
+    native_zoom = _embedded_image_zoom(page)
+    if native_zoom:
+        zoom = min(zoom, native_zoom)
+    
+    zoom = min(max(zoom, 1.0), 4.0)
+    
+    area = page.rect.width * page.rect.height
+    if area > 0:
+        zoom = min(zoom, math.sqrt(OCR_MAX_RENDER_PIXELS / area))
+    return max(zoom, 0.5)
+
+def _median_font_size(page) -> Optional[float]:
+    """Median size of the glyph runs already on the page, if any"""
+    sizes = sorted(
+        span["size"]
+        for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT).get("blocks", [])
+        for line in block.get("lines", [])
+        for span in line.get("spans", [])
+        if span.get("text", "").strip() and span.get("size")
+    )
+    return sizes[len(sizes) // 2] if sizes else None
+
+def _embedded_image_zoom(page) -> Optional[float]:
+    """Scale at which the largest embedded image is rendered at its native resolution"""
+    best = None
+    best_area = 0.0
+    for info in page.get_image_info():
+        x0, y0, x1, y1 = info["bbox"]
+        area = (x1 - x0) * (y1 - y0)
+        if area > best_area and x1 > x0:
+            best_area = area
+            best = info["width"] / (x1 - x0)
+    return best
+
+def map_pdf_pages(func: Callable[[str, int, int], Iterator[Any]], pdf_path: str, page_count: int,
+                  executor: Optional[Executor] = None, max_workers: int = PDF_PAGE_WORKERS) -> List[Any]:
+    """Apply ``func(pdf_path, start, stop)`` to every page and return results in page order"""
+    return list(iter_map_pdf_pages(func, pdf_path, page_count, executor, max_workers))
+
+def iter_map_pdf_pages(func: Callable[[str, int, int], Iterator[Any]], pdf_path: str, page_count: int,
+                       executor: Optional[Executor] = None, max_workers: int = PDF_PAGE_WORKERS) -> Iterator[Any]:
+    """
+    Apply ``func(pdf_path, start, stop)`` to every page, yielding results in page order
+    Pages are split into small contiguous chunks; each chunk opens the document
+    on its own so chunks can run in separate processes. A chunk is yielded as
+    soon as it and every chunk before it are done, and at most ``max_workers``
+    chunks are in flight or waiting to be yielded at once.
+    """
+    if executor is None and (max_workers <= 1 or page_count < PDF_PARALLEL_MIN_PAGES):
+        yield from func(pdf_path, 0, page_count)
+        return
+    
+    executor = executor or _get_page_executor(max_workers)
+    if executor is None:
+        yield from func(pdf_path, 0, page_count)
+        return
+    
+    max_workers = max(1, max_workers)
+    chunk_size = max(1, math.ceil(page_count / (max_workers * 4)))
+    ranges = [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+    finished: Dict[int, List[Any]] = {}
+    
+    pending = {}
+    next_chunk = 0
+    next_yield = 0
+    try:
+        while next_yield < len(ranges):
+            # Window by the next chunk to yield, so a slow early chunk can't let
+            # finished later chunks pile up
+            while next_chunk < len(ranges) and next_chunk - next_yield < max_workers:
+                start, stop = ranges[next_chunk]
+                pending[executor.submit(_collect_pages, func, pdf_path, start, stop)] = next_chunk
+                next_chunk += 1
+            
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished[pending.pop(future)] = future.result()
+            
+            while next_yield in finished:
+                yield from finished.pop(next_yield)
+                next_yield += 1
+    finally:
+        # Consumer stopped early or a chunk failed
+        for future in pending:
+            future.cancel()
+
+def _collect_pages(func: Callable[[str, int, int], Iterator[Any]], pdf_path: str,
+                   start: int, stop: int) -> List[Any]:
+    """Run a page generator over one chunk (in a worker process)"""
+    return list(func(pdf_path, start, stop))
+
+_page_executor: Optional[ProcessPoolExecutor] = None
+
+def _get_page_executor(max_workers: int) -> Optional[ProcessPoolExecutor]:
+    """Lazily create a process pool for page-parallel parsing outside the API worker pool"""
+    global _page_executor
+    if multiprocessing.parent_process() is not None:
+        # Already inside a worker process; don't nest pools
+        return None
+    if _page_executor is None:
+        _page_executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _page_executor
+
 def extract_text_from_image(image_path: str) -> str:
     """Extract text from image using OCR"""
     try:
         # Open and preprocess image
-        image = Image.open(image_path)
-        
-        # Convert to RGB if necessary
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        image = preprocess_image_for_ocr(Image.open(image_path))
         
         # Use OCR to extract text
-        text = pytesseract.image_to_string(image, lang='eng')
+        text = get_ocr_engine().image_to_string(image)
         
         return clean_extracted_text(text)
         
@@ -122,48 +492,121 @@ def validate_medical_report(text: str) -> bool:
     """
     Basic validation to check if extracted text looks like a medical report
     """
-    medical_keywords = [
-        'patient', 'doctor', 'diagnosis', 'treatment', 'medication',
-        'blood', 'glucose', 'diabetes', 'test', 'result', 'lab',
-        'hospital', 'clinic', 'physician', 'prescription', 'symptoms'
-    ]
-    
     text_lower = text.lower()
-    found_keywords = sum(1 for keyword in medical_keywords if keyword in text_lower)
+    found_keywords = len(get_vocabulary_automaton().count_categories(text_lower).get("report", {}))
     
     # If we find at least 2 medical keywords, consider it valid
     return found_keywords >= 2
 
-# Helper function for preprocessing images before OCR
-def preprocess_image_for_ocr(image_path: str) -> Image.Image:
+# Helper functions for preprocessing images before OCR
+PREPROCESS_PROFILES = ("none", "fast", "balanced", "accurate")
+
+def preprocess_image_for_ocr(image: Union[str, Path, Image.Image],
+                             profile: str = OCR_PREPROCESS_PROFILE) -> Image.Image:
     """
     Preprocess image to improve OCR accuracy
+    Converts to grayscale once, then every step works in place on that single
+    uint8 buffer (plus float scratch for local statistics):
+        fast:     global Otsu binarization
+        balanced: contrast stretch + 3x3 denoise + Bradley adaptive threshold
+        accurate: contrast stretch + 3x3 denoise + Sauvola threshold + speckle removal
     """
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
+    if profile == "none":
+        return image
+    if profile not in PREPROCESS_PROFILES:
+        raise ValueError(f"Unknown preprocessing profile: {profile}")
+    
     try:
-        from PIL import ImageEnhance, ImageFilter
-        
-        image = Image.open(image_path)
+        gray = image if image.mode == "L" else image.convert("L")
+        buf = np.array(gray, dtype=np.uint8)
         
-        # Convert to grayscale
-        if image.mode != 'L':
-            image = image.convert('L')
-        
-        # Enhance contrast
-        enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(2.0)
-        
-        # Enhance sharpness
-        enhancer = ImageEnhance.Sharpness(image)
-        image = enhancer.enhance(2.0)
+        if profile == "fast":
+            _threshold_otsu(buf)
+        else:
+            _stretch_contrast(buf)
+            radius = max(7, min(buf.shape) // 80)
+            _denoise(buf)
+            if profile == "balanced":
+                _threshold_bradley(buf, radius)
+            else:
+                _threshold_sauvola(buf, radius)
+                _remove_speckles(buf)
         
-        # Apply slight blur to reduce noise
-        image = image.filter(ImageFilter.MedianFilter(size=3))
-        
-        return image
+        return Image.fromarray(buf)
         
     except Exception as e:
         logger.error(f"Error preprocessing image: {str(e)}")
-        return Image.open(image_path)
+        return image
+
+def _box_mean(src: np.ndarray, radius: int) -> np.ndarray:
+    """Mean over a (2r+1)^2 window (edges replicated) using separable running sums"""
+    k = 2 * radius + 1
+    acc = np.pad(src, radius, mode="edge").astype(np.float32)
+    np.cumsum(acc, axis=1, out=acc)
+    acc[:, k:] -= acc[:, :-k]
+    rows = acc[:, 2 * radius:]
+    np.cumsum(rows, axis=0, out=rows)
+    rows[k:] -= rows[:-k]
+    window = rows[2 * radius:]
+    window /= k * k
+    return window
+
+def _stretch_contrast(buf: np.ndarray, low: float = 0.01, high: float = 0.99) -> None:
+    """Stretch the 1st..99th percentile range to 0..255 through a lookup table"""
+    cdf = np.cumsum(np.bincount(buf.ravel(), minlength=256)) / buf.size
+    lo = int(np.searchsorted(cdf, low))
+    hi = int(np.searchsorted(cdf, high))
+    if hi <= lo:
+        return
+    lut = np.clip((np.arange(256, dtype=np.float32) - lo) * (255.0 / (hi - lo)), 0, 255).astype(np.uint8)
+    np.take(lut, buf, out=buf)
+
+def _threshold_otsu(buf: np.ndarray) -> None:
+    """Binarize with a single global threshold chosen by Otsu's method"""
+    hist = np.bincount(buf.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    weight_bg = np.cumsum(hist)
+    weight_fg = buf.size - weight_bg
+    mean_bg = np.cumsum(hist * levels)
+    total = mean_bg[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (total * weight_bg / buf.size - mean_bg) ** 2 / (weight_bg * weight_fg)
+    threshold = int(np.nanargmax(between))
+    np.multiply(buf > threshold, 255, out=buf, casting="unsafe")
+
+def _threshold_bradley(buf: np.ndarray, radius: int, sensitivity: float = 0.15) -> None:
+    """Pixels darker than (1 - sensitivity) x local mean become ink"""
+    mean = _box_mean(buf, radius)
+    mean *= 1.0 - sensitivity
+    np.multiply(buf >= mean, 255, out=buf, casting="unsafe")
+
+def _threshold_sauvola(buf: np.ndarray, radius: int, k: float = 0.2) -> None:
+    """Sauvola threshold: local mean adjusted by local standard deviation"""
+    mean = _box_mean(buf, radius)
+    variance = _box_mean(np.square(buf, dtype=np.float32), radius)
+    variance -= np.square(mean)
+    np.maximum(variance, 0, out=variance)
+    np.sqrt(variance, out=variance)
+    # threshold = mean * (1 + k * (std / 128 - 1)), built in the variance buffer
+    variance *= k / 128.0
+    variance += 1.0 - k
+    variance *= mean
+    np.multiply(buf >= variance, 255, out=buf, casting="unsafe")
+
+def _denoise(buf: np.ndarray) -> None:
+    """3x3 mean filter written back into the buffer"""
+    smoothed = _box_mean(buf, 1)
+    np.rint(smoothed, out=smoothed)
+    buf[...] = smoothed
+
+def _remove_speckles(buf: np.ndarray) -> None:
+    """Clear ink pixels with no ink neighbours in their 3x3 window"""
+    ink = buf == 0
+    neighbours = _box_mean(ink.view(np.uint8), 1)
+    isolated = ink & (neighbours < 1.5 / 9)
+    buf[isolated] = 255
 
 # Additional utility functions
 def get_file_info(file_path: str) -> dict:
@@ -0,0 +1,244 @@
+# app/utils/rollups.py
+import math
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.glucose_store import GlucoseStore, get_glucose_store
+from app.utils.streaming_stats import TARGET_RANGE, TrendAccumulator
+
+# Bucket width and offset in seconds; weeks start on Monday (the epoch was a Thursday)
+GRANULARITIES = {
+    "hour": (3600, 0),
+    "day": (86400, 0),
+    "week": (7 * 86400, 4 * 86400)
+}
+
+# Dashboard range -> (days covered, bucket granularity)
+RANGES = {
+    "7d": (7, "hour"),
+    "30d": (30, "day"),
+    "90d": (90, "day"),
+    "1y": (365, "week")
+}
+
+# Per-bucket columns and the value of an empty bucket
+COLUMNS = {
+    "count": 0, "total": 0.0, "total_sq": 0.0, "min": math.inf, "max": -math.inf,
+    "below": 0, "in_range": 0, "above": 0,
+    "reports": 0, "risk_total": 0.0
+}
+
+
+def bucket_starts(timestamps: Any, granularity: str) -> np.ndarray:
+    """Start of the bucket each timestamp (seconds since the epoch) falls in"""
+    width, offset = GRANULARITIES[granularity]
+    return (np.asarray(timestamps, dtype=np.int64) - offset) // width * width + offset
+
+
+class _Buckets:
+    """One granularity of a patient's rollups, as columns sorted by bucket start"""
+
+    def __init__(self, granularity: str):
+        self.granularity = granularity
+        self.starts = np.empty(0, dtype=np.int64)
+        self.columns = {name: np.empty(0, dtype=type(empty)) for name, empty in COLUMNS.items()}
+
+    def _rows(self, starts: np.ndarray) -> np.ndarray:
+        """Row of each of the sorted, unique bucket ``starts``, adding empty buckets as needed"""
+        missing = np.setdiff1d(starts, self.starts, assume_unique=True)
+        if missing.size:
+            at = np.searchsorted(self.starts, missing)
+            self.starts = np.insert(self.starts, at, missing)
+            for name, empty in COLUMNS.items():
+                self.columns[name] = np.insert(self.columns[name], at, empty)
+        return np.searchsorted(self.starts, starts)
+
+    def add_readings(self, timestamps: np.ndarray, values: np.ndarray) -> None:
+        if not len(timestamps):
+            return
+        starts, inverse = np.unique(bucket_starts(timestamps, self.granularity), return_inverse=True)
+        rows = self._rows(starts)
+        values = np.asarray(values, dtype=np.float64)
+        columns, size = self.columns, len(starts)
+        low, high = TARGET_RANGE
+        columns["count"][rows] += np.bincount(inverse, minlength=size)
+        columns["total"][rows] += np.bincount(inverse, weights=values, minlength=size)
+        columns["total_sq"][rows] += np.bincount(inverse, weights=values * values, minlength=size)
+        columns["below"][rows] += np.bincount(inverse, weights=values < low, minlength=size).astype(np.int64)
+        columns["above"][rows] += np.bincount(inverse, weights=values > high, minlength=size).astype(np.int64)
+        columns["in_range"][rows] += np.bincount(inverse, weights=(values >= low) & (values <= high),
+                                                 minlength=size).astype(np.int64)
+        minimum, maximum = np.full(size, math.inf), np.full(size, -math.inf)
+        np.minimum.at(minimum, inverse, values)
+        np.maximum.at(maximum, inverse, values)
+        columns["min"][rows] = np.minimum(columns["min"][rows], minimum)
+        columns["max"][rows] = np.maximum(columns["max"][rows], maximum)
+
+    def add_report(self, timestamp: int, risk_score: float, sign: int = 1) -> None:
+        row = self._rows(bucket_starts([timestamp], self.granularity))[0]
+        self.columns["reports"][row] += sign
+        self.columns["risk_total"][row] += sign * risk_score
+
+    def window(self, start: int, end: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Copies of the buckets starting in ``[start, end)``"""
+        first, last = np.searchsorted(self.starts, [start, end])
+        return self.starts[first:last].copy(), {name: column[first:last].copy() for name, column in self.columns.items()}
+
+
+class MetricRollups:
+    """
+    Hourly, daily and weekly rollups of each patient's glucose readings and report risk scores
+    A bucket holds the count, sum, sum of squares, min and max of its
+    readings, how many were below, in and above TARGET_RANGE, and the number
+    of analyzed reports and their summed risk score. A patient's buckets are
+    built from the glucose store on first use and then kept up to date: the
+    store tells about every append, and record_report / remove_report about
+    report analyses. Dashboard ranges then read O(buckets) rows, never the
+    raw readings.
+    """
+
+    def __init__(self, store: GlucoseStore):
+        self.store = store
+        self._patients: Dict[int, Dict[str, _Buckets]] = {}
+        self._reports: Dict[int, Tuple[int, int, float]] = {}  # report id -> (patient id, timestamp, risk score)
+        self._lock = threading.Lock()
+        store.add_listener(self._on_readings)
+
+    def _buckets(self, patient_id: int) -> Dict[str, _Buckets]:
+        with self._lock:
+            buckets = self._patients.get(patient_id)
+        if buckets is not None:
+            return buckets
+        # Built under the store's lock so no append lands between the read and the registration
+        with self.store.lock(patient_id):
+            with self._lock:
+                buckets = self._patients.get(patient_id)
+                if buckets is None:
+                    timestamps, values = self.store.columns(patient_id)
+                    buckets = {granularity: _Buckets(granularity) for granularity in GRANULARITIES}
+                    for rollup in buckets.values():
+                        rollup.add_readings(timestamps, values)
+                    for patient, timestamp, risk_score in self._reports.values():
+                        if patient == patient_id:
+                            for rollup in buckets.values():
+                                rollup.add_report(timestamp, risk_score)
+                    self._patients[patient_id] = buckets
+        return buckets
+
+    def _on_readings(self, patient_id: int, timestamps: Optional[np.ndarray], values: Optional[np.ndarray]) -> None:
+        with self._lock:
+            if timestamps is None:
+                # Readings deleted; rebuilt from the store on next use
+                self._patients.pop(patient_id, None)
+                return
+            buckets = self._patients.get(patient_id)
+            if buckets is not None:
+                for rollup in buckets.values():
+                    rollup.add_readings(timestamps, values)
+
+    def record_report(self, report_id: int, patient_id: int, timestamp: int, risk_score: float) -> None:
+        """Count a report's risk score, replacing what was counted for it before"""
+        self.remove_report(report_id)
+        with self._lock:
+            self._reports[report_id] = (patient_id, timestamp, risk_score)
+            for rollup in self._patients.get(patient_id, {}).values():
+                rollup.add_report(timestamp, risk_score)
+
+    def remove_report(self, report_id: int) -> None:
+        with self._lock:
+            counted = self._reports.pop(report_id, None)
+            if counted is not None:
+                patient_id, timestamp, risk_score = counted
+                for rollup in self._patients.get(patient_id, {}).values():
+                    rollup.add_report(timestamp, risk_score, sign=-1)
+
+    def dashboard(self, patient_id: int, range_name: str, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Metrics and timeline for the last ``range_name`` (a key of RANGES)
+        The range starts at the beginning of the bucket ``days`` before now,
+        and the timeline has one entry per bucket with readings or reports.
+        """
+        days, granularity = RANGES[range_name]
+        end = int(now if now is not None else datetime.now(timezone.utc).timestamp()) + 1
+        start = int(bucket_starts([end - days * 86400], granularity)[0])
+        buckets = self._buckets(patient_id)
+        with self._lock:
+            starts, columns = buckets[granularity].window(start, end)
+        return {
+            "range": range_name,
+            "granularity": granularity,
+            "metrics": summarize_buckets(starts, columns),
+            "timeline": bucket_timeline(starts, columns)
+        }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "patients": len(self._patients),
+                "buckets": sum(len(rollup.starts) for buckets in self._patients.values() for rollup in buckets.values()),
+                "reports": len(self._reports)
+            }
+
+
+def summarize_buckets(starts: np.ndarray, columns: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Range metrics from its buckets; the glucose trend is the slope of bucket means per day"""
+    count = int(columns["count"].sum())
+    reports = int(columns["reports"].sum())
+    metrics: Dict[str, Any] = {
+        "readings_count": count,
+        "glucose_avg": None,
+        "glucose_trend": "insufficient_data",
+        "reports_count": reports,
+        "risk_score": round(float(columns["risk_total"].sum()) / reports, 1) if reports else None
+    }
+    if not count:
+        return metrics
+    mean = float(columns["total"].sum()) / count
+    variance = max(float(columns["total_sq"].sum()) / count - mean * mean, 0.0)
+    std_dev = math.sqrt(variance)
+    has_readings = columns["count"] > 0
+    trend = TrendAccumulator()
+    trend.add_batch(columns["total"][has_readings] / columns["count"][has_readings],
+                    xs=starts[has_readings] / 86400)
+    metrics.update({
+        "glucose_avg": round(mean, 1),
+        "glucose_trend": trend.trend().get("trend_direction", "insufficient_data"),
+        "glucose_std": round(std_dev, 2),
+        "glucose_cv": round(std_dev / mean * 100, 2) if mean > 0 else 0,
+        "glucose_min": float(columns["min"].min()),
+        "glucose_max": float(columns["max"].max()),
+        "time_in_range_percent": round(int(columns["in_range"].sum()) / count * 100, 1),
+        "time_below_range_percent": round(int(columns["below"].sum()) / count * 100, 1),
+        "time_above_range_percent": round(int(columns["above"].sum()) / count * 100, 1)
+    })
+    return metrics
+
+
+def bucket_timeline(starts: np.ndarray, columns: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    timeline = []
+    for index in np.flatnonzero((columns["count"] > 0) | (columns["reports"] > 0)).tolist():
+        count, reports = int(columns["count"][index]), int(columns["reports"][index])
+        timeline.append({
+            "date": datetime.fromtimestamp(int(starts[index]), timezone.utc).isoformat(),
+            "glucose": round(float(columns["total"][index]) / count, 1) if count else None,
+            "glucose_min": float(columns["min"][index]) if count else None,
+            "glucose_max": float(columns["max"][index]) if count else None,
+            "time_in_range_percent": round(int(columns["in_range"][index]) / count * 100, 1) if count else None,
+            "readings": count,
+            "reports": reports,
+            "risk": round(float(columns["risk_total"][index]) / reports, 1) if reports else None
+        })
+    return timeline
+
+
+_metric_rollups: Optional[MetricRollups] = None
+
+
+def get_metric_rollups() -> MetricRollups:
+    global _metric_rollups
+    if _metric_rollups is None:
+        _metric_rollups = MetricRollups(get_glucose_store())
+    return _metric_rollups
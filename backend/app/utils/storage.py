@@ -0,0 +1,210 @@
+# app/utils/storage.py
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional
+
+from app.config import MAX_UPLOAD_SIZE, UPLOAD_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes of the formats parse_uploaded_file understands
+MAGIC_SIGNATURES = {
+    b"%PDF-": ".pdf",
+    b"\x89PNG\r\n\x1a\n": ".png",
+    b"\xff\xd8\xff": ".jpg",
+}
+SNIFF_BYTES = max(len(magic) for magic in MAGIC_SIGNATURES)
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+
+
+class UnsupportedFileType(Exception):
+    """Raised when an upload's content is not a supported format"""
+
+
+def sniff_file_type(header: bytes) -> Optional[str]:
+    """Return the file extension matching the magic bytes in ``header``"""
+    for magic, extension in MAGIC_SIGNATURES.items():
+        if header.startswith(magic):
+            return extension
+    return None
+
+
+def safe_filename(filename: str) -> str:
+    """Strip directory components from a client-supplied filename"""
+    return Path(filename.replace("\\", "/")).name or "upload"
+
+
+class _StreamedFile:
+    """Hashes, size-checks and sniffs a file while it is written chunk by chunk"""
+
+    def __init__(self, dest_dir: Path, max_size: int):
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        self.temp_path = dest_dir / f".{uuid.uuid4().hex}.part"
+        self.max_size = max_size
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.extension: Optional[str] = None
+
+    def check(self, chunk: bytes) -> None:
+        """Validate the next chunk before it is written"""
+        if self.extension is None:
+            # Chunks are far larger than any signature, so the first one suffices
+            self.extension = sniff_file_type(chunk[:SNIFF_BYTES])
+            if self.extension is None:
+                raise UnsupportedFileType("File content is not a PDF, PNG or JPEG")
+
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise UploadTooLarge(f"File exceeds the {self.max_size / (1024 * 1024):g}MB upload limit")
+
+        self.digest.update(chunk)
+
+    def result(self) -> Dict[str, Any]:
+        if self.size == 0:
+            raise UnsupportedFileType("Uploaded file is empty")
+        return {
+            "temp_path": self.temp_path,
+            "size": self.size,
+            "sha256": self.digest.hexdigest(),
+            "extension": self.extension
+        }
+
+
+async def save_upload_stream(upload: Any, dest_dir: Path, max_size: int = MAX_UPLOAD_SIZE,
+                             chunk_size: int = UPLOAD_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Stream an UploadFile to disk in fixed-size chunks
+    Hashes the content (SHA-256) and sniffs its type while writing, so memory
+    use per upload stays at one chunk. Aborts as soon as ``max_size`` is exceeded.
+    Returns the temporary path plus size, hash and detected extension; the caller
+    moves the file to its final location.
+    """
+    declared_size = getattr(upload, "size", None)
+    if declared_size is not None and declared_size > max_size:
+        raise UploadTooLarge(f"File exceeds the {max_size / (1024 * 1024):g}MB upload limit")
+
+    streamed = _StreamedFile(dest_dir, max_size)
+    try:
+        with open(streamed.temp_path, "wb") as buffer:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                streamed.check(chunk)
+                await asyncio.to_thread(buffer.write, chunk)
+        return streamed.result()
+    except BaseException:
+        streamed.temp_path.unlink(missing_ok=True)
+        raise
+
+
+def save_file_stream(source: BinaryIO, dest_dir: Path, max_size: int = MAX_UPLOAD_SIZE,
+                     chunk_size: int = UPLOAD_CHUNK_SIZE) -> Dict[str, Any]:
+    """Blocking counterpart of save_upload_stream for open binary files (e.g. ZIP members)"""
+    streamed = _StreamedFile(dest_dir, max_size)
+    try:
+        with open(streamed.temp_path, "wb") as buffer:
+            for chunk in iter(lambda: source.read(chunk_size), b""):
+                streamed.check(chunk)
+                buffer.write(chunk)
+        return streamed.result()
+    except BaseException:
+        streamed.temp_path.unlink(missing_ok=True)
+        raise
+
+
+def finalize_upload(temp_path: Path, final_path: Path) -> Path:
+    """Atomically move a streamed upload to its final path"""
+    final_path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(temp_path, final_path)
+    return final_path
+
+
+class BlobStore:
+    """
+    Content-addressed store for uploaded files
+    Files live at ``<root>/<hash[:2]>/<hash><ext>`` and are reference counted,
+    so byte-identical uploads share one copy on disk. Extracted text and
+    analyses are remembered per blob so re-uploads can skip parsing and analysis.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._blobs: Dict[str, Dict[str, Any]] = {}
+
+    def blob_path(self, sha256: str, extension: str) -> Path:
+        return self.root / sha256[:2] / f"{sha256}{extension}"
+
+    def add(self, temp_path: Path, sha256: str, extension: str) -> Path:
+        """Move a streamed upload into the store, or link it to an existing blob"""
+        entry = self._blobs.get(sha256)
+        path = self.blob_path(sha256, extension)
+
+        if entry is None:
+            if path.exists():
+                # Blob left on disk from an earlier run
+                temp_path.unlink(missing_ok=True)
+            else:
+                finalize_upload(temp_path, path)
+            entry = self._blobs[sha256] = {
+                "path": path,
+                "refcount": 0,
+                "extracted_text": None,
+                "analyses": {}
+            }
+        else:
+            temp_path.unlink(missing_ok=True)
+
+        entry["refcount"] += 1
+        return entry["path"]
+
+    def release(self, sha256: str) -> bool:
+        """Drop one reference; delete the blob when none remain. Returns True if deleted."""
+        entry = self._blobs.get(sha256)
+        if entry is None:
+            return False
+
+        entry["refcount"] -= 1
+        if entry["refcount"] > 0:
+            return False
+
+        del self._blobs[sha256]
+        entry["path"].unlink(missing_ok=True)
+        return True
+
+    def refcount(self, sha256: str) -> int:
+        entry = self._blobs.get(sha256)
+        return entry["refcount"] if entry else 0
+
+    def get_results(self, sha256: str, report_type: str) -> Optional[Dict[str, Any]]:
+        """Return stored extracted text and, if available, the analysis for ``report_type``"""
+        entry = self._blobs.get(sha256)
+        if entry is None or entry["extracted_text"] is None:
+            return None
+        return {
+            "extracted_text": entry["extracted_text"],
+            "ai_analysis": entry["analyses"].get(report_type)
+        }
+
+    def save_results(self, sha256: str, report_type: str, extracted_text: str,
+                     ai_analysis: Optional[Dict[str, Any]] = None) -> None:
+        """Remember parsing and analysis output for a blob"""
+        entry = self._blobs.get(sha256)
+        if entry is None:
+            return
+        entry["extracted_text"] = extracted_text
+        if ai_analysis is not None:
+            entry["analyses"][report_type] = ai_analysis
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "blobs": len(self._blobs),
+            "references": sum(entry["refcount"] for entry in self._blobs.values())
+        }
@@ -0,0 +1,268 @@
+# app/utils/streaming_stats.py
+import math
+import sys
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+TARGET_RANGE = (70, 180)  # mg/dL
+
+# Builtin sum() compensates float rounding from Python 3.12; RunningStats
+# adds the same way so its mean equals sum(values) / len(values)
+_COMPENSATED_SUM = sys.version_info >= (3, 12)
+
+
+class RunningStats:
+    """
+    Count, sum, mean, variance, min and max of a stream of readings
+    add() takes one reading at a time in O(1): the sum is accumulated as the
+    builtin sum() does and the variance by Welford's recurrence, so there is
+    no second pass. add_batch() takes a NumPy array at once and merge()
+    combines two accumulators (Chan et al.); both agree with adding the
+    readings one by one up to float rounding.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._total = 0.0
+        self._compensation = 0.0
+        self._mean = 0.0  # Welford's running mean, for the variance
+        self._m2 = 0.0    # sum of squared deviations from the mean
+
+    def add(self, value: float) -> None:
+        x = float(value)
+        self.count += 1
+        self._add_to_total(x)
+        delta = x - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (x - self._mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def extend(self, values: Iterable[float]) -> None:
+        """add_batch() for a NumPy array, add() one reading at a time for anything else"""
+        if isinstance(values, np.ndarray):
+            self.add_batch(values)
+        else:
+            for value in values:
+                self.add(value)
+
+    def add_batch(self, values: Any) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not values.size:
+            return
+        batch = RunningStats()
+        batch.count = int(values.size)
+        batch._total = float(values.sum())
+        batch._mean = batch._total / batch.count
+        batch._m2 = float(np.square(values - batch._mean).sum())
+        batch.min, batch.max = float(values.min()), float(values.max())
+        self.merge(batch)
+
+    def merge(self, other: "RunningStats") -> None:
+        """Add the readings ``other`` has seen"""
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other._mean - self._mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self._mean += delta * other.count / count
+        self.count = count
+        self._add_to_total(other.total)
+        if self.min is None or other.min < self.min:
+            self.min = other.min
+        if self.max is None or other.max > self.max:
+            self.max = other.max
+
+    def _add_to_total(self, x: float) -> None:
+        total = self._total + x
+        if _COMPENSATED_SUM:
+            if abs(self._total) >= abs(x):
+                self._compensation += (self._total - total) + x
+            else:
+                self._compensation += (x - total) + self._total
+        self._total = total
+
+    @property
+    def total(self) -> float:
+        return self._total + self._compensation
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Population variance, as the helpers have always reported it"""
+        return self._m2 / self.count if self.count else None
+
+    @property
+    def std(self) -> Optional[float]:
+        return math.sqrt(self.variance) if self.count else None
+
+    def variability(self) -> Dict[str, Any]:
+        """calculate_glucose_variability's result for the readings so far"""
+        if self.count < 2:
+            return {"status": "insufficient_data"}
+        mean, std_dev = self.mean, self.std
+        cv = (std_dev / mean) * 100 if mean > 0 else 0
+        return {
+            "standard_deviation": round(std_dev, 2),
+            "coefficient_of_variation": round(cv, 2),
+            "mean": round(mean, 2),
+            "min": self.min,
+            "max": self.max
+        }
+
+
+class RangeCounter:
+    """Counts of readings below, in and above a target range, inclusive of its bounds"""
+
+    def __init__(self, target_range: tuple = TARGET_RANGE):
+        self.target_range = target_range
+        self.count = 0
+        self.below = 0
+        self.in_range = 0
+        self.above = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if value < self.target_range[0]:
+            self.below += 1
+        elif value > self.target_range[1]:
+            self.above += 1
+        elif value == value:  # NaN is in none of the three
+            self.in_range += 1
+
+    def extend(self, values: Iterable[float]) -> None:
+        """add_batch() for a NumPy array, add() one reading at a time for anything else"""
+        if isinstance(values, np.ndarray):
+            self.add_batch(values)
+        else:
+            for value in values:
+                self.add(value)
+
+    def add_batch(self, values: Any) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        low, high = self.target_range
+        self.count += int(values.size)
+        self.below += int(np.count_nonzero(values < low))
+        self.above += int(np.count_nonzero(values > high))
+        self.in_range += int(np.count_nonzero((values >= low) & (values <= high)))
+
+    def merge(self, other: "RangeCounter") -> None:
+        self.count += other.count
+        self.below += other.below
+        self.in_range += other.in_range
+        self.above += other.above
+
+    def time_in_range(self) -> Dict[str, Any]:
+        """assess_time_in_range's result for the readings so far"""
+        if not self.count:
+            return {"status": "no_data"}
+        return {
+            "time_in_range_percent": round((self.in_range / self.count) * 100, 1),
+            "time_below_range_percent": round((self.below / self.count) * 100, 1),
+            "time_above_range_percent": round((self.above / self.count) * 100, 1),
+            "target_range": self.target_range,
+            "total_readings": self.count
+        }
+
+
+class TrendAccumulator:
+    """
+    Least-squares slope of a stream of readings, updated one reading at a time
+    Readings are placed at x = 0, 1, 2, ... unless add() is given their x
+    (e.g. hours since the first reading). Keeps running means and
+    co-moments instead of the raw sums, which lose precision over months of
+    readings, and the last three readings for the recent average.
+    """
+
+    RECENT = 3
+
+    def __init__(self):
+        self.values = RunningStats()
+        self._mean_x = 0.0
+        self._mean_y = 0.0
+        self._sxx = 0.0  # sum of squared x deviations
+        self._sxy = 0.0  # sum of x, y co-deviations
+        self._recent: deque = deque(maxlen=self.RECENT)
+
+    @property
+    def count(self) -> int:
+        return self.values.count
+
+    def add(self, value: float, x: Optional[float] = None) -> None:
+        x = float(self.count if x is None else x)
+        y = float(value)
+        self.values.add(value)
+        dx = x - self._mean_x
+        self._mean_x += dx / self.count
+        self._mean_y += (y - self._mean_y) / self.count
+        self._sxx += dx * (x - self._mean_x)
+        self._sxy += dx * (y - self._mean_y)
+        self._recent.append(value)
+
+    def extend(self, values: Iterable[float]) -> None:
+        """add_batch() for a NumPy array, add() one reading at a time for anything else"""
+        if isinstance(values, np.ndarray):
+            self.add_batch(values)
+        else:
+            for value in values:
+                self.add(value)
+
+    def add_batch(self, values: Any, xs: Any = None) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not values.size:
+            return
+        xs = (np.arange(self.count, self.count + values.size, dtype=np.float64) if xs is None
+              else np.asarray(xs, dtype=np.float64).ravel())
+        mean_x, mean_y = float(xs.mean()), float(values.mean())
+        dx, dy = xs - mean_x, values - mean_y
+        self._merge_moments(int(values.size), mean_x, mean_y, float(dx @ dx), float(dx @ dy))
+        self.values.add_batch(values)
+        self._recent.extend(values[-self.RECENT:].tolist())
+
+    def merge(self, other: "TrendAccumulator") -> None:
+        """Add the readings ``other`` has seen, which come after these ones"""
+        if not other.count:
+            return
+        self._merge_moments(other.count, other._mean_x, other._mean_y, other._sxx, other._sxy)
+        self.values.merge(other.values)
+        self._recent.extend(other._recent)
+
+    def _merge_moments(self, count: int, mean_x: float, mean_y: float, sxx: float, sxy: float) -> None:
+        total = self.count + count
+        dx, dy = mean_x - self._mean_x, mean_y - self._mean_y
+        weight = self.count * count / total
+        self._sxx += sxx + dx * dx * weight
+        self._sxy += sxy + dx * dy * weight
+        self._mean_x += dx * count / total
+        self._mean_y += dy * count / total
+
+    @property
+    def slope(self) -> Optional[float]:
+        return self._sxy / self._sxx if self._sxx > 0 else None
+
+    def trend(self) -> Dict[str, Any]:
+        """generate_trend_analysis' result for the readings so far"""
+        if self.count < 3 or self.slope is None:
+            return {"status": "insufficient_data"}
+        slope = self.slope
+        if slope > 1:
+            trend = "increasing"
+        elif slope < -1:
+            trend = "decreasing"
+        else:
+            trend = "stable"
+        return {
+            "trend_direction": trend,
+            "slope": round(slope, 3),
+            "recent_average": round(sum(self._recent) / self.RECENT, 1),
+            "overall_average": round(self.values.mean, 1)
+        }
@@ -0,0 +1,211 @@
+# app/utils/text_cache.py
+import atexit
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from app.config import TEXT_CACHE_DIR, TEXT_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash a file without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TextCache:
+    """
+    Disk-backed cache of extracted report text
+    Entries live in a SQLite database so every worker process shares them.
+    Keys combine the file's content hash with the parser version and OCR
+    settings; the least recently used entries are evicted once the stored
+    text exceeds ``max_bytes``. The stored size is kept as a running total
+    in the counters table, so a put never scans the entries.
+
+    Reads don't write: each process collects its hits, misses and the keys
+    it read, and writes them (counters and last_access) at most every
+    ``flush_interval`` seconds, on its next put, or in stats(). Counters and
+    LRU order from other processes may therefore lag by that much.
+    """
+
+    EVICT_BATCH = 64
+
+    def __init__(self, path: Path, max_bytes: int = TEXT_CACHE_MAX_BYTES, flush_interval: float = 5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._pending_lock = threading.Lock()
+        self._pending_counts = {"hits": 0, "misses": 0}
+        self._pending_access: Dict[str, float] = {}
+        self._flushed_at = time.monotonic()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    metadata TEXT,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+                -- Running total of stored text; computed once for caches created before it existed
+                INSERT OR IGNORE INTO counters (name, value)
+                    SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries;
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread and process; SQLite handles cross-process locking
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def make_key(content_hash: str, *settings: Any) -> str:
+        return hashlib.sha256("|".join([content_hash, *map(str, settings)]).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached text and metadata for ``key``, or None"""
+        conn = self._connect()
+        row = conn.execute("SELECT text, metadata FROM entries WHERE key = ?", (key,)).fetchone()
+        with self._pending_lock:
+            if row is None:
+                self._pending_counts["misses"] += 1
+            else:
+                self._pending_counts["hits"] += 1
+                self._pending_access[key] = time.time()
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+        if row is None:
+            return None
+        return {"text": row[0], "metadata": json.loads(row[1]) if row[1] else {}}
+
+    def put(self, key: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Store text for ``key`` and evict old entries if over the size limit"""
+        conn = self._connect()
+        size = len(text.encode("utf-8"))
+        with self._transaction(conn):
+            previous = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, text, metadata, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, text, json.dumps(metadata) if metadata else None, size, time.time())
+            )
+            self._count(conn, "bytes", size - (previous[0] if previous else 0))
+            self._write_pending(conn)
+            self._evict(conn)
+
+    def flush(self) -> None:
+        """Write this process's pending hit/miss counts and access times"""
+        conn = self._connect()
+        with self._transaction(conn):
+            self._write_pending(conn)
+
+    @staticmethod
+    @contextmanager
+    def _transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE takes the write lock up front, so the running total
+        # is read and updated by one process at a time
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _write_pending(self, conn: sqlite3.Connection) -> None:
+        with self._pending_lock:
+            counts, self._pending_counts = self._pending_counts, {"hits": 0, "misses": 0}
+            accessed, self._pending_access = self._pending_access, {}
+            self._flushed_at = time.monotonic()
+        for name, amount in counts.items():
+            if amount:
+                self._count(conn, name, amount)
+        if accessed:
+            conn.executemany("UPDATE entries SET last_access = MAX(last_access, ?) WHERE key = ?",
+                             [(accessed_at, key) for key, accessed_at in accessed.items()])
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Delete least recently used entries, a batch at a time, until under ``max_bytes``"""
+        total = self._counter(conn, "bytes")
+        evicted = 0
+        while total > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM entries ORDER BY last_access LIMIT ?",
+                                (self.EVICT_BATCH,)).fetchall()
+            if not rows:
+                break
+            victims, freed = [], 0
+            for key, size in rows:
+                if total - freed <= self.max_bytes:
+                    break
+                victims.append((key,))
+                freed += size
+            conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            self._count(conn, "bytes", -freed)
+            total -= freed
+            evicted += len(victims)
+        if evicted:
+            self._count(conn, "evictions", evicted)
+
+    @staticmethod
+    def _counter(conn: sqlite3.Connection, name: str) -> int:
+        row = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def _count(self, conn: sqlite3.Connection, name: str, amount: int = 1) -> None:
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count, stored bytes and hit/miss counters"""
+        self.flush()
+        conn = self._connect()
+        entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "entries": entries,
+            "bytes": counters.get("bytes", 0),
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None
+        }
+
+
+_text_cache: Optional[TextCache] = None
+
+
+def get_text_cache() -> TextCache:
+    """Return this process's handle on the shared text cache"""
+    global _text_cache
+    if _text_cache is None:
+        _text_cache = TextCache(Path(TEXT_CACHE_DIR) / "extracted_text.sqlite3")
+        atexit.register(_text_cache.flush)
+    return _text_cache
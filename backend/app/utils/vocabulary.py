@@ -0,0 +1,186 @@
+# app/utils/vocabulary.py
+import logging
+import re
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import ahocorasick  # pyahocorasick
+except ImportError:
+    ahocorasick = None
+
+logger = logging.getLogger(__name__)
+
+# Medical vocabularies, matched against lowercased text. Every occurrence of
+# a term counts, including occurrences inside longer words.
+
+RISK_KEYWORDS = [
+    'complications', 'neuropathy', 'retinopathy', 'nephropathy',
+    'ketones', 'ketoacidosis', 'hypoglycemia', 'hyperglycemia'
+]
+
+FINDING_TERMS = {
+    'medication': ['metformin', 'insulin', 'glipizide', 'glyburide'],
+    'complications': ['neuropathy', 'retinopathy', 'nephropathy'],
+    'symptoms': ['polyuria', 'polydipsia', 'polyphagia', 'fatigue']
+}
+
+# Literal concern terms; patterns that need a regex live in ai_inference
+CONCERN_TERMS = {
+    "Diabetic complications": ['neuropathy', 'retinopathy', 'nephropathy', 'foot ulcer'],
+    "Severe hypoglycemia": ['unconscious', 'seizure'],
+    "Ketoacidosis risk": ['ketones', 'ketoacidosis', 'dka'],
+    "Cardiovascular risk": ['chest pain', 'heart', 'cardiac', 'stroke'],
+    "Infection risk": ['infection', 'wound', 'slow healing'],
+    "Medication adherence issues": ['ran out']
+}
+
+MEDICATION_CLASSES = {
+    'Metformin': ['metformin'],
+    'Insulin': ['insulin', 'novolog', 'humalog', 'lantus', 'levemir'],
+    'Sulfonylureas': ['glipizide', 'glyburide', 'glimepiride'],
+    'DPP-4 inhibitors': ['sitagliptin', 'saxagliptin', 'linagliptin'],
+    'GLP-1 agonists': ['exenatide', 'liraglutide', 'dulaglutide'],
+    'SGLT2 inhibitors': ['dapagliflozin', 'empagliflozin', 'canagliflozin']
+}
+
+# Words that suggest extracted text is a medical report
+REPORT_KEYWORDS = [
+    'patient', 'doctor', 'diagnosis', 'treatment', 'medication',
+    'blood', 'glucose', 'diabetes', 'test', 'result', 'lab',
+    'hospital', 'clinic', 'physician', 'prescription', 'symptoms'
+]
+
+
+class KeywordAutomaton:
+    """
+    Multi-pattern matcher over a fixed vocabulary
+    Finds every occurrence of every term, overlapping ones included, in one
+    pass over the text, so cost does not grow with the number of terms.
+    Uses pyahocorasick's Aho-Corasick automaton when it is installed; the
+    pure-Python fallback (one precompiled regex over term starts) gives the
+    same results but is slower.
+    """
+
+    def __init__(self, vocabulary: Dict[str, Iterable[str]]):
+        # term -> categories it belongs to, in vocabulary order
+        self.categories: Dict[str, Tuple[str, ...]] = {}
+        for category, terms in vocabulary.items():
+            for term in terms:
+                if term:
+                    self.categories[term] = self.categories.get(term, ()) + (category,)
+        self.terms = list(self.categories)
+        self._term_lengths = np.array([len(term) for term in self.terms], dtype=np.int64)
+
+        self.backend = "pyahocorasick" if ahocorasick is not None else "python"
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for index, term in enumerate(self.terms):
+                self._automaton.add_word(term, index)
+            self._automaton.make_automaton()
+        else:
+            self._build()
+
+    def _build(self) -> None:
+        # One branch per first character, starting with that literal so the
+        # regex engine can skip ahead, and capturing the longest term that
+        # starts there; shorter terms starting at the same place are its
+        # prefixes. A match consumes only the first character, so terms that
+        # start inside an earlier hit are found too.
+        by_first: Dict[str, List[str]] = {}
+        for term in sorted(self.categories, key=len, reverse=True):
+            by_first.setdefault(term[0], []).append(re.escape(term[1:]))
+        self._starts = re.compile('|'.join(
+            f"{re.escape(first)}(?=({'|'.join(rests)}))" for first, rests in by_first.items()
+        ))
+        self._prefixes = {
+            term: [other for other in self.categories if other != term and term.startswith(other)]
+            for term in self.categories
+        }
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Yield ``(start, end, term)`` for every occurrence; each term's occurrences come in text order"""
+        if not self.categories:
+            return
+        if self.backend == "pyahocorasick":
+            terms = self.terms
+            for last, index in self._automaton.iter(text):
+                yield last - len(terms[index]) + 1, last + 1, terms[index]
+            return
+
+        prefixes = self._prefixes
+        for match in self._starts.finditer(text):
+            start = match.start()
+            term = text[start:match.end(match.lastindex)]
+            yield start, start + len(term), term
+            for prefix in prefixes[term]:
+                yield start, start + len(prefix), prefix
+
+    def hit_array(self, text: str) -> np.ndarray:
+        """
+        Every occurrence as rows of ``(start, end, term index)``, indexes into
+        ``terms``; for long texts such as a whole corpus joined together
+        """
+        if self.backend == "pyahocorasick" and self.terms:
+            found = np.fromiter(chain.from_iterable(self._automaton.iter(text)), dtype=np.int64).reshape(-1, 2)
+            ends = found[:, 0] + 1
+            return np.column_stack([ends - self._term_lengths[found[:, 1]], ends, found[:, 1]])
+        term_ids = {term: index for index, term in enumerate(self.terms)}
+        hits = [(start, end, term_ids[term]) for start, end, term in self.iter_matches(text)]
+        return np.array(hits, dtype=np.int64).reshape(-1, 3)
+
+    def count_terms(self, text: str) -> Dict[str, int]:
+        """Number of occurrences of each term found in ``text``"""
+        counts: Dict[str, int] = {}
+        for _, _, term in self.iter_matches(text):
+            counts[term] = counts.get(term, 0) + 1
+        return counts
+
+    def count_categories(self, text: str) -> Dict[str, Dict[str, int]]:
+        """Term counts grouped by category, for categories with at least one hit"""
+        by_category: Dict[str, Dict[str, int]] = {}
+        for term, count in self.count_terms(text).items():
+            for category in self.categories[term]:
+                by_category.setdefault(category, {})[term] = count
+        return by_category
+
+
+def findall_terms(hits: Dict[str, List[Tuple[int, int]]], terms: List[str]) -> List[str]:
+    """
+    Reproduce re.findall('term1|term2|...') from automaton hits
+    ``hits`` maps each term to its (start, end) spans. Matches are taken left
+    to right without overlapping; where several terms start at the same place
+    the one listed first wins, as with a regex alternation.
+    """
+    order = {term: index for index, term in enumerate(terms)}
+    spans = sorted((start, order[term], end) for term in terms for start, end in hits.get(term, ()))
+    matches = []
+    last_end = 0
+    for start, index, end in spans:
+        if start >= last_end:
+            matches.append(terms[index])
+            last_end = end
+    return matches
+
+
+def build_vocabulary() -> Dict[str, List[str]]:
+    """All vocabularies as one category -> terms mapping"""
+    vocabulary = {"risk": RISK_KEYWORDS, "report": REPORT_KEYWORDS}
+    vocabulary.update({f"finding:{category}": terms for category, terms in FINDING_TERMS.items()})
+    vocabulary.update({f"concern:{concern}": terms for concern, terms in CONCERN_TERMS.items()})
+    vocabulary.update({f"medication:{name}": terms for name, terms in MEDICATION_CLASSES.items()})
+    return vocabulary
+
+
+_automaton: Optional[KeywordAutomaton] = None
+
+
+def get_vocabulary_automaton() -> KeywordAutomaton:
+    """Return the shared automaton over every vocabulary, building it on first use"""
+    global _automaton
+    if _automaton is None:
+        _automaton = KeywordAutomaton(build_vocabulary())
+        logger.info(f"Keyword automaton built: {len(_automaton.categories)} terms ({_automaton.backend})")
+    return _automaton
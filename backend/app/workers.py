@@ -0,0 +1,193 @@
+# app/workers.py
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set
+
+from app.config import CPU_WORKERS, CPU_QUEUE_DEPTH, CPU_TASK_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPoolBusy(Exception):
+    """Raised when the worker pool queue is full"""
+
+
+class WorkerTimeout(Exception):
+    """Raised when a task does not finish within the pool's task timeout"""
+
+
+class CPUWorkerPool:
+    """
+    Process pool for CPU-bound work (OCR, PDF parsing, rule analysis)
+    Admits at most ``max_workers + queue_depth`` tasks at a time and rejects
+    the rest, so a burst of scanned uploads cannot queue unbounded work.
+
+    A process pool cannot kill a single worker, so a timed-out task keeps
+    its worker and admission slot until it returns (``stuck`` in stats()).
+    Once ``max_workers`` tasks are stuck, which would otherwise leave no
+    worker for anything else, the process pool is recycled: its processes
+    are terminated, which fails every task still in it, and a fresh pool
+    takes their place. A task timeout <= 0 means no timeout.
+    """
+
+    def __init__(self, max_workers: int = CPU_WORKERS, queue_depth: int = CPU_QUEUE_DEPTH,
+                 task_timeout: float = CPU_TASK_TIMEOUT):
+        self.max_workers = max(1, max_workers)
+        self.queue_depth = max(0, queue_depth)
+        self.task_timeout = task_timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._coordinators: Optional[ThreadPoolExecutor] = None
+        self._slot_freed: Optional[asyncio.Event] = None
+        self._stuck: Set[Future] = set()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._recycled = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.queue_depth
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            raise RuntimeError("Worker pool is not running")
+        return self._executor
+
+    def start(self) -> None:
+        """Create the underlying process pool"""
+        if self._executor is None:
+            # spawn avoids forking a process that already runs an event loop and threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            self._coordinators = ThreadPoolExecutor(
+                max_workers=self.capacity, thread_name_prefix="pool-coordinator"
+            )
+
+    def shutdown(self) -> None:
+        """Stop the process pool, cancelling tasks that have not started"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._coordinators.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._coordinators = None
+
+    async def run(self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None,
+                  wait: bool = False) -> Any:
+        """
+        Run ``func(*args)`` in a worker process
+        ``func`` and its arguments must be picklable (module-level functions).
+        With ``wait=True`` the caller waits for a free slot instead of being rejected,
+        which is what background jobs want.
+        """
+        await self._acquire(wait)
+        return await self._track(self.executor.submit(func, *args), func, timeout)
+
+    async def run_with_executor(self, func: Callable[..., Any], *args: Any,
+                                timeout: Optional[float] = None, wait: bool = False, **kwargs: Any) -> Any:
+        """
+        Run ``func(*args, executor=<process pool>, **kwargs)`` on a coordinating thread
+        For functions that fan their own work out across the pool, such as
+        page-parallel PDF parsing. The call occupies one admission slot.
+        """
+        await self._acquire(wait)
+        future = self._coordinators.submit(functools.partial(func, *args, executor=self.executor, **kwargs))
+        return await self._track(future, func, timeout)
+
+    async def _acquire(self, wait: bool) -> None:
+        while self._in_flight >= self.capacity:
+            if not wait:
+                self._rejected += 1
+                raise WorkerPoolBusy(f"Worker pool queue is full ({self.capacity} tasks)")
+            if self._slot_freed is None:
+                self._slot_freed = asyncio.Event()
+            self._slot_freed.clear()
+            await self._slot_freed.wait()
+        self._in_flight += 1
+
+    async def _track(self, future: Future, func: Callable[..., Any], timeout: Optional[float]) -> Any:
+        loop = asyncio.get_running_loop()
+        # Release the slot when the work actually finishes, not when the caller
+        # gives up: a timed-out task keeps its worker busy until it returns.
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release, f))
+
+        timeout = self.task_timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout if timeout > 0 else None)
+        except asyncio.TimeoutError:
+            self._timed_out += 1
+            name = getattr(func, '__name__', 'task')
+            if not future.done():
+                self._stuck.add(future)
+                logger.warning(f"{name} timed out after {timeout:g}s and still holds a worker slot "
+                               f"({len(self._stuck)} stuck)")
+                if len(self._stuck) >= self.max_workers:
+                    self._recycle()
+            raise WorkerTimeout(f"{name} timed out after {timeout:g}s")
+
+    def _recycle(self) -> None:
+        """Replace a process pool whose workers are all stuck on timed-out tasks"""
+        logger.error(f"{len(self._stuck)} timed-out tasks hold the worker pool; restarting its processes")
+        old = self._executor
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        # Terminating the workers fails their futures, whose callbacks free the slots
+        for process in list((old._processes or {}).values()):
+            process.terminate()
+        old.shutdown(wait=False, cancel_futures=True)
+        self._recycled += 1
+
+    def _release(self, future: Future) -> None:
+        self._in_flight -= 1
+        self._stuck.discard(future)
+        if not future.cancelled():
+            self._completed += 1
+        if self._slot_freed is not None:
+            self._slot_freed.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool counters for health checks"""
+        return {
+            "workers": self.max_workers,
+            "queue_depth": self.queue_depth,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+            "stuck": len(self._stuck),
+            "recycled": self._recycled
+        }
+
+
+_worker_pool: Optional[CPUWorkerPool] = None
+
+
+def start_worker_pool() -> CPUWorkerPool:
+    """Create the shared worker pool (called from the app lifespan)"""
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = CPUWorkerPool()
+        _worker_pool.start()
+        logger.info(f"CPU worker pool started with {_worker_pool.max_workers} workers")
+    return _worker_pool
+
+
+def get_worker_pool() -> CPUWorkerPool:
+    """Return the shared worker pool, starting it on first use"""
+    return _worker_pool or start_worker_pool()
+
+
+def shutdown_worker_pool() -> None:
+    """Shut down the shared worker pool"""
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.shutdown()
+        _worker_pool = None
@@ -0,0 +1,110 @@
+# benchmarks/bench_analysis_routing.py
+"""
+Measure how much LLM work confidence-gated routing saves on a mixed corpus
+
+Runs against benchmarks.llm_stub_server with latency growing with the
+prompt and output size. The corpus mixes short lab slips with a glucose or
+HbA1c value, which the rules handle, and long narrative letters with negated
+or hedged findings, which they don't:
+
+    llm-only: every report analyzed by the LLM (routing off)
+    routed:   rules first, the LLM only below ROUTING_CONFIDENCE_THRESHOLD
+
+Reports the routing split, LLM calls and tokens, and total latency.
+
+Run from backend/:
+    python -m benchmarks.bench_analysis_routing [--slips 40] [--letters 10]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault("LLM_API_KEY", "stub")
+os.environ.setdefault("LLM_TIMEOUT", "120")
+
+from app import ai_inference
+from app.ai_inference import analyze_report_content_async, routing_stats
+from app.llm_client import start_llm_client, stop_llm_client
+from benchmarks import llm_stub_server
+from benchmarks.bench_rule_analysis import FILLER_LINES
+
+SLIP_LINES = [
+    "Fasting glucose: {glucose} mg/dL",
+    "HbA1c: {hba1c}%",
+    "BP {systolic}/{diastolic} mmHg",
+    "Sample collected 08:10, reported 11:45.",
+]
+
+LETTER_LINES = [
+    "Dear colleague, thank you for seeing this patient in the diabetes clinic.",
+    "She denies chest pain and there is no evidence of retinopathy on the last screen.",
+    "Possible early neuropathy in both feet; monofilament testing was equivocal.",
+    "Suspected nephropathy cannot be excluded until the repeat urine albumin is back.",
+    "Her mood has been low since the change of job and adherence to the diet has suffered.",
+    "We discussed the options at length and agreed to review in three months.",
+]
+
+
+def make_corpus(slips: int, letters: int, letter_size: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(slips):
+        lines = rng.sample(SLIP_LINES, 3)
+        corpus.append("\n".join(lines).format(glucose=rng.randint(80, 260), hba1c=round(rng.uniform(5.2, 10.5), 1),
+                                              systolic=rng.randint(110, 160), diastolic=rng.randint(70, 100)))
+    for _ in range(letters):
+        lines = list(LETTER_LINES)
+        while sum(len(line) + 1 for line in lines) < letter_size:
+            lines.append(rng.choice(LETTER_LINES + FILLER_LINES))
+        rng.shuffle(lines)
+        corpus.append("\n".join(lines))
+    rng.shuffle(corpus)
+    return corpus
+
+
+async def run(corpus: list, routing: bool) -> dict:
+    ai_inference.ANALYSIS_ROUTING_ENABLED = routing
+    before = dict(llm_stub_server.stats)
+    started = time.perf_counter()
+    engines = [(await analyze_report_content_async(text, "general"))["engine"] for text in corpus]
+    return {
+        "seconds": time.perf_counter() - started,
+        "calls": llm_stub_server.stats["calls"] - before["calls"],
+        "tokens": llm_stub_server.stats["tokens"] - before["tokens"],
+        "rules": engines.count("rules")
+    }
+
+
+async def main_async(args) -> None:
+    llm_stub_server.config.update({"latency": 0.2, "jitter": 0.0, "per_1k_tokens": args.per_1k_tokens})
+    corpus = make_corpus(args.slips, args.letters, args.letter_size)
+    async with llm_stub_server.running_stub(args.port):
+        start_llm_client(base_url=f"http://127.0.0.1:{args.port}/v1")
+        try:
+            results = {"llm-only": await run(corpus, False), "routed": await run(corpus, True)}
+        finally:
+            await stop_llm_client()
+
+    print(f"{args.slips} slips + {args.letters} letters of ~{args.letter_size} chars, "
+          f"threshold {ai_inference.ROUTING_CONFIDENCE_THRESHOLD}")
+    print(f"{'mode':<10}{'rules':>7}{'llm calls':>11}{'tokens':>9}{'seconds':>9}")
+    for name, result in results.items():
+        print(f"{name:<10}{result['rules']:>7}{result['calls']:>11}{result['tokens']:>9}{result['seconds']:>9.2f}")
+    print(f"routing stats: {routing_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slips", type=int, default=40)
+    parser.add_argument("--letters", type=int, default=10)
+    parser.add_argument("--letter-size", type=int, default=3000, help="approximate characters per letter")
+    parser.add_argument("--per-1k-tokens", type=float, default=2.0, help="simulated seconds per 1000 tokens")
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
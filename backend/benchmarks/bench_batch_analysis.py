@@ -0,0 +1,57 @@
+# benchmarks/bench_batch_analysis.py
+"""
+Compare per-report and batch rule-based analysis throughput
+
+    scalar:  analyze_with_rules for each report
+    batch:   analyze_reports_batch over the whole corpus (columns, including
+             glucose variability and time in range)
+    rebuilt: batch plus analysis_from_batch for every report
+
+Every rebuilt analysis is checked against analyze_with_rules before timing.
+
+Run from backend/:
+    python -m benchmarks.bench_batch_analysis [--reports 5000] [--size 2500] [--repeats 3]
+"""
+import argparse
+import time
+
+from app.ai_inference import analysis_from_batch, analyze_reports_batch, analyze_with_rules
+from benchmarks.bench_rule_analysis import make_reports
+
+
+def scalar(reports: list) -> list:
+    return [analyze_with_rules(text, "general") for text in reports]
+
+
+def rebuilt(reports: list) -> list:
+    batch = analyze_reports_batch(reports)
+    return [analysis_from_batch(batch, index) for index in range(batch["count"])]
+
+
+def best_rate(function, reports: list, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function(reports)
+        best = min(best, time.perf_counter() - started)
+    return len(reports) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=5000)
+    parser.add_argument("--size", type=int, default=2500, help="approximate characters per report")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    reports = make_reports(args.reports, args.size)
+    mismatches = sum(1 for expected, actual in zip(scalar(reports), rebuilt(reports)) if expected != actual)
+    print(f"{len(reports)} reports of ~{args.size} chars, {mismatches} mismatching analyses")
+
+    print(f"{'path':<10}{'reports/sec':>14}")
+    for name, function in (("scalar", scalar), ("batch", analyze_reports_batch), ("rebuilt", rebuilt)):
+        print(f"{name:<10}{best_rate(function, reports, args.repeats):>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_chunked_analysis.py
+"""
+Compare LLM analysis of long reports as one call and as parallel chunks
+
+Runs against benchmarks.llm_stub_server with latency growing with the
+prompt and output size, as a real provider's does:
+
+    single:  the whole report in one prompt (what the API did before chunking)
+    chunked: chunks of --chunk-tokens analyzed in parallel and merged, no cap
+    budget:  chunked, with at most --budget prompt + output tokens per report
+
+Reports latency, calls made and tokens sent per report size.
+
+Run from backend/:
+    python -m benchmarks.bench_chunked_analysis [--sizes 4000 16000 64000 160000]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("LLM_API_KEY", "stub")
+os.environ.setdefault("LLM_TIMEOUT", "600")
+os.environ.setdefault("LLM_MAX_CONCURRENCY", "32")
+
+from app.ai_inference import analyze_with_llm
+from app.llm_client import LLMClient
+from app.utils.chunking import count_tokens, split_into_chunks
+from benchmarks import llm_stub_server
+from benchmarks.bench_rule_analysis import make_reports
+
+
+async def measure(client: LLMClient, text: str, chunk_tokens: int, budget: int) -> dict:
+    before = dict(llm_stub_server.stats)
+    started = time.perf_counter()
+    analysis = await analyze_with_llm(client, text, "general", chunk_tokens=chunk_tokens, token_budget=budget)
+    return {
+        "seconds": time.perf_counter() - started,
+        "calls": llm_stub_server.stats["calls"] - before["calls"],
+        "tokens": llm_stub_server.stats["tokens"] - before["tokens"],
+        "chunks": analysis.get("chunks")
+    }
+
+
+async def main_async(args) -> None:
+    llm_stub_server.config.update({"latency": 0.2, "jitter": 0.0, "per_1k_tokens": args.per_1k_tokens})
+    modes = {"single": (10 ** 9, 0), "chunked": (args.chunk_tokens, 0), "budget": (args.chunk_tokens, args.budget)}
+    print(f"{'chars':>8}{'tokens':>8}{'chunks':>8}  " + "".join(f"{name + ' s':>10}{'calls':>7}{'tokens':>8}"
+                                                          for name in modes))
+    async with llm_stub_server.running_stub(args.port):
+        client = LLMClient(base_url=f"http://127.0.0.1:{args.port}/v1", max_retries=0)
+        try:
+            for size in args.sizes:
+                text = make_reports(1, size)[0]
+                row = f"{len(text):>8}{count_tokens(text):>8}{len(split_into_chunks(text, args.chunk_tokens)):>8}  "
+                for chunk_tokens, budget in modes.values():
+                    result = await measure(client, text, chunk_tokens, budget)
+                    row += f"{result['seconds']:>10.2f}{result['calls']:>7}{result['tokens']:>8}"
+                print(row)
+        finally:
+            await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4000, 16000, 64000, 160000],
+                        help="approximate characters per report")
+    parser.add_argument("--chunk-tokens", type=int, default=2500)
+    parser.add_argument("--budget", type=int, default=30000)
+    parser.add_argument("--per-1k-tokens", type=float, default=0.5, help="simulated seconds per 1000 tokens")
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_glucose_store.py
+"""
+Measure CGM export ingest and range reads on the columnar glucose store
+
+    ingest: a CSV export of --days of 5-minute readings streamed through
+            CGMExportParser in upload-sized chunks and appended to the store
+    range:  variability and time in range for the last 7, 90 and 365 days,
+            from memory-mapped slices of the store and, for comparison, from
+            per-reading dicts (how HealthMetricResponse rows would be held)
+    dashboard: /dashboard/metrics for each range from the rollups (hourly,
+            daily, weekly buckets), and the one-off cost of building them
+
+Run from backend/:
+    python -m benchmarks.bench_glucose_store [--days 365] [--patients 20]
+"""
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from app.ai_inference import assess_time_in_range, calculate_glucose_variability
+from app.config import UPLOAD_CHUNK_SIZE
+from app.utils.cgm_import import CGMExportParser
+from app.utils.glucose_store import GlucoseStore
+from app.utils.rollups import RANGES, MetricRollups
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_export(days: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    lines = ["Index,Timestamp (YYYY-MM-DDThh:mm:ss),Event Type,Glucose Value (mg/dL)"]
+    for index in range(days * 288):
+        moment = START + timedelta(minutes=5 * index)
+        lines.append(f"{index},{moment:%Y-%m-%dT%H:%M:%S},EGV,{rng.randint(55, 320)}")
+    return "\n".join(lines).encode()
+
+
+def ingest(store: GlucoseStore, patient_id: int, export: bytes) -> None:
+    parser = CGMExportParser()
+    for start in range(0, len(export), UPLOAD_CHUNK_SIZE):
+        store.append(patient_id, *parser.feed(export[start:start + UPLOAD_CHUNK_SIZE]))
+    store.append(patient_id, *parser.close())
+
+
+def timed(function, *args) -> float:
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--patients", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = GlucoseStore(Path(root))
+        exports = [make_export(args.days, seed) for seed in range(args.patients)]
+        seconds = sum(timed(ingest, store, patient_id, export) for patient_id, export in enumerate(exports))
+        readings = store.stats()["readings"]
+        disk = sum(path.stat().st_size for path in Path(root).rglob("*") if path.is_file())
+        print(f"ingest: {readings} readings from {sum(map(len, exports)) / 1e6:.1f}MB of CSV in {seconds:.2f}s "
+              f"({readings / seconds:.0f} readings/s), {disk / readings:.0f} bytes/reading on disk")
+
+        timestamps, values = store.read(0)
+        rows = [{"date_recorded": datetime.fromtimestamp(int(timestamp), timezone.utc), "value": float(value)}
+                for timestamp, value in zip(timestamps, values)]
+        end = START + timedelta(days=args.days)
+
+        def from_store(start: datetime) -> None:
+            _, window = store.read(0, int(start.timestamp()), int(end.timestamp()))
+            calculate_glucose_variability(window)
+            assess_time_in_range(window)
+
+        def from_dicts(start: datetime) -> None:
+            window = [row["value"] for row in rows if start <= row["date_recorded"] < end]
+            calculate_glucose_variability(window)
+            assess_time_in_range(window)
+
+        print(f"{'range':>6}{'store ms':>10}{'dicts ms':>10}")
+        for days in (7, 90, 365):
+            start = end - timedelta(days=min(days, args.days))
+            print(f"{days:>5}d{timed(from_store, start) * 1000:>10.2f}{timed(from_dicts, start) * 1000:>10.1f}")
+
+        rollups = MetricRollups(store)
+        now = end.timestamp() - 1
+        print(f"rollups built for one patient in {timed(rollups.dashboard, 0, '7d', now) * 1000:.1f}ms")
+        print(f"{'range':>6}{'buckets':>9}{'ms':>8}")
+        for name in RANGES:
+            seconds = timed(rollups.dashboard, 0, name, now)
+            print(f"{name:>6}{len(rollups.dashboard(0, name, now)['timeline']):>9}{seconds * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
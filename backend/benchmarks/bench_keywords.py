@@ -0,0 +1,77 @@
+# benchmarks/bench_keywords.py
+"""
+Keyword matching cost as the vocabulary grows
+
+    per-term: text.count(term) for every term, one full-text pass each
+    automaton: KeywordAutomaton.count_terms, one pass for the whole vocabulary
+
+The medical vocabulary is padded with synthetic drug-like names to reach each
+size.
+
+Run from backend/:
+    python -m benchmarks.bench_keywords [--reports 300] [--size 2500] [--terms 60,250,1000]
+"""
+import argparse
+import random
+import time
+
+from app.utils.vocabulary import KeywordAutomaton, build_vocabulary
+from benchmarks.bench_rule_analysis import make_reports
+
+SYLLABLES = ["glu", "cor", "tra", "vex", "pra", "zol", "mab", "lin", "tide", "flo", "zin", "dro", "nex", "pam"]
+
+
+def padded_vocabulary(size: int, seed: int = 3) -> dict:
+    vocabulary = build_vocabulary()
+    terms = {term for terms in vocabulary.values() for term in terms}
+    rng = random.Random(seed)
+    extra = []
+    while len(terms) + len(extra) < size:
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if name not in terms and name not in extra:
+            extra.append(name)
+    vocabulary["synthetic"] = extra
+    return vocabulary
+
+
+def per_term_counts(terms: list, text: str) -> dict:
+    counts = {}
+    for term in terms:
+        count = text.count(term)
+        if count:
+            counts[term] = count
+    return counts
+
+
+def best_seconds(function, reports: list, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for text in reports:
+            function(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=300)
+    parser.add_argument("--size", type=int, default=2500, help="approximate characters per report")
+    parser.add_argument("--terms", default="60,250,1000", help="comma-separated vocabulary sizes")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    reports = [text.lower() for text in make_reports(args.reports, args.size)]
+    print(f"{len(reports)} reports of ~{args.size} chars")
+    print(f"{'terms':>6}{'backend':>15}{'per-term us':>14}{'automaton us':>15}")
+    for size in (int(value) for value in args.terms.split(",")):
+        automaton = KeywordAutomaton(padded_vocabulary(size))
+        terms = list(automaton.categories)
+        per_term = best_seconds(lambda text: per_term_counts(terms, text), reports, args.repeats)
+        one_pass = best_seconds(automaton.count_terms, reports, args.repeats)
+        print(f"{len(terms):>6}{automaton.backend:>15}"
+              f"{per_term / len(reports) * 1e6:>14.1f}{one_pass / len(reports) * 1e6:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
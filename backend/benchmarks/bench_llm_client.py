@@ -0,0 +1,117 @@
+# benchmarks/bench_llm_client.py
+"""
+Exercise the LLM client against the local stub server
+
+Starts benchmarks.llm_stub_server in-process and runs analyses through
+analyze_report_content_async under a series of simulated provider conditions:
+
+    healthy:      normal latency
+    flaky:        a share of calls fail with 503 and are retried
+    rate-limited: a share of calls get 429 with Retry-After
+    hanging:      a share of calls never answer; the deadline cuts them off
+    outage:       every call fails and falls back to rules after its retries;
+                  the circuit breaker opens
+    still down:   with the breaker open analyses go straight to rules
+    recovery:     the provider is back; after the reset timeout one probe call
+                  goes through while the rest still use rules
+    recovered:    the probe succeeded and closed the breaker
+
+Each scenario up to the outage starts with a fresh client, so a closed
+breaker. For each it reports how many analyses came from the LLM and from rules, the
+latency percentiles and the client's counters.
+
+Run from backend/:
+    python -m benchmarks.bench_llm_client [--requests 100] [--port 8099]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+# Tight limits so the scenarios finish quickly; set before the app reads its config
+for name, value in {"LLM_API_KEY": "stub", "LLM_TIMEOUT": "3.0", "LLM_MAX_CONCURRENCY": "32",
+                    "LLM_MAX_RETRIES": "2", "LLM_RETRY_BASE_DELAY": "0.05", "LLM_RETRY_MAX_DELAY": "0.5",
+                    "LLM_BREAKER_FAILURES": "5", "LLM_BREAKER_RESET": "1.0"}.items():
+    os.environ.setdefault(name, value)
+
+from app.ai_inference import analyze_report_content_async
+from app.llm_client import start_llm_client, stop_llm_client
+from benchmarks import llm_stub_server
+from benchmarks.bench_rule_analysis import make_reports
+
+SCENARIOS = [
+    ("healthy", {}),
+    ("flaky", {"error_rate": 0.3, "error_status": 503}),
+    ("rate-limited", {"error_rate": 0.3, "error_status": 429, "retry_after": 0.2}),
+    ("hanging", {"hang_rate": 0.1}),
+    ("outage", {"error_rate": 1.0, "error_status": 500}),
+    ("still down", {"error_rate": 1.0, "error_status": 500}),
+    ("recovery", {}),
+    ("recovered", {}),
+]
+BASELINE = {"latency": 0.2, "jitter": 0.1, "error_rate": 0.0, "error_status": 503,
+            "retry_after": None, "hang_rate": 0.0,
+            "hang_seconds": float(os.environ["LLM_TIMEOUT"]) + 1}
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_scenario(reports: list) -> dict:
+    latencies = []
+    engines = {"llm": 0, "rules": 0}
+
+    async def analyze(text: str) -> None:
+        started = time.perf_counter()
+        analysis = await analyze_report_content_async(text, "general")
+        latencies.append(time.perf_counter() - started)
+        engines[analysis.get("engine", "rules")] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(analyze(text) for text in reports))
+    return {"elapsed": time.perf_counter() - started, "latencies": latencies, **engines}
+
+
+async def main_async(args) -> None:
+    reports = make_reports(args.requests, 1500)
+    print(f"{'scenario':<14}{'llm':>6}{'rules':>7}{'p50 s':>8}{'p95 s':>8}{'max s':>8}"
+          f"{'retries':>9}{'timeouts':>10}{'rejected':>10}  breaker")
+    async with llm_stub_server.running_stub(args.port):
+        try:
+            for name, changes in SCENARIOS:
+                if name not in ("still down", "recovery", "recovered"):
+                    await stop_llm_client()
+                    client = start_llm_client(base_url=f"http://127.0.0.1:{args.port}/v1")
+                if name == "recovery":
+                    # Let the breaker's reset timeout pass so a probe is allowed
+                    await asyncio.sleep(client.breaker.reset_timeout)
+                llm_stub_server.config.update({**BASELINE, **changes})
+                before = dict(client.stats())
+                result = await run_scenario(reports)
+                after = client.stats()
+                delta = {key: after[key] - before[key] for key in ("retries", "timed_out", "rejected")}
+                latencies = result["latencies"]
+                print(f"{name:<14}{result['llm']:>6}{result['rules']:>7}"
+                      f"{percentile(latencies, 0.5):>8.2f}{percentile(latencies, 0.95):>8.2f}{max(latencies):>8.2f}"
+                      f"{delta['retries']:>9}{delta['timed_out']:>10}{delta['rejected']:>10}"
+                      f"  {after['breaker']['state']}")
+            print(f"stub server: {llm_stub_server.stats}")
+        finally:
+            await stop_llm_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="concurrent analyses per scenario")
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+    # Fallback warnings would drown the table
+    logging.getLogger("app").setLevel(logging.ERROR)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_ocr_engines.py
+"""
+Compare OCR throughput of the available OCR engines
+
+    pytesseract: tesseract CLI subprocess per page, model reloaded every call
+    tesserocr:   persistent in-process engine, model loaded once
+
+Reports the first-page latency (includes engine start-up) and steady-state
+pages/sec over the remaining pages.
+
+Run from backend/:
+    python -m benchmarks.bench_ocr_engines [scanned.pdf] [--pages 20]
+"""
+import argparse
+import shutil
+import time
+
+import fitz
+
+from app.utils.parse_report import (
+    PytesseractEngine, TesserocrEngine, choose_render_zoom, pixmap_to_image
+)
+from benchmarks.bench_pdf_render import make_scanned_pdf
+
+
+def render_pages(doc: fitz.Document) -> list:
+    images = []
+    for page in doc:
+        zoom = choose_render_zoom(page)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+        view = pixmap_to_image(pix)
+        images.append(view.copy())
+        view.close()
+    return images
+
+
+def available_engines() -> list:
+    engines = []
+    if shutil.which("tesseract"):
+        engines.append(("pytesseract", PytesseractEngine))
+    try:
+        import tesserocr  # noqa: F401
+        engines.append(("tesserocr", TesserocrEngine))
+    except ImportError:
+        pass
+    return engines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?", help="PDF to benchmark (default: synthetic scan)")
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+
+    doc = fitz.open(args.pdf) if args.pdf else make_scanned_pdf(args.pages)
+    images = render_pages(doc)
+    print(f"{len(images)} pages")
+    print(f"{'engine':<14}{'first page ms':>15}{'pages/sec':>12}")
+
+    for name, engine_cls in available_engines():
+        started = time.perf_counter()
+        engine = engine_cls()
+        engine.image_to_string(images[0])
+        first_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for image in images[1:]:
+            engine.image_to_string(image)
+        elapsed = time.perf_counter() - started
+        rate = (len(images) - 1) / elapsed if elapsed > 0 else float("inf")
+        print(f"{name:<14}{first_ms:>15.0f}{rate:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
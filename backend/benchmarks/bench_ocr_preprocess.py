@@ -0,0 +1,117 @@
+# benchmarks/bench_ocr_preprocess.py
+"""
+Measure OCR preprocessing profiles: time per page and text accuracy
+
+The reference set is a synthetic lab report rendered at 200 dpi and degraded
+the way phone photos and poor scans are (noise, blur, uneven lighting, low
+contrast). Pass --reference-dir with <name>.png / <name>.txt pairs to score
+real pages instead.
+
+Accuracy is 1 - character error rate against the ground truth.
+
+Run from backend/:
+    python -m benchmarks.bench_ocr_preprocess [--reference-dir DIR]
+"""
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+import fitz
+import numpy as np
+from PIL import Image, ImageFilter
+
+from app.utils.parse_report import PREPROCESS_PROFILES, get_ocr_engine, preprocess_image_for_ocr
+from benchmarks.bench_pdf_render import SAMPLE_LINES
+
+
+def render_reference() -> Image.Image:
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 72
+    for line in SAMPLE_LINES:
+        page.insert_text((56, y), line, fontsize=10)
+        y += 18
+    pix = page.get_pixmap(matrix=fitz.Matrix(200 / 72, 200 / 72), colorspace=fitz.csGRAY,
+                          clip=fitz.Rect(0, 40, page.rect.width, y + 10))
+    return Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+
+def degraded_set(clean: Image.Image) -> dict:
+    rng = np.random.default_rng(42)
+    pixels = np.asarray(clean, dtype=np.float32)
+    height, width = pixels.shape
+
+    noisy = pixels + rng.normal(0, 40, pixels.shape)
+    shadow = pixels * np.linspace(1.0, 0.35, width)[None, :] + np.linspace(0, 40, height)[:, None]
+    faded = 110 + pixels * 0.35
+
+    def to_image(values):
+        return Image.fromarray(np.clip(values, 0, 255).astype(np.uint8))
+
+    return {
+        "clean": clean,
+        "noise": to_image(noisy),
+        "blur": clean.filter(ImageFilter.GaussianBlur(1.6)),
+        "shadow": to_image(shadow),
+        "low_contrast": to_image(faded),
+    }
+
+
+def load_reference_dir(directory: Path) -> tuple:
+    images, truths = {}, {}
+    for image_path in sorted(directory.glob("*.png")):
+        truth_path = image_path.with_suffix(".txt")
+        if truth_path.exists():
+            images[image_path.stem] = Image.open(image_path)
+            truths[image_path.stem] = truth_path.read_text()
+    return images, truths
+
+
+def char_error_rate(expected: str, actual: str) -> float:
+    expected, actual = " ".join(expected.split()), " ".join(actual.split())
+    previous = list(range(len(actual) + 1))
+    for i, expected_char in enumerate(expected, 1):
+        current = [i]
+        for j, actual_char in enumerate(actual, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (expected_char != actual_char)))
+        previous = current
+    return previous[-1] / max(len(expected), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reference-dir", type=Path)
+    args = parser.parse_args()
+
+    if args.reference_dir:
+        images, truths = load_reference_dir(args.reference_dir)
+    else:
+        images = degraded_set(render_reference())
+        truths = {name: "\n".join(SAMPLE_LINES) for name in images}
+
+    engine = get_ocr_engine()
+    print(f"{len(images)} reference pages, engine: {engine.name}")
+    header = f"{'profile':<10}{'prep ms':>9}{'ocr ms':>9}" + "".join(f"{name[:12]:>13}" for name in images)
+    print(header + f"{'mean acc':>10}")
+
+    for profile in PREPROCESS_PROFILES:
+        prep_times, ocr_times, accuracies = [], [], []
+        for name, image in images.items():
+            started = time.perf_counter()
+            prepared = preprocess_image_for_ocr(image, profile)
+            prep_times.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            text = engine.image_to_string(prepared)
+            ocr_times.append(time.perf_counter() - started)
+            accuracies.append(max(0.0, 1 - char_error_rate(truths[name], text)))
+
+        row = f"{profile:<10}{statistics.mean(prep_times) * 1000:>9.1f}{statistics.mean(ocr_times) * 1000:>9.0f}"
+        row += "".join(f"{accuracy:>13.3f}" for accuracy in accuracies)
+        print(row + f"{statistics.mean(accuracies):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_pdf_render.py
+"""
+Compare the PDF page -> OCR image paths
+
+    legacy:   fixed 2x RGB render, PNG encode, PNG decode
+    current:  adaptive-zoom grayscale render wrapped with Image.frombuffer
+
+Reports per-page latency, Python-side peak allocations (tracemalloc) and the
+size of the image handed to OCR. Pass --ocr to include tesseract time.
+
+Run from backend/:
+    python -m benchmarks.bench_pdf_render [scanned.pdf] [--pages 10] [--ocr]
+"""
+import argparse
+import io
+import statistics
+import time
+import tracemalloc
+
+import fitz
+from PIL import Image
+
+from app.utils.parse_report import choose_render_zoom, get_ocr_engine, pixmap_to_image
+
+SAMPLE_LINES = [
+    "CITY HOSPITAL - DEPARTMENT OF ENDOCRINOLOGY",
+    "Patient: Jane Doe    Age: 54    Sex: F",
+    "Fasting glucose: 148 mg/dL",
+    "Post-prandial blood sugar: 212 mg/dL",
+    "HbA1c: 8.1 %",
+    "Blood pressure: 142/88 mmHg",
+    "Medication: Metformin 500mg twice daily, Glipizide 5mg",
+    "Assessment: hyperglycemia, early signs of neuropathy",
+]
+
+
+def make_scanned_pdf(pages: int) -> fitz.Document:
+    """Build a PDF whose pages are 200 dpi images of text, like a scanner produces"""
+    text_doc = fitz.open()
+    page = text_doc.new_page()
+    y = 72
+    for line in SAMPLE_LINES * 4:
+        page.insert_text((56, y), line, fontsize=10)
+        y += 18
+    scan = page.get_pixmap(matrix=fitz.Matrix(200 / 72, 200 / 72), colorspace=fitz.csGRAY)
+
+    doc = fitz.open()
+    for _ in range(pages):
+        out = doc.new_page()
+        out.insert_image(out.rect, pixmap=scan)
+    return doc
+
+
+def legacy_image(page) -> Image.Image:
+    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
+    return Image.open(io.BytesIO(pix.tobytes("png")))
+
+
+def current_image(page):
+    zoom = choose_render_zoom(page)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    return pixmap_to_image(pix), pix
+
+
+def measure(doc: fitz.Document, render, ocr: bool) -> dict:
+    latencies = []
+    peaks = []
+    pixels = 0
+    for page in doc:
+        tracemalloc.start()
+        started = time.perf_counter()
+        image = render(page)
+        if isinstance(image, tuple):
+            image, pix = image
+        image.load()
+        if ocr:
+            get_ocr_engine().image_to_string(image)
+        latencies.append(time.perf_counter() - started)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        pixels = image.width * image.height * len(image.getbands())
+        image.close()
+    return {
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000,
+        "peak_kb": max(peaks) / 1024,
+        "image_kb": pixels / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?", help="PDF to benchmark (default: synthetic scan)")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--ocr", action="store_true", help="include OCR in the timing")
+    args = parser.parse_args()
+
+    doc = fitz.open(args.pdf) if args.pdf else make_scanned_pdf(args.pages)
+    print(f"{doc.page_count} pages, OCR {'on' if args.ocr else 'off'}")
+    print(f"{'path':<10}{'mean ms':>10}{'p95 ms':>10}{'py peak KB':>12}{'image KB':>10}")
+    for name, render in (("legacy", legacy_image), ("current", current_image)):
+        result = measure(doc, render, args.ocr)
+        print(f"{name:<10}{result['mean_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+              f"{result['peak_kb']:>12.0f}{result['image_kb']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
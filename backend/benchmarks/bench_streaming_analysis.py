@@ -0,0 +1,91 @@
+# benchmarks/bench_streaming_analysis.py
+"""
+Compare time-to-first-insight of streamed and whole-completion LLM analysis
+
+Runs against benchmarks.llm_stub_server, which delays the first token by
+the prompt size and spreads generation time over the streamed pieces:
+
+    complete: analyze_report_content_async, the analysis arrives all at once
+    stream:   stream_report_analysis; reports when the first summary text,
+              the full summary, the first recommendation and the finished
+              analysis arrive
+
+Every streamed analysis is checked against the whole-completion one.
+
+Run from backend/:
+    python -m benchmarks.bench_streaming_analysis [--reports 20] [--per-1k-tokens 2.0]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("LLM_API_KEY", "stub")
+os.environ.setdefault("LLM_TIMEOUT", "120")
+
+from app.ai_inference import analyze_report_content_async, stream_report_analysis
+from app.llm_client import start_llm_client, stop_llm_client
+from benchmarks import llm_stub_server
+from benchmarks.bench_rule_analysis import make_reports
+
+
+async def time_complete(text: str) -> tuple:
+    started = time.perf_counter()
+    analysis = await analyze_report_content_async(text, "general")
+    return time.perf_counter() - started, analysis
+
+
+async def time_stream(text: str) -> tuple:
+    marks = {}
+    started = time.perf_counter()
+    async for event in stream_report_analysis(text, "general"):
+        elapsed = time.perf_counter() - started
+        if event["event"] == "text":
+            marks.setdefault("first text", elapsed)
+        elif event["event"] == "field" and event["field"] == "summary":
+            marks.setdefault("summary", elapsed)
+        elif event["event"] == "item" and event["field"] == "recommendations":
+            marks.setdefault("first rec.", elapsed)
+        elif event["event"] == "complete":
+            marks["complete"] = elapsed
+            return marks, event["analysis"]
+
+
+async def main_async(args) -> None:
+    llm_stub_server.config.update({"latency": 0.2, "jitter": 0.0, "per_1k_tokens": args.per_1k_tokens})
+    reports = make_reports(args.reports, args.size)
+    timings = {"complete": [], "stream": {}}
+    async with llm_stub_server.running_stub(args.port):
+        start_llm_client(base_url=f"http://127.0.0.1:{args.port}/v1")
+        try:
+            mismatches = 0
+            for text in reports:
+                seconds, whole = await time_complete(text)
+                timings["complete"].append(seconds)
+                marks, streamed = await time_stream(text)
+                for name, value in marks.items():
+                    timings["stream"].setdefault(name, []).append(value)
+                mismatches += streamed != whole
+        finally:
+            await stop_llm_client()
+
+    print(f"{len(reports)} reports of ~{args.size} chars, {mismatches} mismatching analyses")
+    print(f"{'path':<10}{'event':<12}{'median s':>10}")
+    print(f"{'complete':<10}{'analysis':<12}{statistics.median(timings['complete']):>10.2f}")
+    for name, values in timings["stream"].items():
+        print(f"{'stream':<10}{name:<12}{statistics.median(values):>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=20)
+    parser.add_argument("--size", type=int, default=2500, help="approximate characters per report")
+    parser.add_argument("--per-1k-tokens", type=float, default=2.0, help="simulated seconds per 1000 tokens")
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
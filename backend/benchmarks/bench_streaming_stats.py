@@ -0,0 +1,94 @@
+# benchmarks/bench_streaming_stats.py
+"""
+Compare glucose statistics over CGM-sized series
+
+    lists:     the list-based helpers as they were (mean, variance, range
+               buckets and regression sums as separate passes)
+    helpers:   calculate_glucose_variability, assess_time_in_range and
+               generate_trend_analysis on the list, one pass through the
+               accumulators a reading at a time
+    arrays:    the same helpers on a NumPy array, which the accumulators
+               take as one batch
+    streaming: the accumulators fed NumPy batches of a day of readings, as
+               a CGM importer would, without a list of the whole series
+
+Reports readings per second and checks every path gives the same metrics.
+
+Run from backend/:
+    python -m benchmarks.bench_streaming_stats [--days 7 90 365]
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from app.ai_inference import assess_time_in_range, calculate_glucose_variability, generate_trend_analysis
+from app.utils.streaming_stats import RangeCounter, RunningStats, TrendAccumulator
+
+READINGS_PER_DAY = 288  # one every 5 minutes
+
+
+def make_series(days: int, seed: int = 3) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    minutes = np.arange(days * READINGS_PER_DAY) * 5
+    daily = 35 * np.sin(2 * np.pi * minutes / 1440)
+    return np.round(np.clip(150 + daily + rng.normal(0, 30, minutes.size), 40, 400), 1)
+
+
+def lists(values: list) -> tuple:
+    mean = sum(values) / len(values)
+    std = math.sqrt(sum((x - mean) * (x - mean) for x in values) / len(values))
+    in_range = [v for v in values if 70 <= v <= 180]
+    below = [v for v in values if v < 70]
+    above = [v for v in values if v > 180]
+    n = len(values)
+    xs = list(range(n))
+    slope = (n * sum(x * y for x, y in zip(xs, values)) - sum(xs) * sum(values)) / (n * sum(x * x for x in xs) - sum(xs) ** 2)
+    return (round(std, 2), round(mean, 2), round(len(in_range) / n * 100, 1), round(len(below) / n * 100, 1),
+            round(len(above) / n * 100, 1), round(slope, 3))
+
+
+def helpers(values: list) -> tuple:
+    variability = calculate_glucose_variability(values)
+    in_range = assess_time_in_range(values)
+    trend = generate_trend_analysis(values)
+    return (variability["standard_deviation"], variability["mean"], in_range["time_in_range_percent"],
+            in_range["time_below_range_percent"], in_range["time_above_range_percent"], trend["slope"])
+
+
+def streaming(series: np.ndarray) -> tuple:
+    stats, counter, trend = RunningStats(), RangeCounter(), TrendAccumulator()
+    for day in np.split(series, len(series) // READINGS_PER_DAY):
+        stats.add_batch(day)
+        counter.add_batch(day)
+        trend.add_batch(day)
+    variability, in_range = stats.variability(), counter.time_in_range()
+    return (variability["standard_deviation"], variability["mean"], in_range["time_in_range_percent"],
+            in_range["time_below_range_percent"], in_range["time_above_range_percent"], trend.trend()["slope"])
+
+
+def timed(function, argument) -> tuple:
+    started = time.perf_counter()
+    result = function(argument)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 90, 365])
+    args = parser.parse_args()
+
+    print(f"{'days':>6}{'readings':>10}" + "".join(f"{name + ' r/s':>16}" for name in ("lists", "helpers", "arrays", "streaming"))
+          + "  same")
+    for days in args.days:
+        series = make_series(days)
+        values = series.tolist()
+        runs = [timed(lists, values), timed(helpers, values), timed(helpers, series), timed(streaming, series)]
+        same = len({result for _, result in runs}) == 1
+        print(f"{days:>6}{len(values):>10}" + "".join(f"{len(values) / seconds:>16.0f}" for seconds, _ in runs)
+              + f"  {same}")
+
+
+if __name__ == "__main__":
+    main()
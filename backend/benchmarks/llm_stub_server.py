@@ -0,0 +1,151 @@
+# benchmarks/llm_stub_server.py
+"""
+Local stand-in for an OpenAI-compatible chat completions API
+
+Answers POST /v1/chat/completions with a canned analysis after a simulated
+latency, streamed as server-sent events when the request asks for it, and
+can be told to fail: a fraction of calls get an error status
+(optionally with Retry-After) and a fraction hang past any sane deadline.
+The behaviour can be changed while running with POST /stub/config, and
+GET /stub/stats returns call counts.
+
+Run from backend/:
+    python -m benchmarks.llm_stub_server [--port 8099] [--latency 0.2] [--error-rate 0.1]
+
+then point the API at it:
+    LLM_API_KEY=stub LLM_BASE_URL=http://127.0.0.1:8099/v1 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CANNED_ANALYSIS = {
+    "summary": "Stub analysis: glucose readings above target, HbA1c elevated.",
+    "risk_score": 5.5,
+    "key_findings": ["Average glucose above target range", "HbA1c above 7%"],
+    "recommendations": ["Review medication with your healthcare provider",
+                        "Monitor blood glucose more frequently"],
+    "concerns": ["Elevated glucose levels"],
+    "confidence_score": 0.8
+}
+
+config: Dict[str, Any] = {
+    "latency": 0.2,        # seconds before answering
+    "jitter": 0.1,         # extra uniform random latency
+    "per_1k_tokens": 0.0,  # extra latency per 1000 prompt + max output tokens (~4 chars each)
+    "error_rate": 0.0,     # fraction of calls answered with error_status
+    "error_status": 503,
+    "retry_after": None,   # Retry-After seconds sent with errors
+    "hang_rate": 0.0,      # fraction of calls that never answer in time
+    "hang_seconds": 300.0
+}
+stats = {"calls": 0, "errors": 0, "hangs": 0, "ok": 0, "tokens": 0}
+
+app = FastAPI(title="LLM stub")
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["calls"] += 1
+    roll = random.random()
+    if roll < config["hang_rate"]:
+        stats["hangs"] += 1
+        await asyncio.sleep(config["hang_seconds"])
+    prompt_tokens = sum(len(message.get("content", "")) for message in body.get("messages", [])) / 4
+    output_tokens = body.get("max_tokens") or 0
+    stats["tokens"] += int(prompt_tokens + output_tokens)
+    # Reading the prompt delays the first token; the rest is generation
+    first_token = (config["latency"] + random.uniform(0, config["jitter"])
+                   + config["per_1k_tokens"] * prompt_tokens / 1000)
+    generation = config["per_1k_tokens"] * output_tokens / 1000
+
+    if roll >= config["hang_rate"] and roll < config["hang_rate"] + config["error_rate"]:
+        await asyncio.sleep(first_token)
+        stats["errors"] += 1
+        headers = {"Retry-After": str(config["retry_after"])} if config["retry_after"] is not None else {}
+        return JSONResponse({"error": {"message": "stub error"}}, status_code=config["error_status"], headers=headers)
+
+    stats["ok"] += 1
+    content = json.dumps(CANNED_ANALYSIS)
+    if body.get("stream"):
+        return StreamingResponse(_stream_completion(body.get("model"), content, first_token, generation),
+                                 media_type="text/event-stream")
+
+    await asyncio.sleep(first_token + generation)
+    return {
+        "id": f"stub-{stats['calls']}",
+        "object": "chat.completion",
+        "model": body.get("model"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}]
+    }
+
+
+async def _stream_completion(model: str, content: str, first_token: float, generation: float):
+    """Send ``content`` a few characters at a time as chat.completion.chunk events"""
+    pieces = [content[start:start + 4] for start in range(0, len(content), 4)]
+    await asyncio.sleep(first_token)
+    for index, piece in enumerate(pieces):
+        if index:
+            await asyncio.sleep(generation / len(pieces))
+        chunk = {"id": f"stub-{stats['calls']}", "object": "chat.completion.chunk", "model": model,
+                 "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/stub/config")
+async def update_config(changes: Dict[str, Any]):
+    """Change the simulated behaviour; unknown keys are ignored"""
+    config.update({key: value for key, value in changes.items() if key in config})
+    return config
+
+
+@app.get("/stub/stats")
+async def get_stats():
+    return stats
+
+
+@app.post("/stub/reset")
+async def reset_stats():
+    for key in stats:
+        stats[key] = 0
+    return stats
+
+
+@asynccontextmanager
+async def running_stub(port: int) -> AsyncIterator[None]:
+    """Serve the stub on 127.0.0.1:``port`` in the current event loop, for benchmarks"""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    try:
+        yield
+    finally:
+        server.should_exit = True
+        await serving
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    for key, value in config.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(value) if value is not None else float,
+                            default=value)
+    args = parser.parse_args()
+    config.update({key: getattr(args, key) for key in config})
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+# tests/conftest.py
+import sys
+import types
+
+try:
+    import app.database  # noqa: F401
+except ImportError:
+    # app.database is not in the repository yet; api.py only needs the name to import
+    database = types.ModuleType("app.database")
+    database.get_db_connection = None
+    sys.modules["app.database"] = database
@@ -0,0 +1,95 @@
+# tests/test_llm_client.py
+"""LLMClient against benchmarks.llm_stub_server, served in-process on a free port"""
+import asyncio
+import socket
+import time
+
+import pytest
+
+from app.llm_client import CircuitBreaker, LLMClient, LLMError, LLMRequestError, LLMTimeout, LLMUnavailable
+from benchmarks import llm_stub_server
+
+MESSAGES = [{"role": "user", "content": "HbA1c 8.1%"}]
+
+
+@pytest.fixture(autouse=True)
+def stub_config(monkeypatch):
+    monkeypatch.setattr(llm_stub_server, "config", {**llm_stub_server.config, "latency": 0.0, "jitter": 0.0})
+    monkeypatch.setattr(llm_stub_server, "stats", dict.fromkeys(llm_stub_server.stats, 0))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_against_stub(scenario, **options):
+    """Run ``scenario(client)`` with a client pointed at a freshly started stub"""
+    async def main():
+        port = free_port()
+        async with llm_stub_server.running_stub(port):
+            client = LLMClient(base_url=f"http://127.0.0.1:{port}/v1", api_key="stub",
+                               **{"max_retries": 0, "retry_base_delay": 0.01, **options})
+            try:
+                await scenario(client)
+            finally:
+                await client.aclose()
+    asyncio.run(main())
+
+
+def test_breaker_opens_on_repeated_server_errors_and_closes_after_probe():
+    async def scenario(client):
+        llm_stub_server.config.update(error_rate=1.0, error_status=500)
+        for _ in range(3):
+            with pytest.raises(LLMError):
+                await client.chat(MESSAGES)
+        assert client.breaker.state == "open"
+
+        with pytest.raises(LLMUnavailable):
+            await client.chat(MESSAGES)
+        assert llm_stub_server.stats["calls"] == 3
+
+        llm_stub_server.config.update(error_rate=0.0)
+        await asyncio.sleep(0.3)
+        assert await client.chat(MESSAGES)
+        assert client.breaker.state == "closed"
+        assert llm_stub_server.stats["calls"] == 4
+
+    run_against_stub(scenario, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=0.2))
+
+
+def test_rejected_requests_do_not_open_breaker():
+    async def scenario(client):
+        llm_stub_server.config.update(error_rate=1.0, error_status=400)
+        for _ in range(5):
+            with pytest.raises(LLMRequestError):
+                await client.chat(MESSAGES)
+        assert client.breaker.state == "closed"
+        assert llm_stub_server.stats["calls"] == 5
+
+    run_against_stub(scenario, max_retries=2, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+
+def test_retry_after_is_honoured():
+    async def scenario(client):
+        llm_stub_server.config.update(error_rate=1.0, error_status=429, retry_after=0.5)
+        started = time.monotonic()
+        with pytest.raises(LLMError):
+            await client.chat(MESSAGES)
+        assert time.monotonic() - started >= 0.5
+        assert llm_stub_server.stats["calls"] == 2
+
+    run_against_stub(scenario, max_retries=1, retry_max_delay=2.0)
+
+
+def test_per_call_deadline_is_enforced():
+    async def scenario(client):
+        llm_stub_server.config.update(hang_rate=1.0, hang_seconds=1.0)
+        started = time.monotonic()
+        with pytest.raises(LLMTimeout):
+            await client.chat(MESSAGES, timeout=0.3)
+        assert time.monotonic() - started < 1.0
+        assert client.breaker.stats()["consecutive_failures"] == 1
+
+    run_against_stub(scenario)
@@ -0,0 +1,53 @@
+# tests/test_reports.py
+import asyncio
+import io
+
+import pytest
+
+from app import api
+from app.utils.storage import BlobStore, save_file_stream
+
+USER = {"user_id": 1, "user_type": "patient"}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "mock_reports", {})
+    monkeypatch.setattr(api, "blob_store", BlobStore(tmp_path / "blobs"))
+    return api.blob_store
+
+
+def upload(tmp_path, content: bytes, title: str) -> dict:
+    saved = save_file_stream(io.BytesIO(content), tmp_path)
+    return api.create_report_record(saved, USER["user_id"], title, "general", f"{title}.pdf")
+
+
+def test_upload_after_delete_does_not_reuse_report_id(tmp_path, store):
+    a = upload(tmp_path, b"%PDF-1.4 report A", "a")
+    b = upload(tmp_path, b"%PDF-1.4 report B", "b")
+    asyncio.run(api.delete_report(a["id"], current_user=USER))
+    d = upload(tmp_path, b"%PDF-1.4 report D", "d")
+
+    assert d["id"] not in (a["id"], b["id"])
+    assert api.mock_reports == {b["id"]: b, d["id"]: d}
+    assert api.mock_reports[b["id"]]["title"] == "b"
+    assert store.stats() == {"blobs": 2, "references": 2}
+    assert store.refcount(a["content_hash"]) == 0
+    assert store.refcount(b["content_hash"]) == 1
+    assert store.refcount(d["content_hash"]) == 1
+
+
+def test_deleting_every_report_frees_shared_blob(tmp_path, store):
+    first = upload(tmp_path, b"%PDF-1.4 same bytes", "first")
+    second = upload(tmp_path, b"%PDF-1.4 same bytes", "second")
+    assert first["content_hash"] == second["content_hash"]
+    assert store.stats() == {"blobs": 1, "references": 2}
+
+    asyncio.run(api.delete_report(first["id"], current_user=USER))
+    third = upload(tmp_path, b"%PDF-1.4 other bytes", "third")
+    assert third["id"] != second["id"]
+    assert store.refcount(second["content_hash"]) == 1
+
+    asyncio.run(api.delete_report(second["id"], current_user=USER))
+    assert store.refcount(second["content_hash"]) == 0
+    assert store.stats() == {"blobs": 1, "references": 1}
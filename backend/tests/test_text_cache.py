@@ -0,0 +1,42 @@
+# tests/test_text_cache.py
+import sqlite3
+
+from app.utils.text_cache import TextCache
+
+
+def stored(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM entries").fetchone()
+
+
+def test_running_total_and_lru_eviction(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = TextCache(path, max_bytes=1000, flush_interval=3600)
+    for index in range(30):
+        cache.put(f"k{index}", "x" * 100)
+        if index == 25:
+            cache.get("k16")  # recently read; outlives k17..k20
+
+    stats = cache.stats()
+    assert stats["bytes"] == stored(path)[0] == 1000
+    assert stats["entries"] == 10
+    assert stats["evictions"] == 20
+    assert cache.get("k16") is not None
+    assert cache.get("k17") is None
+    assert cache.get("k21") is not None
+
+    cache.put("k29", "y" * 40)
+    assert cache.stats()["bytes"] == stored(path)[0] == 940
+
+
+def test_reads_are_counted_without_writing_until_flushed(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = TextCache(path, flush_interval=3600)
+    cache.put("key", "text", {"pages": 1})
+    assert cache.get("key") == {"text": "text", "metadata": {"pages": 1}}
+    assert cache.get("missing") is None
+
+    other = TextCache(path)
+    assert (other.stats()["hits"], other.stats()["misses"]) == (0, 0)
+    cache.flush()
+    assert (other.stats()["hits"], other.stats()["misses"]) == (1, 1)
@@ -175,14 +175,21 @@ const UploadForm = () => {
       setReportType('blood_test');
       setLanguage('en');
       
-      // Success callback
-      handleUploadSuccess(response.report);
-      
       addNotification({
         type: 'success',
         message: 'Report uploaded successfully! Analysis will be ready shortly.'
       });
 
+      // Analysis runs in the background; pick up the result when it is ready
+      apiService.waitForReport(response.report_id)
+        .then((report) => handleUploadSuccess(report))
+        .catch((error) => {
+          addNotification({
+            type: 'error',
+            message: error.message || 'Report analysis failed.'
+          });
+        });
+
     } catch (error) {
       console.error('Upload error:', error);
       addNotification({
@@ -293,7 +300,7 @@ const UploadForm = () => {
                               {uploadProgress}%
                             </div>
                           </div>
-                          <p className="text-muted mb-0">Uploading and analyzing...</p>
+                          <p className="text-muted mb-0">Uploading...</p>
                         </div>
                       </div>
                     )}
@@ -177,6 +177,47 @@ export const apiService = {
     }
   },
 
+  // Upload many files in one request; `formData` holds repeated `files` entries
+  uploadReportsBatch: async (formData, onUploadProgress) => {
+    try {
+      const config = {
+        headers: {
+          'Content-Type': 'multipart/form-data',
+        },
+        onUploadProgress: onUploadProgress,
+        timeout: 300000, // 5 minutes for large batches
+      };
+
+      return await apiClient.post('/reports/upload-batch', formData, config);
+    } catch (error) {
+      throw new Error(error.message || 'Batch upload failed');
+    }
+  },
+
+  // Poll report processing status; `wait` long-polls for up to that many seconds
+  getReportStatus: async (reportId, wait = 0) => {
+    try {
+      return await apiClient.get(`/reports/${reportId}/status?wait=${wait}`, {
+        timeout: (wait + 10) * 1000,
+      });
+    } catch (error) {
+      throw new Error('Failed to fetch report status');
+    }
+  },
+
+  // Resolve with the full report once background analysis has finished
+  waitForReport: async (reportId, onStatus) => {
+    let status = await apiService.getReportStatus(reportId);
+    while (status.status === 'pending' || status.status === 'analyzing') {
+      if (onStatus) onStatus(status);
+      status = await apiService.getReportStatus(reportId, 25);
+    }
+    if (status.status === 'error') {
+      throw new Error(status.error || 'Report analysis failed');
+    }
+    return await apiService.getReportById(reportId);
+  },
+
   deleteReport: async (reportId) => {
     try {
       return await apiClient.delete(`/reports/${reportId}`);